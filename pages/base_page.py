@@ -3,10 +3,13 @@ from datetime import datetime
 import logging
 import allure
 from typing import Optional, Union
+from urllib.parse import urlparse
 from config.constants import (
     DEFAULT_TIMEOUT, PAGE_LOAD_TIMEOUT, SCREENSHOTS_DIR, 
     ERROR_MESSAGES, SCREENSHOT_CONFIG
 )
+from utils.metrics_exporter import active_metrics
+from utils.request_timing import normalize_endpoint
 
 class BasePage:
     """Базовый класс для всех страниц приложения"""
@@ -24,6 +27,7 @@ class BasePage:
         try:
             self.page.goto(url, timeout=PAGE_LOAD_TIMEOUT)
             self.wait_for_page_load()
+            self._record_page_load(url)
             self.logger.info(f"Успешный переход на {url}")
             return self
         except Exception as e:
@@ -40,6 +44,29 @@ class BasePage:
         except PlaywrightTimeoutError:
             self.logger.warning("Превышен таймаут ожидания загрузки страницы, продолжаем выполнение")
 
+    def _record_page_load(self, url: str) -> None:
+        """Передача Navigation Timing страницы в метрики прогона, если они включены"""
+        metrics = active_metrics()
+        if metrics is None:
+            return
+        try:
+            timing = self.page.evaluate("""() => {
+                const entry = performance.getEntriesByType('navigation')[0];
+                return entry ? {
+                    ttfb: entry.responseStart,
+                    dom_content_loaded: entry.domContentLoadedEventEnd,
+                    load: entry.loadEventEnd || null
+                } : null;
+            }""")
+        except Exception as e:
+            self.logger.warning(f"Не удалось получить время загрузки страницы: {str(e)}")
+            return
+        if timing:
+            metrics.observe_page_load(
+                normalize_endpoint(urlparse(url).path or "/"),
+                {phase: value / 1000 for phase, value in timing.items() if value is not None}
+            )
+
     @allure.step("Ожидание элемента: {selector}")
     def wait_for_element(self, selector: str, timeout: int = DEFAULT_TIMEOUT, state: str = "visible") -> None:
         """Ожидание появления элемента с улучшенной диагностикой"""
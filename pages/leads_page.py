@@ -1,3 +1,7 @@
+from playwright.sync_api import Page
+from pages.base_page import BasePage
+import logging
+
 class LeadsPage(BasePage):
     """Страница лидов"""
     
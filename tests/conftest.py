@@ -23,6 +23,7 @@ from urllib.parse import urljoin
 from config.constants import TEST_RESULTS_DIR, LOGS_DIR, SCREENSHOTS_DIR
 from config.viewport_config import VIEWPORT_CONFIGS
 from utils.screenshot_utils import ScreenshotUtils
+from utils.metrics_exporter import MetricsExporter, RunMetrics, active_metrics, set_active_metrics
 
 # Настройка логирования
 def setup_logging():
@@ -78,6 +79,25 @@ def pytest_addoption(parser):
         default=0, 
         help="Задержка между действиями в миллисекундах"
     )
+    parser.addoption(
+        "--site-profile",
+        action="store",
+        default=None,
+        help="Профиль задержек локального сайта для --env offline (fast, realistic, slow)"
+    )
+    parser.addoption(
+        "--metrics-port",
+        action="store",
+        type=int,
+        default=None,
+        help="Порт HTTP эндпоинта /metrics в формате OpenMetrics (0 - свободный порт)"
+    )
+    parser.addoption(
+        "--metrics-textfile",
+        action="store",
+        default=None,
+        help="Файл, в который периодически записываются метрики в формате OpenMetrics"
+    )
 
 def pytest_configure(config):
     """Конфигурация pytest"""
@@ -93,6 +113,24 @@ def pytest_configure(config):
     # Создаем директории для результатов
     for directory in [TEST_RESULTS_DIR, LOGS_DIR, SCREENSHOTS_DIR]:
         directory.mkdir(parents=True, exist_ok=True)
+    
+    # Живые метрики прогона включаются только явно
+    port = config.getoption("--metrics-port")
+    textfile = config.getoption("--metrics-textfile")
+    if port is not None or textfile:
+        metrics = RunMetrics()
+        set_active_metrics(metrics)
+        # Воркеры xdist только копят метрики и отдают их контроллеру вместе с отчетами о тестах,
+        # порт и файл занимает один контроллер
+        if not hasattr(config, "workerinput"):
+            config._metrics_exporter = MetricsExporter(metrics.registry, port=port, textfile=textfile).start()
+
+def pytest_unconfigure(config):
+    """Остановка экспорта метрик"""
+    exporter = getattr(config, "_metrics_exporter", None)
+    if exporter is not None:
+        exporter.stop()
+    set_active_metrics(None)
 
 @pytest.fixture(scope="session")
 def config(request):
@@ -125,6 +163,21 @@ def config(request):
         "credentials": config_data.get("credentials", {})
     })
     
+    # Окружение offline: UI тесты идут в локальный сайт из сохраненной верстки,
+    # при pytest-xdist у каждого воркера свой сервер
+    if env_config.get("fixture_site"):
+        from utils.fixture_site import FixtureSiteServer
+        profiles = config_data.get("fixture_site", {}).get("profiles", {})
+        profile_name = request.config.getoption("--site-profile") or env_config["fixture_site"]
+        if profile_name not in profiles:
+            pytest.fail(f"Профиль сайта '{profile_name}' не найден. Доступные: {', '.join(profiles)}")
+        valid_user = env_config["credentials"]["valid_user"]
+        site = FixtureSiteServer.from_profile(profiles[profile_name],
+                                              users={valid_user["email"]: valid_user["password"]}).start()
+        request.addfinalizer(site.stop)
+        env_config["baseUrl"] = site.url + env_config["baseUrl"]
+        logging.info(f"Используется локальный сайт {site.url}, профиль задержек: {profile_name}")
+    
     # Получаем API ключ
     api_key = (
         request.config.getoption("--api-key") or 
@@ -254,6 +307,27 @@ def authenticated_page(page, config):
     
     yield page
 
+@pytest.fixture
+def fault_proxy():
+    """Прокси с неисправностями: fault_proxy(target_url, rules) запускает прокси до конца теста
+    
+    Таблица времени обменов прикрепляется к отчету Allure после теста.
+    """
+    from utils.fault_proxy import FaultProxy
+    
+    proxies = []
+    
+    def start(target_url, rules=(), **kwargs):
+        proxy = FaultProxy(target_url, rules, **kwargs).start()
+        proxies.append(proxy)
+        return proxy
+    
+    yield start
+    
+    for proxy in proxies:
+        proxy.stop()
+        proxy.attach_to_allure(f"Обмены через прокси на {proxy.target_url}")
+
 @pytest.fixture
 def screenshot_utils(page):
     """Утилиты для работы со скриншотами"""
@@ -407,6 +481,23 @@ def pytest_runtest_makereport(item, call):
             # Тест упал, добавляем дополнительную информацию
             logging.error(f"❌ Тест {item.nodeid} завершился с ошибкой: {call.excinfo.value}")
 
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_logreport(report):
+    """Учет результатов тестов в метриках прогона
+
+    На воркере xdist метрики, накопленные с прошлого отчета, прикрепляются
+    к отчету до его отправки контроллеру, а контроллер прибавляет их к своим.
+    """
+    metrics = active_metrics()
+    if metrics is None:
+        return
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        report.liner_metrics = metrics.registry.drain()
+        return
+    metrics.registry.merge(getattr(report, "liner_metrics", None) or {})
+    if report.when == "call" or (report.when == "setup" and not report.passed):
+        metrics.test_finished(report.outcome)
+
 def pytest_sessionstart(session):
     """Действия в начале сессии тестирования"""
     logging.info("=" * 80)
@@ -0,0 +1,59 @@
+// Поведение страниц, которое в Лайнере дают bootstrap и скрипты фильтра
+(function () {
+    function syncFilterBox() {
+        var collapse = document.getElementById('filter-box');
+        var box = document.querySelector('.filter-box');
+        if (collapse && box) {
+            box.classList.toggle('show', collapse.classList.contains('show'));
+        }
+    }
+
+    document.addEventListener('click', function (event) {
+        var toggle = event.target.closest('[data-toggle]');
+        if (toggle && toggle.getAttribute('data-toggle') === 'collapse') {
+            event.preventDefault();
+            var target = document.querySelector(toggle.getAttribute('href') || toggle.getAttribute('data-target'));
+            if (target) {
+                var shown = target.classList.toggle('show');
+                toggle.setAttribute('aria-expanded', shown);
+                syncFilterBox();
+            }
+        } else if (toggle && toggle.getAttribute('data-toggle') === 'dropdown') {
+            event.preventDefault();
+            var menu = toggle.parentElement.querySelector('.dropdown-menu');
+            if (menu) {
+                var opened = menu.classList.toggle('show');
+                toggle.parentElement.classList.toggle('show', opened);
+                toggle.setAttribute('aria-expanded', opened);
+            }
+        }
+
+        if (event.target.closest('#filter-m-apply-btn')) {
+            event.preventDefault();
+            applyFilter();
+        }
+    });
+
+    function applyFilter() {
+        var form = document.getElementById('filter-m-form');
+        var query = new URLSearchParams(new FormData(form)).toString();
+        fetch('/leads/list/?' + query, {credentials: 'same-origin'})
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                var body = document.querySelector('table.leads-table tbody');
+                body.innerHTML = '';
+                data.data.forEach(function (lead) {
+                    var row = document.createElement('tr');
+                    ['id', 'external_id', 'type', 'status', 'client_name', 'client_phone', 'created']
+                        .forEach(function (field) {
+                            var cell = document.createElement('td');
+                            cell.textContent = lead[field];
+                            row.appendChild(cell);
+                        });
+                    body.appendChild(row);
+                });
+            });
+    }
+
+    syncFilterBox();
+})();
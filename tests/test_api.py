@@ -182,9 +182,14 @@ def created_lead(api_config, api_headers, lead_data, use_mock, mock_responses):
 
 @pytest.fixture
 def api_client(api_config, api_headers):
-    """Фикстура для создания клиента API"""
+    """Фикстура для создания клиента API с замером фаз запросов"""
     from utils.api_client import APIClient
-    return APIClient(api_config["base_url"], api_config["api_key"])
+    from utils.request_timing import PhaseTimingRecorder
+    recorder = PhaseTimingRecorder()
+    client = APIClient(api_config["base_url"], api_config["api_key"], on_request_timing=recorder)
+    yield client
+    recorder.attach_to_allure()
+    client.close()
 
 @allure.feature("API Тесты")
 class TestAPI:
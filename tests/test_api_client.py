@@ -0,0 +1,621 @@
+import pytest
+import json
+import allure
+import gzip
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from utils.api_client import APIClient
+from utils.body_capture import BodySampler, JsonlCaptureSink
+from utils.lead_pagination import StreamingJSONPage
+from utils.metrics_exporter import RunMetrics
+from utils.request_timing import PHASES, PhaseTimingRecorder, normalize_endpoint
+from utils.rate_limiter import AdaptiveRateLimiter, AdaptiveTokenBucket
+from utils.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from utils.response_cache import ResponseCache
+from utils.single_flight import SingleFlight
+
+
+class LocalLeadHandler(BaseHTTPRequestHandler):
+    """Простой обработчик API лидов для проверки транспорта клиента"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fail_if_requested(self):
+        if self.server.fail_next > 0:
+            self.server.fail_next -= 1
+            self._send_json(503, {"status": "error", "message": "Сервис недоступен"})
+            return True
+        return False
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        self.server.requests_log.append(("GET", self.path))
+        if self._fail_if_requested():
+            return
+        if self.path.startswith("/leads/search"):
+            self._send_search_page()
+            return
+        if self.path.startswith("/slow"):
+            time.sleep(0.5)
+        lead_id = self.path.rstrip("/").split("/")[-1]
+        if lead_id in self.server.leads:
+            self._send_json(200, self.server.leads[lead_id])
+        else:
+            self._send_json(404, {"status": "error", "message": "Лид не найден"})
+
+    def _send_search_page(self):
+        query = parse_qs(urlparse(self.path).query)
+        page, limit = int(query["page"][0]), int(query["limit"][0])
+        time.sleep(self.server.search_delay)
+        first = (page - 1) * limit
+        leads = [{"id": i, "client_name": f"Лид {i}"} for i in range(first, min(first + limit, self.server.search_total))]
+        pages = -(-self.server.search_total // limit)
+        self._send_json(200, {"status": "success", "data": leads,
+                              "pagination": {"page": page, "limit": limit, "total": self.server.search_total,
+                                             "pages": pages}})
+
+    def do_POST(self):
+        self.server.requests_log.append(("POST", self.path))
+        lead = self._read_json()
+        if self._fail_if_requested():
+            return
+        lead_id = str(len(self.server.leads) + 1)
+        lead["id"] = lead_id
+        self.server.leads[lead_id] = lead
+        self._send_json(200, {"status": "success", "id": lead_id})
+
+    def do_PUT(self):
+        self.server.requests_log.append(("PUT", self.path))
+        lead_id = self.path.rstrip("/").split("/")[-1]
+        self.server.leads.setdefault(lead_id, {"id": lead_id}).update(self._read_json())
+        self._send_json(200, {"status": "success"})
+
+    def do_DELETE(self):
+        self.server.requests_log.append(("DELETE", self.path))
+        lead_id = self.path.rstrip("/").split("/")[-1]
+        self.server.leads.pop(lead_id, None)
+        self._send_json(200, {"status": "success"})
+
+
+@pytest.fixture
+def local_api_server():
+    """Локальный HTTP сервер с API лидов"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LocalLeadHandler)
+    server.daemon_threads = True
+    server.leads = {}
+    server.requests_log = []
+    server.fail_next = 0
+    server.search_total = 0
+    server.search_delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def server_url(local_api_server):
+    """Базовый URL локального сервера"""
+    host, port = local_api_server.server_address
+    return f"http://{host}:{port}"
+
+
+@allure.feature("API клиент")
+class TestAPIClientTransport:
+    """Тесты транспорта API клиента"""
+
+    @allure.story("Пул соединений")
+    @allure.severity('NORMAL')
+    def test_pooled_client_reuses_connections(self, server_url):
+        """Тест переиспользования keep-alive соединений"""
+        client = APIClient(server_url, "test_key", pooled=True)
+
+        created = client.create_lead({"client_name": "Pool Test"})
+        for _ in range(4):
+            lead = client.get_lead(created["id"])
+            assert lead["client_name"] == "Pool Test", "Данные лида не совпадают"
+
+        stats = client.get_pool_stats()
+        client.close()
+
+        assert stats["misses"] == 1, f"Ожидалось одно новое соединение, получено {stats['misses']}"
+        assert stats["hits"] == 4, f"Ожидалось 4 попадания в пул, получено {stats['hits']}"
+
+    @allure.story("Пул соединений")
+    @allure.severity('NORMAL')
+    def test_pool_prewarm(self, server_url):
+        """Тест предварительного прогрева соединений"""
+        client = APIClient(server_url, "test_key", pooled=True, pool_maxsize=4, prewarm_connections=3)
+
+        client.create_lead({"client_name": "Prewarm Test"})
+        stats = client.get_pool_stats()
+        client.close()
+
+        assert stats["prewarmed"] == 3, f"Ожидалось 3 прогретых соединения, получено {stats['prewarmed']}"
+        assert stats["misses"] == 0, "Первый запрос должен использовать прогретое соединение"
+
+    @allure.story("Пул соединений")
+    @allure.severity('MINOR')
+    def test_unpooled_client_has_empty_stats(self, server_url):
+        """Тест клиента без пула соединений"""
+        client = APIClient(server_url, "test_key")
+        client.create_lead({"client_name": "No Pool"})
+
+        assert client.get_pool_stats() == {"hits": 0, "misses": 0, "prewarmed": 0}
+
+
+@pytest.fixture
+def fast_retry_policy():
+    """Политика повторов с короткими задержками для тестов"""
+    return RetryPolicy(max_attempts=3, backoff_base=0.01, backoff_max=0.02, deadline=5.0)
+
+
+@allure.feature("API клиент")
+class TestAPIClientResilience:
+    """Тесты повторных попыток и предохранителя API клиента"""
+
+    @allure.story("Повторные попытки")
+    @allure.severity('CRITICAL')
+    def test_get_is_retried_on_503(self, local_api_server, server_url, fast_retry_policy):
+        """Тест повтора идемпотентного GET при 503"""
+        client = APIClient(server_url, "test_key", retry_policy=fast_retry_policy,
+                           circuit_breaker=CircuitBreaker(failure_threshold=10))
+        created = client.create_lead({"client_name": "Retry Test"})
+        local_api_server.fail_next = 2
+
+        lead = client.get_lead(created["id"])
+
+        assert lead["client_name"] == "Retry Test", "Лид должен быть получен после повторов"
+        assert local_api_server.requests_log.count(("GET", f"/leads/{created['id']}")) == 3, \
+            "Ожидалось 3 попытки GET запроса"
+
+    @allure.story("Повторные попытки")
+    @allure.severity('CRITICAL')
+    def test_post_without_idempotency_key_is_not_retried(self, local_api_server, server_url, fast_retry_policy):
+        """Тест отсутствия повторов POST без ключа идемпотентности"""
+        client = APIClient(server_url, "test_key", retry_policy=fast_retry_policy,
+                           circuit_breaker=CircuitBreaker(failure_threshold=10))
+        local_api_server.fail_next = 1
+
+        response = client.post("/leads", json={"client_name": "No Retry"})
+
+        assert response.status_code == 503, "POST без ключа идемпотентности не должен повторяться"
+        assert len(local_api_server.requests_log) == 1, "Ожидалась одна попытка POST запроса"
+
+    @allure.story("Повторные попытки")
+    @allure.severity('NORMAL')
+    def test_post_with_idempotency_key_is_retried(self, local_api_server, server_url, fast_retry_policy):
+        """Тест повтора POST с ключом идемпотентности"""
+        client = APIClient(server_url, "test_key", retry_policy=fast_retry_policy,
+                           circuit_breaker=CircuitBreaker(failure_threshold=10))
+        local_api_server.fail_next = 1
+
+        response = client.post("/leads", json={"client_name": "Retry"}, headers={"Idempotency-Key": "lead-1"})
+
+        assert response.status_code == 200, "POST с ключом идемпотентности должен быть повторен"
+        assert len(local_api_server.requests_log) == 2, "Ожидалось 2 попытки POST запроса"
+
+    @allure.story("Дедлайн")
+    @allure.severity('NORMAL')
+    def test_deadline_limits_total_time(self, server_url):
+        """Тест общего дедлайна на логическую операцию"""
+        policy = RetryPolicy(max_attempts=10, backoff_base=0.01, deadline=0.3)
+        client = APIClient(server_url, "test_key", retry_policy=policy,
+                           circuit_breaker=CircuitBreaker(failure_threshold=0))
+
+        started = time.monotonic()
+        with pytest.raises(requests.exceptions.Timeout):
+            client.get("/slow")
+        elapsed = time.monotonic() - started
+
+        assert elapsed < 1.0, f"Операция превысила дедлайн: {elapsed:.2f} сек"
+
+    @allure.story("Повторные попытки")
+    @allure.severity('NORMAL')
+    def test_retries_and_breaker_are_opt_in(self, local_api_server, server_url):
+        """Тест клиента по умолчанию: одна попытка и никакого общего предохранителя"""
+        client = APIClient(server_url, "test_key")
+        local_api_server.fail_next = 10
+
+        for _ in range(6):
+            assert client.get("/leads/1").status_code == 503
+        assert len(local_api_server.requests_log) == 6, "Без политики повторов каждый вызов - одна попытка"
+        assert client.circuit_breaker.state == CircuitBreaker.CLOSED
+        assert APIClient(server_url, "test_key").circuit_breaker is not client.circuit_breaker, \
+            "Состояние предохранителя не должно переходить между клиентами"
+
+    @allure.story("Предохранитель")
+    @allure.severity('CRITICAL')
+    def test_circuit_breaker_fails_fast(self):
+        """Тест быстрого отказа при недоступном окружении"""
+        breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60)
+        policy = RetryPolicy(max_attempts=1, deadline=5.0)
+        client = APIClient("http://127.0.0.1:9", "test_key", retry_policy=policy, circuit_breaker=breaker)
+
+        for _ in range(3):
+            with pytest.raises(requests.exceptions.ConnectionError):
+                client.get("/leads/1")
+
+        assert breaker.state == CircuitBreaker.OPEN, "Предохранитель должен быть разомкнут"
+        with pytest.raises(CircuitOpenError):
+            client.get("/leads/1")
+        assert client.get_lead(1)["status"] == "error", "get_lead должен вернуть ошибку без обращения к сети"
+
+    @allure.story("Предохранитель")
+    @allure.severity('NORMAL')
+    def test_circuit_breaker_recovers(self, server_url):
+        """Тест восстановления после пробного запроса"""
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN, "Предохранитель должен быть разомкнут"
+
+        time.sleep(0.1)
+        client = APIClient(server_url, "test_key", circuit_breaker=breaker)
+        client.create_lead({"client_name": "Probe"})
+
+        assert breaker.state == CircuitBreaker.CLOSED, "Успешный пробный запрос должен замкнуть цепь"
+
+
+@allure.feature("API клиент")
+class TestAPIClientCache:
+    """Тесты кэша ответов API клиента"""
+
+    @allure.story("Кэш ответов")
+    @allure.severity('NORMAL')
+    def test_repeated_get_is_served_from_cache(self, local_api_server, server_url):
+        """Тест повторного чтения лида из кэша"""
+        client = APIClient(server_url, "test_key", cache=ResponseCache(ttl=60))
+        created = client.create_lead({"client_name": "Cache Test"})
+
+        for _ in range(5):
+            assert client.get_lead(created["id"])["client_name"] == "Cache Test", "Данные лида не совпадают"
+
+        stats = client.get_cache_stats()
+        assert local_api_server.requests_log.count(("GET", f"/leads/{created['id']}")) == 1, \
+            "Повторные чтения должны обслуживаться кэшем"
+        assert stats["hits"] == 4 and stats["misses"] == 1, f"Некорректная статистика кэша: {stats}"
+
+    @allure.story("Кэш ответов")
+    @allure.severity('CRITICAL')
+    def test_update_invalidates_cached_lead(self, server_url):
+        """Тест сброса кэша после обновления лида"""
+        client = APIClient(server_url, "test_key", cache=ResponseCache(ttl=60))
+        created = client.create_lead({"client_name": "Before"})
+        client.get_lead(created["id"])
+
+        client.update_lead(created["id"], {"client_name": "After"})
+
+        assert client.get_lead(created["id"])["client_name"] == "After", "После обновления должен читаться новый лид"
+        assert client.get_cache_stats()["invalidations"] >= 1, "Обновление должно сбрасывать кэш"
+
+    @allure.story("Кэш ответов")
+    @allure.severity('NORMAL')
+    def test_strict_mode_bypasses_cache(self, local_api_server, server_url):
+        """Тест строгого режима без кэша"""
+        client = APIClient(server_url, "test_key", cache=ResponseCache(ttl=60))
+        created = client.create_lead({"client_name": "Strict"})
+        client.get_lead(created["id"])
+        client.get_lead(created["id"], strict=True)
+        client.cache.strict = True
+        client.get_lead(created["id"])
+
+        assert local_api_server.requests_log.count(("GET", f"/leads/{created['id']}")) == 3, \
+            "В строгом режиме каждый запрос должен идти на сервер"
+
+    @allure.story("Кэш ответов")
+    @allure.severity('MINOR')
+    def test_ttl_and_lru_eviction(self):
+        """Тест вытеснения записей по TTL и LRU"""
+        cache = ResponseCache(max_entries=2, ttl=0.05)
+        cache.put(("a", ()), 1)
+        cache.put(("b", ()), 2)
+        cache.get(("a", ()))
+        cache.put(("c", ()), 3)
+
+        assert cache.get(("b", ())) is None, "Давно не использованная запись должна быть вытеснена"
+        assert cache.get(("a", ())) == 1, "Недавно использованная запись должна остаться"
+
+        time.sleep(0.06)
+        assert cache.get(("a", ())) is None, "Устаревшая запись не должна возвращаться"
+        assert cache.get_stats()["evictions"] == 2, "Ожидалось 2 вытеснения"
+
+
+@allure.feature("API клиент")
+class TestAPIClientPhaseTiming:
+    """Тесты замера фаз запросов API клиента"""
+
+    @allure.story("Фазы запросов")
+    @allure.severity('NORMAL')
+    def test_phase_timings_are_reported(self, server_url):
+        """Тест передачи фаз запроса в обработчик"""
+        events = []
+        client = APIClient(server_url.replace("127.0.0.1", "localhost"), "test_key",
+                           on_request_timing=events.append)
+        created = client.create_lead({"client_name": "Timing"})
+        client.get_lead(created["id"])
+        client.close()
+
+        assert len(events) == 2, f"Ожидалось 2 события, получено {len(events)}"
+        first, second = events
+        assert first["connect"] > 0 and first["dns"] > 0, "Первый запрос должен открыть соединение"
+        assert second["connect"] == 0 and second["dns"] == 0, "Второй запрос должен использовать keep-alive"
+        assert second["endpoint"] == "/leads/{id}", f"Некорректный шаблон эндпоинта: {second['endpoint']}"
+        for event in events:
+            assert event["ttfb"] > 0, "Время до первого байта должно быть измерено"
+            assert event["total"] >= event["dns"] + event["connect"] + event["ttfb"], "Фазы превышают общее время"
+
+    @allure.story("Фазы запросов")
+    @allure.severity('MINOR')
+    def test_recorder_builds_histograms(self, server_url):
+        """Тест сводки и гистограмм по эндпоинтам"""
+        recorder = PhaseTimingRecorder()
+        client = APIClient(server_url, "test_key", on_request_timing=recorder)
+        created = client.create_lead({"client_name": "Histogram"})
+        for _ in range(3):
+            client.get(f"/slow/{created['id']}")
+        client.close()
+
+        summary = recorder.get_summary()
+        assert len(recorder) == 4, "Все запросы должны быть учтены"
+        assert set(summary) == {"POST /leads", "GET /slow/{id}"}, f"Некорректные эндпоинты: {set(summary)}"
+        assert summary["GET /slow/{id}"]["ttfb"]["p50"] >= 500, "Задержка сервера должна попасть в TTFB"
+        assert all(phase in recorder.format_histograms() for phase in PHASES), "В гистограммах не хватает фаз"
+        assert normalize_endpoint("/v1/lead/detail/123?x=1") == "/v1/lead/detail/{id}"
+
+
+@allure.feature("API клиент")
+class TestAPIClientBodyCapture:
+    """Тесты выборочного логирования и сохранения тел ответов"""
+
+    @allure.story("Логирование тел")
+    @allure.severity('NORMAL')
+    def test_sampled_bodies_are_captured(self, server_url, tmp_path):
+        """Тест сохранения каждого N-го тела и всех ошибок в JSONL"""
+        sink = JsonlCaptureSink(tmp_path / "capture.jsonl.gz")
+        client = APIClient(server_url, "test_key", body_sampler=BodySampler(every=2), capture_sink=sink)
+        created = client.create_lead({"client_name": "Capture"})
+        for _ in range(3):
+            client.get_lead(created["id"])
+        client.get("/leads/missing")
+        sink.close()
+
+        with gzip.open(tmp_path / "capture.jsonl.gz", "rt", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert [r["status"] for r in records] == [200, 200, 404], f"Некорректная выборка: {records}"
+        assert "Capture" in records[0]["response_body"], "Тело ответа должно быть сохранено"
+        assert records[-1]["url"].endswith("/leads/missing"), "Ответ с ошибкой должен попасть в выборку"
+
+    @allure.story("Логирование тел")
+    @allure.severity('MINOR')
+    def test_body_not_logged_below_debug(self, server_url, caplog):
+        """Тест отсутствия логирования тел при уровне выше DEBUG"""
+        client = APIClient(server_url, "test_key")
+        with caplog.at_level(logging.INFO, logger="utils.api_client"):
+            client.create_lead({"client_name": "Quiet"})
+        assert not any("Тело ответа" in r.getMessage() for r in caplog.records), "Тело не должно логироваться"
+
+        with caplog.at_level(logging.DEBUG, logger="utils.api_client"):
+            client.create_lead({"client_name": "Verbose"})
+        assert any("Тело ответа" in r.getMessage() for r in caplog.records), "Тело должно логироваться в DEBUG"
+
+    @allure.story("Логирование тел")
+    @allure.severity('MINOR')
+    def test_errors_only_sampler(self):
+        """Тест выборки только ответов с ошибками"""
+        sampler = BodySampler(errors_only=True)
+        assert [sampler.should_sample(code) for code in (200, 201, 404, 503)] == [False, False, True, True]
+
+
+@allure.feature("API клиент")
+class TestLeadPagination:
+    """Тесты постраничного обхода результатов поиска лидов"""
+
+    @allure.story("Пагинация поиска")
+    @allure.severity('CRITICAL')
+    def test_iterates_all_pages(self, local_api_server, server_url):
+        """Тест обхода всех страниц поиска"""
+        local_api_server.search_total = 250
+        client = APIClient(server_url, "test_key", pooled=True)
+        pages = client.iter_search_leads({"status": "new"}, limit=100)
+
+        ids = [lead["id"] for lead in pages]
+        client.close()
+
+        assert ids == list(range(250)), "Должны быть получены все лиды по порядку"
+        assert [p["items"] for p in pages.page_stats] == [100, 100, 50], f"Некорректные страницы: {pages.page_stats}"
+        searches = [path for method, path in local_api_server.requests_log if path.startswith("/leads/search")]
+        assert len(searches) == 3, f"Не должно быть лишних запросов страниц: {searches}"
+
+    @allure.story("Пагинация поиска")
+    @allure.severity('NORMAL')
+    def test_next_page_is_prefetched(self, local_api_server, server_url):
+        """Тест загрузки следующей страницы во время обработки текущей"""
+        local_api_server.search_total = 30
+        local_api_server.search_delay = 0.2
+        client = APIClient(server_url, "test_key", pooled=True)
+        pages = client.iter_search_leads(limit=10, prefetch=1)
+
+        for index, _ in enumerate(pages):
+            if index % 10 == 0:
+                time.sleep(0.5)
+        client.close()
+
+        waits = [p["wait_ms"] for p in pages.page_stats]
+        assert waits[0] >= 150, "Первую страницу приходится ждать"
+        assert all(wait < 100 for wait in waits[1:]), f"Следующие страницы должны быть загружены заранее: {waits}"
+
+    @allure.story("Пагинация поиска")
+    @allure.severity('NORMAL')
+    def test_streaming_decoder_handles_split_chunks(self):
+        """Тест разбора JSON, разрезанного на мелкие блоки"""
+        body = json.dumps({"status": "success", "data": [{"id": 12345, "name": "Лид"}, 678, [1.5, None]],
+                           "pagination": {"pages": 1}}, ensure_ascii=False).encode("utf-8")
+        for size in (1, 3, 7):
+            page = StreamingJSONPage(body[i:i + size] for i in range(0, len(body), size))
+            assert list(page) == [{"id": 12345, "name": "Лид"}, 678, [1.5, None]], f"Ошибка разбора при блоке {size}"
+            assert page.meta == {"status": "success", "pagination": {"pages": 1}}, "Метаданные страницы не сохранены"
+
+
+@allure.feature("API клиент")
+class TestAPIClientSingleFlight:
+    """Тесты объединения одновременных GET запросов"""
+
+    @allure.story("Объединение запросов")
+    @allure.severity('NORMAL')
+    def test_concurrent_identical_gets_share_request(self, local_api_server, server_url):
+        """Тест одного сетевого запроса на несколько одновременных чтений"""
+        local_api_server.leads["1"] = {"id": "1", "client_name": "Shared"}
+        client = APIClient(server_url, "test_key", pooled=True, single_flight=SingleFlight())
+        barrier = threading.Barrier(8)
+        results = []
+
+        def read_lead():
+            barrier.wait()
+            results.append(client.get("/slow/1").json())
+
+        threads = [threading.Thread(target=read_lead) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        client.close()
+
+        assert results == [{"id": "1", "client_name": "Shared"}] * 8, "Все потоки должны получить ответ"
+        assert local_api_server.requests_log.count(("GET", "/slow/1")) == 1, "Должен быть один сетевой запрос"
+        assert client.get_single_flight_stats()["saved"] == 7, "Ожидалось 7 сэкономленных запросов"
+
+    @allure.story("Объединение запросов")
+    @allure.severity('MINOR')
+    def test_error_is_shared_with_waiters(self):
+        """Тест передачи исключения всем ожидающим потокам"""
+        flight = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            time.sleep(0.1)
+            raise requests.exceptions.ConnectionError("нет соединения")
+
+        def call():
+            try:
+                flight.do("key", failing)
+            except requests.exceptions.ConnectionError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        assert len(errors) == 2 and errors[0] is errors[1], "Ожидающий поток должен получить ту же ошибку"
+        assert flight.get_stats() == {"executed": 1, "saved": 1, "in_flight": 0}
+
+
+@allure.feature("API клиент")
+class TestAdaptiveRateLimiter:
+    """Тесты адаптивного ограничения скорости запросов"""
+
+    @allure.story("Ограничение скорости")
+    @allure.severity('NORMAL')
+    def test_bucket_throttles_above_rate(self):
+        """Тест ожидания токенов при превышении скорости"""
+        bucket = AdaptiveTokenBucket(rate=20, burst=1)
+        started = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        elapsed = time.monotonic() - started
+
+        metrics = bucket.get_metrics()
+        assert elapsed >= 0.18, f"5 запросов при 20 запр/с не могут пройти за {elapsed:.3f} сек"
+        assert metrics["throttled"] == 4 and metrics["throttle_wait_s"] > 0, f"Некорректные метрики: {metrics}"
+
+    @allure.story("Ограничение скорости")
+    @allure.severity('CRITICAL')
+    def test_rate_adapts_to_server_limits(self):
+        """Тест снижения скорости по 429 и заголовкам лимитов и ее роста после успехов"""
+        bucket = AdaptiveTokenBucket(rate=10, max_rate=12, increase=1.0)
+        bucket.record_response(429, {}, retry_after=0.2)
+        assert bucket.rate == 5, "429 должен уменьшать скорость вдвое"
+        assert bucket.reserve() >= 0.15, "После 429 нужно выждать Retry-After"
+
+        for status_code in (500, 503, 404):
+            bucket.record_response(status_code, {})
+        assert bucket.rate == 5, "Ошибки сервера и клиента не должны поднимать скорость"
+
+        for _ in range(100):
+            bucket.record_response(200, {})
+        assert bucket.rate == 12, "Скорость должна вырасти до максимума"
+
+        bucket.record_response(200, {"X-RateLimit-Remaining": "6", "X-RateLimit-Reset": "3"})
+        assert bucket.rate == 2, "Скорость не должна превышать остаток квоты"
+
+    @allure.story("Ограничение скорости")
+    @allure.severity('NORMAL')
+    def test_client_uses_endpoint_budgets(self, server_url):
+        """Тест выбора бюджета по эндпоинту из конфигурации"""
+        limiter = AdaptiveRateLimiter.from_config({"rate_limits": {
+            "default": {"rate": 100},
+            "endpoints": {"/leads/{id}": {"rate": 50, "burst": 2}}
+        }})
+        client = APIClient(server_url, "test_key", rate_limiter=limiter)
+        created = client.create_lead({"client_name": "Limited"})
+        for _ in range(3):
+            client.get_lead(created["id"])
+
+        metrics = client.get_rate_limit_metrics()
+        assert metrics["default"]["requests"] == 1, f"POST должен учитываться в бюджете по умолчанию: {metrics}"
+        assert metrics["/leads/{id}"]["requests"] == 3, f"GET лида должен учитываться в своем бюджете: {metrics}"
+        assert metrics["/leads/{id}"]["throttled"] == 1, "Третий запрос должен ждать токен"
+        assert AdaptiveRateLimiter.from_config({}) is None, "Без секции rate_limits ограничитель не создается"
+
+
+@allure.feature("API клиент")
+class TestAPIClientMetrics:
+    """Тесты живых метрик запросов клиента"""
+
+    @allure.story("Метрики OpenMetrics")
+    @allure.severity('NORMAL')
+    def test_requests_counted_by_endpoint_and_status(self, server_url):
+        """Тест учета запросов по эндпоинтам, статусам и времени ответа"""
+        metrics = RunMetrics()
+        client = APIClient(server_url, "test_key", metrics=metrics)
+        created = client.create_lead({"client_name": "Metrics"})
+        client.get_lead(created["id"])
+        client.get_lead("404")
+
+        assert metrics.api_requests.get(method="POST", endpoint="/leads", status="200") == 1
+        assert metrics.api_requests.get(method="GET", endpoint="/leads/{id}", status="200") == 1
+        assert metrics.api_requests.get(method="GET", endpoint="/leads/{id}", status="404") == 1
+        assert metrics.api_latency.get_count(method="GET", endpoint="/leads/{id}") == 2
+        assert metrics.api_in_flight.get() == 0, "После ответа запрос не должен числиться в работе"
+
+        unreachable = APIClient("http://127.0.0.1:9", "test_key", metrics=metrics,
+                                retry_policy=RetryPolicy(max_attempts=1), circuit_breaker=CircuitBreaker())
+        assert unreachable.get_lead(1)["status"] == "error"
+        assert metrics.api_requests.get(method="GET", endpoint="/leads/{id}", status="error") == 1
+        assert metrics.api_in_flight.get() == 0
@@ -0,0 +1,213 @@
+import pytest
+import asyncio
+import json
+import allure
+from aiohttp import web
+
+from utils.async_api_client import AsyncAPIClient, run_bounded
+from utils.lead_ingestion import create_leads_bulk
+
+
+async def start_lead_app(delay: float = 0.0):
+    """Запуск локального aiohttp приложения с API лидов"""
+    leads = {}
+    stats = {"in_flight": 0, "max_in_flight": 0}
+
+    def tracked(handler):
+        async def wrapper(request):
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+            try:
+                await asyncio.sleep(delay)
+                return await handler(request)
+            finally:
+                stats["in_flight"] -= 1
+        return wrapper
+
+    async def create(request):
+        lead = await request.json()
+        lead["id"] = str(len(leads) + 1)
+        leads[lead["id"]] = lead
+        return web.json_response({"status": "success", "id": lead["id"]})
+
+    async def detail(request):
+        lead = leads.get(request.match_info["lead_id"])
+        if lead is None:
+            return web.json_response({"status": "error", "message": "Лид не найден"}, status=404)
+        return web.json_response(lead)
+
+    async def create_async(request):
+        await request.json()
+        return web.json_response({"task_id": f"task_{len(leads) + 1}"}, status=202)
+
+    async def slow(request):
+        await asyncio.sleep(1)
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post("/leads", tracked(create))
+    app.router.add_get("/leads/{lead_id}", tracked(detail))
+    app.router.add_post("/v1/lead/create-async/", tracked(create_async))
+    app.router.add_get("/slow", slow)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}", stats
+
+
+@allure.feature("Асинхронный API клиент")
+class TestAsyncAPIClient:
+    """Тесты асинхронного API клиента"""
+
+    @allure.story("Базовые операции")
+    @allure.severity('NORMAL')
+    def test_create_and_get_lead(self):
+        """Тест создания и получения лида"""
+        async def scenario():
+            runner, url, _ = await start_lead_app()
+            try:
+                async with AsyncAPIClient(url, "test_key") as client:
+                    created = await client.create_lead({"client_name": "Async Lead"})
+                    return await client.get_lead(created["id"])
+            finally:
+                await runner.cleanup()
+
+        lead = asyncio.run(scenario())
+        assert lead["client_name"] == "Async Lead", "Данные лида не совпадают"
+
+    @allure.story("Таймауты")
+    @allure.severity('NORMAL')
+    def test_per_call_timeout(self):
+        """Тест таймаута на отдельный вызов"""
+        async def scenario():
+            runner, url, _ = await start_lead_app()
+            try:
+                async with AsyncAPIClient(url, "test_key") as client:
+                    await client.get("/slow", timeout=0.1)
+            finally:
+                await runner.cleanup()
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(scenario())
+
+    @allure.story("Ограничение конкурентности")
+    @allure.severity('NORMAL')
+    def test_run_bounded_limits_in_flight(self):
+        """Тест ограничения числа одновременных запросов"""
+        async def scenario():
+            runner, url, stats = await start_lead_app(delay=0.01)
+            try:
+                async with AsyncAPIClient(url, "test_key") as client:
+                    results = await run_bounded(
+                        (lambda i=i: client.create_lead({"client_name": f"Lead {i}"}) for i in range(200)),
+                        concurrency=20
+                    )
+                return results, stats
+            finally:
+                await runner.cleanup()
+
+        results, stats = asyncio.run(scenario())
+        assert len(results) == 200, "Получены не все результаты"
+        assert all(r["status"] == "success" for r in results), "Не все лиды созданы"
+        assert stats["max_in_flight"] <= 20, f"Превышен лимит конкурентности: {stats['max_in_flight']}"
+
+    @allure.story("Отмена")
+    @allure.severity('MINOR')
+    def test_cancellation(self):
+        """Тест отмены выполняющегося запроса"""
+        async def scenario():
+            runner, url, _ = await start_lead_app()
+            try:
+                async with AsyncAPIClient(url, "test_key") as client:
+                    task = asyncio.create_task(client.get("/slow"))
+                    await asyncio.sleep(0.1)
+                    task.cancel()
+                    await task
+            finally:
+                await runner.cleanup()
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(scenario())
+
+
+@allure.feature("Асинхронный API клиент")
+class TestBulkLeadIngestion:
+    """Тесты массового создания лидов"""
+
+    @allure.story("Массовое создание лидов")
+    @allure.severity('NORMAL')
+    def test_bulk_creation_from_jsonl(self, tmp_path):
+        """Тест потокового создания лидов из JSONL файла"""
+        input_path = tmp_path / "leads.jsonl"
+        output_path = tmp_path / "results.jsonl"
+        with open(input_path, "w", encoding="utf-8") as f:
+            for i in range(100):
+                f.write(json.dumps({"client_name": f"Bulk Lead {i}"}) + "\n")
+
+        async def scenario():
+            runner, url, stats = await start_lead_app(delay=0.005)
+            try:
+                async with AsyncAPIClient(url, "test_key") as client:
+                    summary = await create_leads_bulk(client, input_path, output_path, concurrency=10)
+                return summary, stats
+            finally:
+                await runner.cleanup()
+
+        summary, stats = asyncio.run(scenario())
+        results = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+
+        assert summary["succeeded"] == 100, f"Создано лидов: {summary['succeeded']} из 100"
+        assert len(results) == 100, "В выходном файле должны быть результаты по всем лидам"
+        assert sorted(r["index"] for r in results) == list(range(100)), "Потеряны результаты лидов"
+        assert all(r["status"] == 200 and r["lead_id"] for r in results), "Некорректный результат лида"
+        assert stats["max_in_flight"] <= 10, f"Превышен лимит конкурентности: {stats['max_in_flight']}"
+
+    @allure.story("Массовое создание лидов")
+    @allure.severity('NORMAL')
+    def test_bulk_creation_surfaces_failures(self, tmp_path):
+        """Тест ошибок открытия выходного файла и чтения входа вместо зависания"""
+        def broken_leads():
+            for i in range(50):
+                yield {"client_name": f"Broken {i}"}
+            raise RuntimeError("Входной поток оборвался")
+
+        async def scenario(leads, output_path):
+            runner, url, _ = await start_lead_app()
+            try:
+                async with AsyncAPIClient(url, "test_key") as client:
+                    return await asyncio.wait_for(
+                        create_leads_bulk(client, leads, output_path, concurrency=2, queue_size=2), timeout=10
+                    )
+            finally:
+                await runner.cleanup()
+
+        with pytest.raises(FileNotFoundError):
+            asyncio.run(scenario(({"client_name": "Lead"} for _ in range(20)), tmp_path / "missing" / "out.jsonl"))
+        with pytest.raises(RuntimeError, match="Входной поток оборвался"):
+            asyncio.run(scenario(broken_leads(), tmp_path / "results.jsonl"))
+
+    @allure.story("Массовое создание лидов")
+    @allure.severity('NORMAL')
+    def test_bulk_creation_async_endpoint(self, tmp_path):
+        """Тест массового создания через create-async"""
+        output_path = tmp_path / "results.jsonl"
+
+        async def scenario():
+            runner, url, _ = await start_lead_app()
+            try:
+                async with AsyncAPIClient(url, "test_key") as client:
+                    leads = ({"client_name": f"Async Bulk {i}"} for i in range(20))
+                    return await create_leads_bulk(client, leads, output_path, concurrency=5,
+                                                   use_async_endpoint=True)
+            finally:
+                await runner.cleanup()
+
+        summary = asyncio.run(scenario())
+        results = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+
+        assert summary["succeeded"] == 20, f"Поставлено в очередь: {summary['succeeded']} из 20"
+        assert all(r["status"] == 202 and r["lead_id"].startswith("task_") for r in results), \
+            "Для create-async ожидался статус 202 и ID задачи"
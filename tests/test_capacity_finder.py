@@ -0,0 +1,84 @@
+import pytest
+import allure
+import threading
+import time
+
+from utils.api_client import APIClient
+from utils.capacity_finder import CapacityFinder, create_probe_lead
+from utils.lead_api_server import LeadAPIServer
+from utils.resilience import CircuitBreaker, RetryPolicy
+
+
+class SingleWorkerServer:
+    """Сервер с одним обработчиком: 20 мс на запрос, не больше 50 запр/с"""
+
+    def __init__(self, service_time: float = 0.02):
+        self.service_time = service_time
+        self._lock = threading.Lock()
+
+    def handle(self):
+        with self._lock:
+            time.sleep(self.service_time)
+        return {"status": "success"}
+
+
+@allure.feature("Пропускная способность")
+class TestCapacityFinder:
+    """Тесты поиска устойчивой интенсивности и точки перегиба"""
+
+    @allure.story("Поиск предела")
+    @allure.severity('CRITICAL')
+    def test_finds_limit_of_saturated_server(self):
+        """Тест нахождения предела сервера с известной пропускной способностью"""
+        finder = CapacityFinder(slo_p99_ms=150, step_duration=0.5, start_rps=5, max_rps=200, precision=0.15)
+        result = finder.find(SingleWorkerServer().handle, name="single-worker")
+        CapacityFinder.attach_to_allure(result)
+
+        assert 30 <= result["sustainable_rps"] <= 65, f"Предел должен быть около 50 запр/с:\n" \
+                                                       f"{CapacityFinder.format_report(result)}"
+        assert not result["capped"] and "p99" in result["limit_reason"]
+        assert result["knee_rps"] is not None and result["knee_rps"] <= result["sustainable_rps"]
+        rates = [step["rate"] for step in result["steps"]]
+        assert rates == sorted(rates) and rates[:4] == [5, 10, 20, 40], f"Рост ступеней в 2 раза: {rates}"
+
+    @allure.story("Поиск предела")
+    @allure.severity('NORMAL')
+    def test_errors_and_cap(self):
+        """Тест ограничения по ошибкам и по максимальной интенсивности"""
+        def unavailable():
+            raise RuntimeError("HTTP 503")
+
+        finder = CapacityFinder(step_duration=0.2, start_rps=10, min_rps=5)
+        result = finder.find(unavailable, name="unavailable")
+        assert result["sustainable_rps"] == 0 and "ошибок" in result["limit_reason"]
+        assert result["knee_rps"] is None and [step["rate"] for step in result["steps"]] == [5, 10]
+
+        capped = CapacityFinder(step_duration=0.2, start_rps=10, max_rps=30).find(lambda: None, name="fast")
+        assert capped["capped"] and capped["sustainable_rps"] == 30
+        assert [step["rate"] for step in capped["steps"]] == [10, 20, 30]
+
+    @allure.story("Конфигурация")
+    @allure.severity('MINOR')
+    def test_settings_from_config(self):
+        """Тест настроек поиска из секции capacity"""
+        config = {"capacity": {"slo_p99_ms": 1000, "max_rps": 50,
+                               "endpoints": {"lead/detail": {"slo_p99_ms": 300}}}}
+        assert CapacityFinder.from_config(config, "lead/detail").slo_p99_ms == 300
+        assert CapacityFinder.from_config(config, "lead/create").slo_p99_ms == 1000
+        assert CapacityFinder.from_config({}).max_rps == 100
+        with pytest.raises(ValueError):
+            CapacityFinder(growth=1)
+
+    @allure.story("Конфигурация")
+    @allure.severity('NORMAL')
+    def test_probe_lead_creation(self):
+        """Тест создания лида для эндпоинтов detail и update"""
+        payload = {"lead_type": "straight", "create_method": "capacity_test", "client_name": "Capacity Test Lead",
+                   "client_phone": "+79991234567"}
+        with LeadAPIServer(api_key="test_key") as server:
+            for api_key, created in (("test_key", True), ("wrong_key", False)):
+                client = APIClient(server.url, api_key, retry_policy=RetryPolicy(max_attempts=1),
+                                   circuit_breaker=CircuitBreaker(failure_threshold=0))
+                lead_id = create_probe_lead(client, payload)
+                assert (lead_id is not None) == created, f"Ключ {api_key}: id лида {lead_id}"
+        assert create_probe_lead(client, payload) is None, "Недоступный сервер - лид не создан"
@@ -0,0 +1,156 @@
+import pytest
+import allure
+import multiprocessing
+import socket
+import threading
+import time
+
+from utils.distributed_load import LoadAgent, LoadCoordinator, read_message, send_message, split_users
+
+
+class SleepClient:
+    """Клиент агентов: отвечает с фиксированной задержкой"""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+
+    def search_leads(self, query_params):
+        time.sleep(self.delay)
+        return {"status": "success", "data": []}
+
+
+TEST_FACTORY = "tests.test_distributed_load:SleepClient"
+
+SCENARIO = {
+    "name": "distributed",
+    "duration": 1.5,
+    "virtual_users": 3,
+    "seed": 1,
+    "operations": [{"name": "search", "method": "search_leads", "args": [{"page": "${randint:1:3}"}]}]
+}
+
+
+def start_agent_thread(address, name):
+    agent = LoadAgent(address[0], address[1], name=name, connect_timeout=5, client_factories=[TEST_FACTORY])
+    thread = threading.Thread(target=agent.serve, daemon=True)
+    thread.start()
+    return thread
+
+
+def run_agent_process(host, port, name):
+    LoadAgent(host, port, name=name, client_factories=[TEST_FACTORY]).serve()
+
+
+def silent_agent(address):
+    """Агент, который отвечает на синхронизацию часов и перестает отвечать"""
+    sock = socket.create_connection(address)
+    stream = sock.makefile("rwb")
+    send_message(stream, {"type": "hello", "name": "silent"})
+    while True:
+        message = read_message(stream)
+        if message is None or message["type"] == "shutdown":
+            break
+        if message["type"] == "ping":
+            send_message(stream, {"type": "pong", "t0": message["t0"], "agent_time": time.time() + 5})
+    sock.close()
+
+
+@allure.feature("Сценарии нагрузки")
+class TestDistributedLoad:
+    """Тесты распределенной нагрузки координатор/агенты"""
+
+    @allure.story("Распределенная нагрузка")
+    @allure.severity('CRITICAL')
+    def test_agents_share_scenario_and_results_are_merged(self):
+        """Тест раздачи пользователей агентам и объединения гистограмм"""
+        with LoadCoordinator(SCENARIO, TEST_FACTORY, {"delay": 0.01},
+                             snapshot_interval=0.3, start_delay=0.3) as coordinator:
+            threads = [start_agent_thread(coordinator.address, f"agent-{i}") for i in range(2)]
+            coordinator.wait_for_agents(2, timeout=10)
+            live = []
+            summary = coordinator.run(on_snapshot=live.append)
+            LoadCoordinator.attach_to_allure(summary)
+
+        for thread in threads:
+            thread.join(timeout=5)
+            assert not thread.is_alive(), "Агент должен завершиться по команде shutdown"
+        assert sorted(agent["users"] for agent in summary["agents"].values()) == [1, 2]
+        assert summary["lost_agents"] == [] and summary["errors"] == 0
+        assert summary["workers"] == 2 and summary["operations"]["search"]["count"] == summary["total"]
+        # Три пользователя по ~10 мс на запрос в течение 1.5 сек
+        assert 250 < summary["total"] < 460, f"Неожиданное число запросов: {summary['total']}"
+        assert summary["latency_ms"]["p50"] >= 10
+        assert live and live[-1]["total"] == summary["total"]
+        assert all(abs(agent["clock_offset_ms"]) < 50 for agent in summary["agents"].values())
+
+    @allure.story("Распределенная нагрузка")
+    @allure.severity('NORMAL')
+    def test_dropped_agents_are_reported(self):
+        """Тест учета агентов, которые завершились или перестали отвечать"""
+        context = multiprocessing.get_context("spawn")
+        scenario = dict(SCENARIO, duration=3)
+        with LoadCoordinator(scenario, TEST_FACTORY, {"delay": 0.01},
+                             snapshot_interval=0.3, agent_timeout=1.0, start_delay=0.3) as coordinator:
+            healthy = start_agent_thread(coordinator.address, "healthy")
+            process = context.Process(target=run_agent_process, args=(*coordinator.address, "killed"), daemon=True)
+            process.start()
+            silent = threading.Thread(target=silent_agent, args=(coordinator.address,), daemon=True)
+            silent.start()
+            coordinator.wait_for_agents(3, timeout=30)
+
+            def kill_on_first_snapshot(summary):
+                if process.is_alive() and summary["total"] > 0:
+                    process.kill()
+
+            summary = coordinator.run(on_snapshot=kill_on_first_snapshot)
+
+        assert sorted(summary["lost_agents"]) == ["killed", "silent"]
+        assert summary["agents"]["silent"]["clock_offset_ms"] == pytest.approx(5000, abs=100)
+        assert summary["agents"]["healthy"]["rps"] > 0 and not summary["agents"]["healthy"]["lost"]
+        assert summary["total"] > 0, "Результаты оставшихся агентов должны попасть в сводку"
+        healthy.join(timeout=5)
+
+    @allure.story("Распределенная нагрузка")
+    @allure.severity('NORMAL')
+    def test_broken_connections_do_not_stop_waiting(self):
+        """Тест подключений не по протоколу: не JSON, без pong и молчащее"""
+        with LoadCoordinator(SCENARIO, TEST_FACTORY, {"delay": 0.01}, snapshot_interval=0.3,
+                             start_delay=0.3, handshake_timeout=0.5) as coordinator:
+            garbage = socket.create_connection(coordinator.address)
+            garbage.sendall(b"not json\n")
+            no_pong = socket.create_connection(coordinator.address)
+            no_pong_stream = no_pong.makefile("rwb")
+            send_message(no_pong_stream, {"type": "hello", "name": "no-pong"})
+            send_message(no_pong_stream, {"type": "snapshot"})
+            silent = socket.create_connection(coordinator.address)
+            thread = start_agent_thread(coordinator.address, "healthy")
+            coordinator.wait_for_agents(1, timeout=10)
+            summary = coordinator.run()
+
+        for sock in (garbage, no_pong, silent):
+            sock.close()
+        thread.join(timeout=5)
+        assert list(summary["agents"]) == ["healthy"] and summary["total"] > 0
+
+    @allure.story("Распределенная нагрузка")
+    @allure.severity('CRITICAL')
+    def test_agent_rejects_unknown_client_factory(self):
+        """Тест отказа агента создавать клиента фабрикой не из разрешенного списка"""
+        with LoadCoordinator(SCENARIO, "os:system", {"command": "exit 1"}, snapshot_interval=0.3,
+                             start_delay=0.3) as coordinator:
+            agent = LoadAgent(*coordinator.address, name="strict", connect_timeout=5)
+            thread = threading.Thread(target=agent.serve, daemon=True)
+            thread.start()
+            coordinator.wait_for_agents(1, timeout=10)
+            summary = coordinator.run()
+
+        thread.join(timeout=5)
+        assert summary["total"] == 0 and len(summary["agent_errors"]) == 1
+        assert "os:system" in summary["agent_errors"][0], f"Некорректная ошибка: {summary['agent_errors']}"
+
+    @allure.story("Распределенная нагрузка")
+    @allure.severity('MINOR')
+    def test_split_users(self):
+        """Тест распределения пользователей между агентами"""
+        assert split_users(10, 3) == [4, 3, 3]
+        assert split_users(2, 2) == [1, 1]
@@ -0,0 +1,120 @@
+import pytest
+import allure
+import time
+
+import requests
+
+from utils.api_client import APIClient
+from utils.fault_proxy import Fault, FaultRule
+from utils.fixture_site import FixtureSiteServer
+from utils.latency_models import ErrorBurstModel, UniformLatency
+from utils.lead_api_server import LeadAPIServer
+from utils.resilience import CircuitBreaker, RetryPolicy
+
+LEAD = {
+    "lead_type": "straight",
+    "create_method": "quiz",
+    "client_name": "Fault Proxy Lead",
+    "client_phone": "+79991234567",
+}
+
+
+@pytest.fixture
+def lead_api_server():
+    """Локальный сервер API лидов без задержек"""
+    with LeadAPIServer(api_key="test_key") as server:
+        yield server
+
+
+@pytest.fixture
+def fixture_site():
+    """Локальный сайт без задержек"""
+    with FixtureSiteServer() as site:
+        yield site
+
+
+def api_client(url: str, max_attempts: int = 3) -> APIClient:
+    retry_policy = RetryPolicy(max_attempts=max_attempts, backoff_base=0.01, jitter=False)
+    return APIClient(url, "test_key", retry_policy=retry_policy, circuit_breaker=CircuitBreaker())
+
+
+@allure.feature("Прокси с неисправностями")
+class TestFaultProxy:
+    """Тесты прокси с внесением неисправностей"""
+
+    @allure.story("Расписание неисправностей")
+    @allure.severity('CRITICAL')
+    def test_schedule_and_retry_amplification(self, fault_proxy, lead_api_server):
+        """Тест расписания по маршруту и числа повторов APIClient при серии 503"""
+        errors = Fault(errors=ErrorBurstModel(1.0, burst_length=1))
+        slow = Fault(latency=UniformLatency(0.1, 0.1))
+        proxy = fault_proxy(lead_api_server.url, [
+            FaultRule("/v1/lead/detail/*", errors, method="GET", count=2),
+            FaultRule("/v1/lead/detail/*", slow, method="GET", after=2, count=1),
+        ])
+        client = api_client(proxy.url)
+        lead_id = client.post("/v1/lead/create/", json=LEAD).json()["id"]
+
+        started = time.perf_counter()
+        detail = client.get(f"/v1/lead/detail/{lead_id}", strict=True)
+        elapsed = time.perf_counter() - started
+        assert detail.status_code == 200 and detail.json()["UF_NAME"] == LEAD["client_name"]
+        assert elapsed >= 0.1, "Третья попытка идет с задержкой 100 мс"
+        assert client.get(f"/v1/lead/detail/{lead_id}", strict=True).ok
+        client.close()
+
+        summary = proxy.get_summary()
+        route = summary["GET /v1/lead/detail/{id}"]
+        assert route["count"] == 4, "Первый вызов дал три обмена из-за повторов, второй - один"
+        assert route["statuses"] == {"503": 2, "200": 2} and route["faults"] == {"error": 2, "latency": 1}
+        assert summary["POST /v1/lead/create/"]["faults"] == {}
+        assert proxy.get_stats()["upstream_requests"] == 3, "Ответы с ошибкой не доходят до стенда"
+        assert [exchange["status"] for exchange in proxy.exchanges] == [200, 503, 503, 200, 200]
+        assert route["max"] >= 100 > route["p50"]
+
+    @allure.story("Сетевые неисправности")
+    @allure.severity('CRITICAL')
+    def test_connection_reset_and_truncated_body(self, fault_proxy, lead_api_server):
+        """Тест обрыва соединения и обрезанного тела ответа"""
+        proxy = fault_proxy(lead_api_server.url, [
+            FaultRule("/v1/", Fault(reset_probability=1.0), count=1),
+            FaultRule("/v1/", Fault(truncate_probability=1.0, truncate_ratio=0.3), after=1, count=1),
+        ])
+        with pytest.raises(requests.exceptions.ConnectionError):
+            requests.get(f"{proxy.url}/v1/", timeout=5)
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            requests.get(f"{proxy.url}/v1/", timeout=5)
+
+        # Повтор APIClient переживает одиночный обрыв
+        proxy.set_rules([FaultRule("/v1/", Fault(reset_probability=1.0), count=1)])
+        proxy.reset_exchanges()
+        client = api_client(proxy.url)
+        assert client.get("/v1/", strict=True).json()["message"] == "Liner API"
+        client.close()
+
+        statuses = [exchange["status"] for exchange in proxy.exchanges]
+        assert statuses == [None, 200] and proxy.get_stats()["faults"]["reset"] == 2
+        assert proxy.get_stats()["faults"]["truncate"] == 1
+
+    @allure.story("Сетевые неисправности")
+    @allure.severity('NORMAL')
+    def test_bandwidth_limit_and_pass_through(self, fault_proxy, fixture_site):
+        """Тест ограничения полосы и прозрачной передачи кук и перенаправлений"""
+        proxy = fault_proxy(fixture_site.url, [FaultRule("/leads/", Fault(bandwidth=500_000), method="GET")])
+        session = requests.Session()
+        login = session.post(f"{proxy.url}/auth/login/", data={"login": "user@example.com", "password": "x"},
+                             allow_redirects=False, timeout=10)
+        assert login.status_code == 302 and login.headers["Location"] == "/leads/"
+
+        started = time.perf_counter()
+        page = session.get(f"{proxy.url}/leads/", timeout=10)
+        elapsed = time.perf_counter() - started
+        assert page.status_code == 200 and 'id="filter-m-form"' in page.text
+        expected = len(page.content) / 500_000
+        assert expected * 0.8 <= elapsed < expected * 2 + 0.5, f"Ожидалось около {expected:.2f} сек: {elapsed:.2f}"
+
+        proxy.clear_rules()
+        started = time.perf_counter()
+        assert session.get(f"{proxy.url}/leads/", timeout=10).ok
+        assert time.perf_counter() - started < expected / 2, "Без правил ответ не ограничивается"
+        assert proxy.exchanges[1]["bytes"] == len(page.content) and proxy.exchanges[1]["faults"] == ["bandwidth"]
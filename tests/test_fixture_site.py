@@ -0,0 +1,114 @@
+import pytest
+import allure
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from utils.latency_models import ErrorBurstModel, SimulatedBackend, UniformLatency
+from utils.fixture_site import SESSION_COOKIE, FixtureSiteServer, generate_leads
+
+USERS = {"operator@example.com": "secret"}
+
+
+def login(site: FixtureSiteServer, email: str = "operator@example.com", password: str = "secret") -> requests.Session:
+    session = requests.Session()
+    session.post(f"{site.url}/auth/login/", data={"login": email, "password": password, "remember": "1"}, timeout=10)
+    return session
+
+
+@allure.feature("Локальный сайт")
+class TestFixtureSite:
+    """Тесты локального сайта из сохраненной верстки"""
+
+    @allure.story("Авторизация")
+    @allure.severity('CRITICAL')
+    def test_login_flow(self):
+        """Тест формы авторизации, входа, страницы лидов и выхода"""
+        with FixtureSiteServer(users=USERS) as site:
+            auth_page = requests.get(f"{site.url}/auth", timeout=10).text
+            assert "<form action=\"/auth/login/\" method=\"post\" data-skip=\"true\">" in auth_page
+            for field in ('name="login"', 'name="password"', 'name="remember"', 'href="/auth/forgot/"', "Войти"):
+                assert field in auth_page, f"На странице авторизации нет {field}"
+
+            assert SESSION_COOKIE not in login(site, password="wrong").cookies, "Неверный пароль не дает сессию"
+            denied = requests.post(f"{site.url}/auth/login/", data={"login": "operator@example.com", "password": "x"})
+            assert denied.url.endswith("/auth/login/") and "Неверный логин или пароль" in denied.text
+
+            session = login(site)
+            leads_page = session.get(f"{site.url}/auth/leads/", timeout=10)
+            assert leads_page.url == f"{site.url}/leads/", "{baseUrl}/leads ведет на страницу лидов"
+            assert 'id="filter-m-form"' in leads_page.text and 'id="filter-m-apply-btn"' in leads_page.text
+            assert leads_page.text.count("<tr><td>") == 50
+            assert 'class="user-settings-dropdown"' in leads_page.text and 'href="/auth/logout/"' in leads_page.text
+
+            style = session.get(f"{site.url}/static/site.css", timeout=10)
+            assert style.headers["Content-Type"].startswith("text/css") and ".filter-box" in style.text
+
+            assert session.get(f"{site.url}/auth/logout/", timeout=10).url == f"{site.url}/auth/"
+            assert session.get(f"{site.url}/leads/", timeout=10).url == f"{site.url}/auth/"
+            assert requests.get(f"{site.url}/leads/list/", timeout=10).status_code == 401
+
+    @allure.story("Фильтр лидов")
+    @allure.severity('NORMAL')
+    def test_leads_filter(self):
+        """Тест отбора лидов по полям формы фильтра"""
+        leads = generate_leads(50, seed=7)
+        assert leads == generate_leads(50, seed=7), "Набор лидов зависит только от seed"
+
+        with FixtureSiteServer(leads_count=50, seed=7) as site:
+            session = login(site)
+            url = f"{site.url}/leads/list/"
+            everything = session.get(url, params={"type": "all"}, timeout=10).json()
+            assert everything["recordsTotal"] == everything["recordsFiltered"] == 50
+
+            straight = session.get(url, params={"type": "straight"}, timeout=10).json()["data"]
+            assert straight == [lead for lead in leads if lead["type"] == "straight"]
+
+            statuses = ["primary", "danger"]
+            by_status = session.get(url, params={"status[]": statuses}, timeout=10).json()["data"]
+            assert by_status == [lead for lead in leads if lead["status"] in statuses]
+
+            single = session.get(url, params={"id": "7"}, timeout=10).json()
+            assert single["recordsFiltered"] == 1 and single["data"][0]["external_id"] == 100007
+
+    @allure.story("Задержки")
+    @allure.severity('CRITICAL')
+    def test_delays_do_not_block_parallel_pages(self):
+        """Тест задержек по операциям и параллельной загрузки страниц"""
+        backend = SimulatedBackend(UniformLatency(0.0, 0.0), operations={"leads": UniformLatency(0.3, 0.3)})
+        with FixtureSiteServer(backend=backend) as site:
+            session = login(site)
+            started = time.perf_counter()
+            session.get(f"{site.url}/static/site.js", timeout=10)
+            assert time.perf_counter() - started < 0.2, "Статика без задержки"
+
+            cookies = {SESSION_COOKIE: session.cookies[SESSION_COOKIE]}
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=20) as executor:
+                statuses = list(executor.map(
+                    lambda _: requests.get(f"{site.url}/leads/", cookies=cookies, timeout=10).status_code, range(20)
+                ))
+            elapsed = time.perf_counter() - started
+            stats = site.get_stats()
+
+        assert statuses == [200] * 20
+        assert 0.3 <= elapsed < 1.5, f"Задержки страниц должны идти параллельно: {elapsed:.2f} сек"
+        # Еще одну страницу лидов открывает перенаправление после входа
+        assert stats["requests"]["leads"] == 21 and stats["max_in_flight"] > 1
+
+    @allure.story("Задержки")
+    @allure.severity('NORMAL')
+    def test_profile_and_injected_errors(self):
+        """Тест профиля из конфигурации и внесенных ошибок"""
+        profile = {"latency": {"median_ms": 1, "sigma": 0.1}, "endpoints": {"auth": {"median_ms": 50, "sigma": 0.1}},
+                   "seed": 1}
+        with FixtureSiteServer.from_profile(profile) as site:
+            started = time.perf_counter()
+            assert requests.get(f"{site.url}/auth/", timeout=10).status_code == 200
+            assert time.perf_counter() - started >= 0.04
+
+        backend = SimulatedBackend(UniformLatency(0.0, 0.0), errors=ErrorBurstModel(1.0, burst_length=2))
+        with FixtureSiteServer(backend=backend, error_status=502) as site:
+            responses = [requests.get(f"{site.url}/auth/", timeout=10).status_code for _ in range(3)]
+            assert responses == [502] * 3 and site.get_stats()["injected_errors"] == 3
@@ -0,0 +1,57 @@
+import pytest
+import allure
+import math
+import random
+
+from utils.latency_histogram import LatencyHistogram
+
+
+@allure.feature("Гистограмма задержек")
+class TestLatencyHistogram:
+    """Тесты HDR гистограммы задержек"""
+
+    @allure.story("Перцентили")
+    @allure.severity('CRITICAL')
+    def test_percentiles_within_precision(self):
+        """Тест точности перцентилей при двух значащих цифрах"""
+        rng = random.Random(42)
+        values = [int(rng.lognormvariate(10, 1.5)) for _ in range(20000)]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        ordered = sorted(values)
+        for percentile in (50, 90, 99, 99.9):
+            exact = ordered[math.ceil(percentile / 100 * len(ordered)) - 1]
+            assert histogram.get_value_at_percentile(percentile) == pytest.approx(exact, rel=0.01), \
+                f"Перцентиль {percentile} выходит за пределы точности"
+        assert histogram.get_value_at_percentile(100) == max(values), "Максимум должен храниться точно"
+        assert histogram.total_count == len(values)
+
+    @allure.story("Coordinated omission")
+    @allure.severity('NORMAL')
+    def test_coordinated_omission_correction(self):
+        """Тест досчета пропущенных запросов во время долгого ответа"""
+        histogram = LatencyHistogram()
+        for _ in range(99):
+            histogram.record_seconds(0.01, expected_interval=0.1)
+        histogram.record_seconds(1.0, expected_interval=0.1)
+
+        assert histogram.total_count == 109, "Долгий ответ должен добавить 9 пропущенных значений"
+        assert histogram.get_percentiles()["p90"] > 10, "С поправкой хвост должен отражать остановку"
+
+    @allure.story("Объединение")
+    @allure.severity('NORMAL')
+    def test_merge_and_serialization(self):
+        """Тест объединения гистограмм и передачи через словарь"""
+        first, second = LatencyHistogram(), LatencyHistogram()
+        for value in range(1, 1001):
+            (first if value % 2 else second).record(value)
+
+        merged = LatencyHistogram.from_dict(first.to_dict())
+        merged.add(LatencyHistogram.from_dict(second.to_dict()))
+
+        assert merged.total_count == 1000 and merged.min_value == 1 and merged.max_value == 1000
+        assert merged.get_value_at_percentile(50) == pytest.approx(500, rel=0.01)
+        with pytest.raises(ValueError):
+            merged.add(LatencyHistogram(significant_digits=3))
@@ -0,0 +1,127 @@
+import pytest
+import allure
+import threading
+import time
+
+from utils.latency_histogram import LatencyHistogram
+from utils.latency_models import (
+    BimodalLatency, ErrorBurstModel, LogNormalLatency, RealClock, SimulatedBackend, UniformLatency, VirtualClock
+)
+from utils.workload import WorkloadEngine
+
+
+def _percentiles(backend: SimulatedBackend, operation: str, calls: int):
+    histogram = LatencyHistogram()
+    for _ in range(calls):
+        delay, _ = backend.call(operation)
+        histogram.record_seconds(delay)
+    return histogram.get_percentiles()
+
+
+class SimulatedClient:
+    """Клиент сценария поверх имитации сервера"""
+
+    def __init__(self, backend: SimulatedBackend):
+        self.backend = backend
+
+    def search_leads(self, query_params):
+        _, failed = self.backend.call("search_leads")
+        return {"status": "error" if failed else "success"}
+
+
+@allure.feature("Модели задержек")
+class TestLatencyModels:
+    """Тесты моделей задержек, ошибок и виртуального времени"""
+
+    @allure.story("Виртуальное время")
+    @allure.severity('CRITICAL')
+    def test_virtual_clock_does_not_wait(self):
+        """Тест сдвига виртуальных часов без реального ожидания"""
+        clock = VirtualClock()
+        started = time.perf_counter()
+        clock.sleep(3600)
+        assert clock.now() == 3600 and time.perf_counter() - started < 0.1
+
+        measured = []
+
+        def worker():
+            begin = clock.now()
+            clock.sleep(2)
+            measured.append(clock.now() - begin)
+
+        clock.sync()
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert measured == [2, 2, 2], "Параллельные задержки не должны суммироваться"
+        assert clock.sync() == 3602, "После ожидания потоков время равно самому позднему из них"
+
+    @allure.story("Детерминированность")
+    @allure.severity('CRITICAL')
+    def test_same_seed_gives_same_percentiles(self):
+        """Тест совпадения перцентилей при одинаковом seed"""
+        model = LogNormalLatency(0.05, sigma=0.4, spike_probability=0.02, spike_multiplier=20)
+        first = _percentiles(SimulatedBackend(model, seed=1), "get_lead", 2000)
+        second = _percentiles(SimulatedBackend(model, seed=1), "get_lead", 2000)
+        other = _percentiles(SimulatedBackend(model, seed=2), "get_lead", 2000)
+
+        assert first == second, "Перцентили с одним seed должны совпадать"
+        assert first != other
+        assert first["p50"] == pytest.approx(50, rel=0.1), f"Медиана должна быть около 50 мс: {first}"
+        assert first["p99.9"] > 5 * first["p90"], f"Всплески должны давать тяжелый хвост: {first}"
+
+    @allure.story("Распределения")
+    @allure.severity('NORMAL')
+    def test_bimodal_latency_and_operation_models(self):
+        """Тест смеси распределений и моделей отдельных операций"""
+        backend = SimulatedBackend(
+            UniformLatency(0.01, 0.02),
+            operations={"search_leads": BimodalLatency(UniformLatency(0.01, 0.02), UniformLatency(1, 2), 0.2)},
+            seed=5
+        )
+        delays = [backend.call("search_leads")[0] for _ in range(1000)]
+        slow = sum(1 for delay in delays if delay >= 1)
+        assert 150 < slow < 250, f"Доля медленных ответов должна быть около 20%: {slow}"
+        assert all(0.01 <= backend.call("get_lead")[0] <= 0.02 for _ in range(100))
+
+    @allure.story("Ошибки")
+    @allure.severity('NORMAL')
+    def test_errors_come_in_bursts(self):
+        """Тест серийных ошибок"""
+        backend = SimulatedBackend(UniformLatency(0.01, 0.01), errors=ErrorBurstModel(0.02, burst_length=4), seed=9)
+        failures = [backend.call("create_lead")[1] for _ in range(2000)]
+        runs, current = [], 0
+        for failed in failures + [False]:
+            if failed:
+                current += 1
+            elif current:
+                runs.append(current)
+                current = 0
+
+        assert runs, "Ожидались серии ошибок"
+        assert all(run % 4 == 0 for run in runs), f"Ошибки должны идти сериями по 4: {runs}"
+
+    @allure.story("Виртуальное время")
+    @allure.severity('NORMAL')
+    def test_workload_runs_in_virtual_time(self):
+        """Тест выполнения сценария в виртуальном времени"""
+        scenario = {
+            "name": "virtual",
+            "duration": 600,
+            "think_time": {"min": 1.0, "max": 1.0},
+            "operations": [{"name": "search", "method": "search_leads", "args": [{}]}]
+        }
+        summaries = []
+        for _ in range(2):
+            backend = SimulatedBackend(UniformLatency(0.1, 0.3), seed=3)
+            started = time.perf_counter()
+            summaries.append(WorkloadEngine(SimulatedClient(backend), scenario, seed=3,
+                                            clock=backend.clock).run(virtual_users=1))
+            assert time.perf_counter() - started < 5, "10 минут сценария должны пройти без реального ожидания"
+
+        assert summaries[0]["duration_s"] == pytest.approx(600, abs=1.5)
+        assert 450 < summaries[0]["total"] < 540, f"Около 600 / 1.2 вызовов: {summaries[0]['total']}"
+        assert summaries[0]["latency_ms"] == summaries[1]["latency_ms"], "Повторный прогон должен совпадать"
+        assert isinstance(SimulatedBackend(clock=RealClock()).clock, RealClock)
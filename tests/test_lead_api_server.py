@@ -0,0 +1,155 @@
+import pytest
+import asyncio
+import allure
+import time
+
+from utils.api_client import APIClient
+from utils.async_api_client import AsyncAPIClient, run_bounded
+from utils.capacity_finder import endpoint_call
+from utils.latency_histogram import LatencyHistogram
+from utils.latency_models import ErrorBurstModel, SimulatedBackend, UniformLatency
+from utils.lead_api_server import LeadAPIServer
+from utils.resilience import RetryPolicy
+from utils.workload import WorkloadEngine, load_scenario
+
+LEAD = {
+    "lead_type": "straight",
+    "create_method": "quiz",
+    "client_name": "Stand-in Lead",
+    "client_phone": "+79991234567",
+    "order_id": 2640
+}
+
+
+@pytest.fixture
+def lead_api_server():
+    """Локальный сервер API лидов без задержек"""
+    with LeadAPIServer(api_key="test_key", async_delay=0.05) as server:
+        yield server
+
+
+@allure.feature("Локальный сервер API лидов")
+class TestLeadAPIServer:
+    """Тесты локальной замены Liner API лидов"""
+
+    @allure.story("Маршруты API")
+    @allure.severity('CRITICAL')
+    def test_lead_lifecycle_through_api_client(self, lead_api_server):
+        """Тест создания, получения и обновления лида через APIClient"""
+        client = APIClient(lead_api_server.url, "test_key", retry_policy=RetryPolicy(max_attempts=1))
+        created = client.post("/v1/lead/create/", json={**LEAD, "external_id": "ext-1"})
+        assert created.status_code == 200 and created.json()["status"] == "success"
+        lead_id = created.json()["id"]
+
+        assert client.put(f"/v1/lead/update/{lead_id}", json={"status": "in_work"}).ok
+        detail = client.get(f"/v1/lead/detail/{lead_id}", strict=True).json()
+        assert detail["UF_NAME"] == LEAD["client_name"] and detail["status"] == "in_work"
+
+        accepted = client.post("/v1/lead/create-async/", json=LEAD)
+        assert accepted.status_code == 202 and "task_id" in accepted.json()
+        time.sleep(0.2)
+        assert lead_api_server.get_stats()["leads"] == 2, "Лид из create-async должен появиться"
+        client.close()
+
+    @allure.story("Маршруты API")
+    @allure.severity('CRITICAL')
+    def test_client_lead_methods_and_scenario(self, lead_api_server):
+        """Тест методов APIClient по /leads и сценария нагрузки без ответов 404"""
+        client = APIClient(lead_api_server.url, "test_key")
+        lead_id = client.create_lead({**LEAD, "external_id": "ext-leads"})["id"]
+        assert client.get_lead(lead_id, strict=True)["UF_EXTERNAL_ID"] == "ext-leads"
+        assert client.update_lead(lead_id, {"status": "in_progress"})["status"] == "success"
+        found = client.search_leads({"status": "in_progress", "page": 1, "limit": 10})
+        assert [lead["id"] for lead in found["data"]] == [lead_id] and found["pagination"]["pages"] == 1
+        assert client.delete_lead(lead_id)["status"] == "success"
+        assert client.get_lead(lead_id, strict=True)["status"] == "error"
+
+        summary = WorkloadEngine(client, load_scenario("config/scenarios/typical_day.json")).run(
+            duration=1.5, virtual_users=4
+        )
+        client.close()
+        assert summary["errors"] == 0, f"Операции сценария не должны получать ошибки: {summary['operations']}"
+        assert summary["operations"]["search"]["count"] > 0 and summary["operations"]["quiz_burst"]["count"] > 0
+        assert lead_api_server.get_stats()["requests"]["lead/search"] == \
+            summary["operations"]["search"]["count"] + summary["operations"]["list"]["count"] + 1
+
+    @allure.story("Маршруты API")
+    @allure.severity('NORMAL')
+    def test_error_responses(self, lead_api_server):
+        """Тест ответов на некорректные запросы"""
+        client = APIClient(lead_api_server.url, "test_key", retry_policy=RetryPolicy(max_attempts=1))
+        invalid = {**LEAD, "client_name": 12345, "order_id": "not_a_number"}
+        assert client.post("/v1/lead/create/", json={}).status_code == 400
+        assert client.post("/v1/lead/create/", json={"lead_type": "straight"}).status_code == 400
+        assert client.post("/v1/lead/create/", json=invalid).status_code == 422
+        assert client.post("/v1/lead/create/", json={**LEAD, "external_id": "dup"}).status_code == 200
+        assert client.post("/v1/lead/create/", json={**LEAD, "external_id": "dup"}).status_code == 409
+        assert client.get("/v1/lead/detail/999999999999", strict=True).status_code == 404
+        assert APIClient(lead_api_server.url, "INVALID_KEY").get("/v1/lead/detail/1", strict=True).status_code == 401
+        client.close()
+
+    @allure.story("Конкурентность")
+    @allure.severity('CRITICAL')
+    def test_thousands_of_concurrent_connections(self):
+        """Тест обслуживания тысяч одновременных соединений"""
+        backend = SimulatedBackend(UniformLatency(0.5, 0.5))
+        with LeadAPIServer(backend) as server:
+            async def scenario():
+                async with AsyncAPIClient(server.url, "test_key", max_connections=2000) as client:
+                    return await run_bounded(
+                        (lambda: client.create_lead_async(LEAD) for _ in range(2000)), concurrency=2000
+                    )
+
+            started = time.perf_counter()
+            results = asyncio.run(scenario())
+            elapsed = time.perf_counter() - started
+            stats = server.get_stats()
+
+        assert all(isinstance(r, dict) and "task_id" in r for r in results), "Не все запросы обработаны"
+        assert stats["max_in_flight"] >= 1000, f"Запросы должны обрабатываться одновременно: {stats}"
+        assert elapsed < 30, f"2000 запросов по 0.5 сек заняли {elapsed:.1f} сек"
+
+    @allure.story("Профили задержек и ошибок")
+    @allure.severity('NORMAL')
+    def test_latency_and_error_profile(self):
+        """Тест задержек и ошибок по профилю при нагрузке из capacity_finder"""
+        profile = {"latency": {"median_ms": 20, "sigma": 0.2}, "endpoints": {"lead/detail": {"median_ms": 60}},
+                   "errors": {"burst_probability": 0.05, "burst_length": 2}, "seed": 7}
+        with LeadAPIServer.from_profile(profile) as server:
+            client = APIClient(server.url, "test_key", pooled=True, retry_policy=RetryPolicy(max_attempts=1))
+            lead_id = None
+            while lead_id is None:
+                response = client.post("/v1/lead/create/", json=LEAD)
+                lead_id = response.json().get("id") if response.ok else None
+            call = endpoint_call(client, "lead/detail", LEAD, lead_id)
+            histogram = LatencyHistogram()
+            failures = 0
+            for _ in range(100):
+                started = time.perf_counter()
+                try:
+                    call()
+                except RuntimeError as e:
+                    assert "503" in str(e)
+                    failures += 1
+                histogram.record_seconds(time.perf_counter() - started)
+            stats = server.get_stats()
+            client.close()
+
+        assert failures == stats["injected_errors"] - (stats["requests"]["lead/create"] - 1)
+        assert 0 < failures < 30, f"Ожидались серийные ошибки около 10%: {failures}"
+        assert 55 <= histogram.get_percentiles()["p50"] <= 90, "Медиана detail должна быть около 60 мс"
+
+    @allure.story("Профили задержек и ошибок")
+    @allure.severity('MINOR')
+    def test_errors_are_reproducible(self):
+        """Тест повторяемости ошибок при одинаковом seed"""
+        def statuses():
+            backend = SimulatedBackend(UniformLatency(0, 0), errors=ErrorBurstModel(0.1, burst_length=3), seed=11)
+            with LeadAPIServer(backend, error_status=500) as server:
+                client = APIClient(server.url, "test_key", retry_policy=RetryPolicy(max_attempts=1))
+                codes = [client.post("/v1/lead/create/", json=LEAD).status_code for _ in range(50)]
+                client.close()
+            return codes
+
+        first = statuses()
+        assert first == statuses() and 500 in first and 200 in first
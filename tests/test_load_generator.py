@@ -0,0 +1,45 @@
+import pytest
+import allure
+import time
+
+from utils.load_generator import OpenLoopLoadGenerator
+
+
+@allure.feature("Генератор нагрузки")
+class TestOpenLoopLoadGenerator:
+    """Тесты генератора нагрузки с открытым циклом"""
+
+    @allure.story("Открытая нагрузка")
+    @allure.severity('CRITICAL')
+    def test_rate_is_kept_when_server_is_slow(self):
+        """Тест сохранения интенсивности при медленных ответах"""
+        generator = OpenLoopLoadGenerator(rate=50, duration=0.5, max_in_flight=50)
+        summary = generator.run(time.sleep, 0.2)
+
+        assert summary["sent"] == 25, f"Ожидалось 25 запросов, отправлено {summary['sent']}"
+        assert summary["dropped"] == 0, "При достаточном числе слотов запросы не должны отбрасываться"
+        assert summary["duration_s"] < 0.9, "Медленные ответы не должны замедлять отправку"
+        assert summary["achieved_rps"] == pytest.approx(50, rel=0.2), f"Интенсивность {summary['achieved_rps']:.1f}"
+
+    @allure.story("Открытая нагрузка")
+    @allure.severity('NORMAL')
+    def test_requests_over_in_flight_cap_are_dropped(self):
+        """Тест отбрасывания запросов при исчерпании слотов"""
+        generator = OpenLoopLoadGenerator(rate=100, total_requests=20, max_in_flight=5)
+        summary = generator.run(time.sleep, 0.5)
+
+        assert summary["sent"] == 5, "Отправлено должно быть не больше max_in_flight запросов"
+        assert summary["dropped"] == 15, f"Ожидалось 15 отброшенных запросов: {summary['dropped']}"
+        assert all(r["success"] for r in summary["results"]), "Все отправленные запросы должны быть успешными"
+
+    @allure.story("Открытая нагрузка")
+    @allure.severity('MINOR')
+    def test_poisson_schedule_is_reproducible(self):
+        """Тест воспроизводимости пуассоновского расписания при заданном seed"""
+        first = list(OpenLoopLoadGenerator(rate=10, total_requests=100, arrival="poisson", seed=1).schedule())
+        second = list(OpenLoopLoadGenerator(rate=10, total_requests=100, arrival="poisson", seed=1).schedule())
+
+        assert first == second, "Расписание с одинаковым seed должно совпадать"
+        assert first[-1] / 99 == pytest.approx(0.1, rel=0.3), "Средний интервал должен соответствовать интенсивности"
+        with pytest.raises(ValueError):
+            OpenLoopLoadGenerator(rate=10)
@@ -0,0 +1,93 @@
+import pytest
+import allure
+import csv
+import sqlite3
+import sys
+import time
+
+from utils.lead_api_server import LeadAPIServer
+from utils.load_profiles import LoadProfile, main, render_timeline_svg, run_profile
+
+
+@allure.feature("Генератор нагрузки")
+class TestLoadProfiles:
+    """Тесты профилей нагрузки и посекундного временного ряда"""
+
+    @allure.story("Профили нагрузки")
+    @allure.severity('NORMAL')
+    def test_profile_rates(self):
+        """Тест целевой интенсивности профилей во времени"""
+        ramp = LoadProfile.ramp(0, 100, 10)
+        steps = LoadProfile.steps([10, 20, 30], 5)
+        spike = LoadProfile.spike(10, 100, duration=30, spike_start=10, spike_duration=5)
+        soak = LoadProfile.from_dict({"type": "soak", "rps": 50, "duration": 3600, "warmup": 60})
+
+        assert ramp.rate_at(5) == 50 and ramp.duration == 10
+        assert [steps.rate_at(t) for t in (0, 5, 14.9, 15)] == [10, 20, 30, 0]
+        assert [spike.rate_at(t) for t in (9, 12, 20)] == [10, 100, 10] and spike.duration == 30
+        assert soak.rate_at(30) == 25 and soak.rate_at(1800) == 50 and soak.peak_rate == 50
+        with pytest.raises(ValueError):
+            LoadProfile.from_dict({"type": "unknown"})
+
+    @allure.story("Временной ряд")
+    @allure.severity('CRITICAL')
+    def test_steps_are_recorded_per_second(self, tmp_path):
+        """Тест записи посекундной пропускной способности в SQLite"""
+        profile = LoadProfile.steps([20, 40], step_duration=1)
+        database = tmp_path / "timeseries.sqlite"
+        summary, recorder = run_profile(profile, time.sleep, 0.01, timeseries_path=database)
+        rows = recorder.rows()
+        recorder.attach_to_allure()
+        recorder.close()
+
+        assert summary["sent"] == 60 and summary["dropped"] == 0, f"Некорректная сводка: {summary}"
+        assert [row["target_rps"] for row in rows[:2]] == [20, 40], "Целевая интенсивность должна писаться по секундам"
+        assert rows[0]["throughput"] == pytest.approx(20, abs=3) and rows[1]["throughput"] == pytest.approx(40, abs=3)
+        assert all(row["p50_ms"] >= 10 for row in rows if row["throughput"]), "Перцентили должны учитывать задержку"
+        with sqlite3.connect(database) as db:
+            assert db.execute("SELECT COUNT(*) FROM timeseries").fetchone()[0] == len(rows)
+
+    @allure.story("Временной ряд")
+    @allure.severity('NORMAL')
+    def test_dropped_requests_are_recorded_per_second(self):
+        """Тест учета отброшенных генератором запросов в посекундном ряду"""
+        profile = LoadProfile.steps([20], step_duration=2)
+        summary, recorder = run_profile(profile, time.sleep, 0.3, max_in_flight=1)
+        rows = recorder.rows()
+        recorder.close()
+
+        assert summary["dropped"] > 20, f"При одном слоте большая часть запросов отбрасывается: {summary}"
+        assert sum(row["dropped"] for row in rows) == summary["dropped"], "Все отброшенные запросы должны быть в ряду"
+        assert rows[0]["dropped"] > 0 and rows[1]["dropped"] > 0, "Отброшенные запросы учитываются по секундам"
+
+    @allure.story("Запуск из командной строки")
+    @allure.severity('NORMAL')
+    def test_cli_writes_timeseries(self, tmp_path, monkeypatch):
+        """Тест запуска профиля против локального сервера API лидов"""
+        output = tmp_path / "ramp.sqlite"
+        with LeadAPIServer() as server:
+            monkeypatch.setattr(sys, "argv", [
+                "load_profiles", "--profile", '{"type": "ramp", "start_rps": 5, "end_rps": 15, "duration": 2}',
+                "--target", server.url, "--endpoint", "lead/create", "--output", str(output)
+            ])
+            main()
+            created = server.get_stats()["requests"]["lead/create"]
+
+        with open(output.with_suffix(".csv"), encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert created == pytest.approx(20, abs=2), f"Профиль должен отправить около 20 запросов: {created}"
+        assert sum(int(row["throughput"]) for row in rows) == created and "dropped" in rows[0]
+        with sqlite3.connect(output) as db:
+            assert db.execute("SELECT COUNT(*) FROM timeseries").fetchone()[0] == len(rows)
+
+    @allure.story("Временной ряд")
+    @allure.severity('MINOR')
+    def test_timeline_svg(self):
+        """Тест построения SVG графика"""
+        rows = [{"second": s, "target_rps": 10.0, "throughput": 10, "errors": s % 2, "error_rate": 0.0,
+                 "dropped": int(s == 4), "p50_ms": 5.0, "p90_ms": 8.0, "p99_ms": 9.0 + s, "max_ms": 12.0}
+                for s in range(5)]
+        svg = render_timeline_svg(rows, title="soak <dialer>")
+
+        assert svg.startswith("<svg") and svg.count("<polyline") == 3
+        assert "&lt;dialer&gt;" in svg and svg.count("<circle") == 3 and "1 отброшено" in svg
@@ -0,0 +1,142 @@
+import pytest
+import allure
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import requests
+
+from utils.metrics_exporter import CONTENT_TYPE, MetricsExporter, MetricsRegistry, RunMetrics
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Прогон под xdist с хуками метрик из tests/conftest.py, без браузерных фикстур
+XDIST_CONFTEST = """
+from tests.conftest import pytest_addoption, pytest_configure, pytest_unconfigure, pytest_runtest_logreport
+"""
+XDIST_TESTS = """
+import pytest
+from utils.metrics_exporter import active_metrics
+
+@pytest.mark.parametrize("number", range(4))
+def test_request(number):
+    metrics = active_metrics()
+    metrics.request_started()
+    metrics.request_finished("GET", "/v1/", 200, 0.01 * number)
+
+def test_failed():
+    assert False
+"""
+
+
+@allure.feature("Живые метрики прогона")
+class TestMetricsExporter:
+    """Тесты экспорта метрик в формате OpenMetrics"""
+
+    @allure.story("Формат OpenMetrics")
+    @allure.severity('CRITICAL')
+    def test_render_counters_gauges_and_histograms(self):
+        """Тест текстового представления счетчиков, значений и гистограмм"""
+        metrics = RunMetrics()
+        metrics.request_started()
+        metrics.request_started()
+        metrics.request_finished("GET", "/leads/{id}", 200, 0.02)
+        metrics.request_finished("GET", "/leads/{id}", 200, 0.3)
+        metrics.observe_page_load("/leads", {"ttfb": 0.2, "load": 1.5, "dom_content_loaded": None})
+        metrics.test_finished("passed")
+        metrics.test_finished("failed")
+        text = metrics.registry.render()
+
+        assert text.endswith("# EOF\n"), "Вывод OpenMetrics должен заканчиваться маркером EOF"
+        assert "# TYPE liner_api_requests counter" in text
+        assert 'liner_api_requests_total{method="GET",endpoint="/leads/{id}",status="200"} 2' in text
+        assert 'liner_api_request_duration_seconds_bucket{method="GET",endpoint="/leads/{id}",le="0.025"} 1' in text
+        assert 'liner_api_request_duration_seconds_bucket{method="GET",endpoint="/leads/{id}",le="+Inf"} 2' in text
+        assert 'liner_api_request_duration_seconds_sum{method="GET",endpoint="/leads/{id}"} 0.32' in text
+        assert "liner_api_requests_in_flight 0" in text
+        assert 'liner_page_load_seconds_count{page="/leads",phase="load"} 1' in text
+        assert 'phase="dom_content_loaded"' not in text, "Отсутствующие фазы не учитываются"
+        assert 'liner_tests_total{outcome="failed"} 1' in text
+
+    @allure.story("Формат OpenMetrics")
+    @allure.severity('NORMAL')
+    def test_label_escaping_and_registration_conflicts(self):
+        """Тест экранирования меток и повторной регистрации метрик"""
+        registry = MetricsRegistry()
+        counter = registry.counter("events", "События", ("name",))
+        counter.inc(name='say "hi"\n')
+        assert 'events_total{name="say \\"hi\\"\\n"} 1' in registry.render()
+        assert registry.counter("events", "События", ("name",)) is counter
+        with pytest.raises(ValueError):
+            registry.gauge("events", "События", ("name",))
+        with pytest.raises(ValueError):
+            counter.inc(other="x")
+
+    @allure.story("Экспорт")
+    @allure.severity('CRITICAL')
+    def test_http_endpoint_and_textfile(self, tmp_path):
+        """Тест отдачи метрик по HTTP и записи в файл во время прогона"""
+        metrics = RunMetrics()
+        textfile = tmp_path / "metrics" / "run.prom"
+        with MetricsExporter(metrics.registry, port=0, textfile=textfile, interval=0.05) as exporter:
+            metrics.test_finished("passed")
+            response = requests.get(exporter.url, timeout=5)
+            assert response.status_code == 200
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            assert 'liner_tests_total{outcome="passed"} 1' in response.text
+            assert requests.get(exporter.url.replace("/metrics", "/other"), timeout=5).status_code == 404
+            metrics.test_finished("passed")
+
+        assert 'liner_tests_total{outcome="passed"} 2' in textfile.read_text(encoding="utf-8"), \
+            "После остановки файл должен содержать последние значения"
+        assert not textfile.with_name("run.prom.tmp").exists()
+
+    @allure.story("Экспорт")
+    @allure.severity('CRITICAL')
+    def test_xdist_workers_report_to_controller(self, tmp_path):
+        """Тест прогона под xdist: экспорт только в контроллере, метрики воркеров доходят до него"""
+        pytest.importorskip("xdist")
+        (tmp_path / "conftest.py").write_text(XDIST_CONFTEST, encoding="utf-8")
+        (tmp_path / "test_sample.py").write_text(XDIST_TESTS, encoding="utf-8")
+        textfile = tmp_path / "run.prom"
+        # Фиксированный порт: при старте экспортера в каждом воркере второй получил бы OSError
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.environ.get("PYTHONPATH")]))}
+        result = subprocess.run(
+            [sys.executable, "-m", "pytest", "-n", "2", "-p", "no:cacheprovider", "-q",
+             "--metrics-port", str(port), "--metrics-textfile", str(textfile), "test_sample.py"],
+            cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+        )
+        output = result.stdout + result.stderr
+        assert "INTERNALERROR" not in output and "Address already in use" not in output, output
+        assert result.returncode == 1 and "4 passed" in output, output
+
+        text = textfile.read_text(encoding="utf-8")
+        assert 'liner_tests_total{outcome="passed"} 4' in text
+        assert 'liner_tests_total{outcome="failed"} 1' in text
+        assert 'liner_api_requests_total{method="GET",endpoint="/v1/",status="200"} 4' in text
+        assert 'liner_api_request_duration_seconds_count{method="GET",endpoint="/v1/"} 4' in text
+        assert "liner_api_requests_in_flight 0" in text
+        assert not list(tmp_path.glob("run.prom.*")), "Воркеры не пишут свои файлы метрик"
+
+    @allure.story("Экспорт")
+    @allure.severity('NORMAL')
+    def test_drain_and_merge(self):
+        """Тест передачи накопленных значений между реестрами"""
+        worker, controller = RunMetrics(), RunMetrics()
+        worker.request_started()
+        worker.request_finished("POST", "/v1/lead/create/", 201, 0.2)
+        controller.request_started()
+        controller.request_finished("POST", "/v1/lead/create/", 201, 0.02)
+
+        controller.registry.merge(worker.registry.drain())
+        assert worker.registry.drain() == {}, "После drain значения обнуляются"
+        assert controller.api_requests.get(method="POST", endpoint="/v1/lead/create/", status="201") == 2
+        assert controller.api_latency.get_count(method="POST", endpoint="/v1/lead/create/") == 2
+        assert controller.api_in_flight.get() == 0
+        assert 'liner_api_request_duration_seconds_sum{method="POST",endpoint="/v1/lead/create/"} 0.22' \
+            in controller.registry.render()
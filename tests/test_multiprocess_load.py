@@ -0,0 +1,60 @@
+import pytest
+import allure
+import time
+
+from utils.multiprocess_load import MultiProcessLoadRunner, resolve_factory
+
+
+class SleepClient:
+    """Клиент для воркеров: отвечает с фиксированной задержкой"""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+
+    def search_leads(self, query_params):
+        time.sleep(self.delay)
+        return {"status": "success", "data": []}
+
+
+SCENARIO = {
+    "name": "multiprocess",
+    "duration": 1.5,
+    "virtual_users": 2,
+    "seed": 1,
+    "operations": [{"name": "search", "method": "search_leads", "args": [{"page": "${randint:1:3}"}]}]
+}
+
+
+@allure.feature("Сценарии нагрузки")
+class TestMultiProcessLoadRunner:
+    """Тесты многопроцессного запуска нагрузки"""
+
+    @allure.story("Многопроцессная нагрузка")
+    @allure.severity('NORMAL')
+    def test_worker_snapshots_are_merged(self):
+        """Тест объединения снимков гистограмм от нескольких процессов"""
+        runner = MultiProcessLoadRunner(SCENARIO, "tests.test_multiprocess_load:SleepClient", {"delay": 0.01},
+                                        workers=2, snapshot_interval=0.5)
+        live = []
+        summary = runner.run(on_snapshot=live.append)
+
+        assert summary["worker_errors"] == [], f"Ошибки воркеров: {summary['worker_errors']}"
+        assert summary["workers"] == 2, "Должны быть получены результаты обоих воркеров"
+        assert len(live) >= 3, "Промежуточные сводки должны приходить во время теста"
+        assert live[0]["total"] <= summary["total"], "Итоговая сводка должна включать промежуточные"
+        assert set(summary["per_worker_rps"]) == {0, 1} and all(rps > 0 for rps in summary["per_worker_rps"].values()), \
+            f"Каждый воркер должен выполнять запросы: {summary['per_worker_rps']}"
+        assert summary["operations"]["search"]["latency_ms"]["p50"] >= 10, "Задержка клиента должна учитываться"
+
+    @allure.story("Многопроцессная нагрузка")
+    @allure.severity('MINOR')
+    def test_worker_failure_is_reported(self):
+        """Тест передачи ошибки создания клиента в воркере"""
+        runner = MultiProcessLoadRunner(SCENARIO, "tests.test_multiprocess_load:MissingClient", workers=1,
+                                        snapshot_interval=0.2)
+        summary = runner.run(duration=0.2)
+
+        assert summary["total"] == 0
+        assert len(summary["worker_errors"]) == 1 and "MissingClient" in summary["worker_errors"][0]
+        with pytest.raises(ValueError):
+            resolve_factory("utils.api_client")
@@ -0,0 +1,74 @@
+import pytest
+import allure
+import random
+
+from utils.perf_baseline import PerfBaselineStore, PerfGate, check_regression, mann_whitney_u
+
+
+def _samples(rng: random.Random, median_ms: float, count: int = 30):
+    return [rng.lognormvariate(0, 0.2) * median_ms for _ in range(count)]
+
+
+@allure.feature("Базовая линия производительности")
+class TestPerfBaseline:
+    """Тесты хранения истории и статистической проверки регрессий"""
+
+    @allure.story("Критерий Манна-Уитни")
+    @allure.severity('CRITICAL')
+    def test_detects_shift_without_false_alarm(self):
+        """Тест обнаружения сдвига распределения и отсутствия ложной тревоги"""
+        rng = random.Random(7)
+        baseline = [_samples(rng, 100) for _ in range(5)]
+
+        same = check_regression(_samples(rng, 100), baseline)
+        assert not same["regressed"], f"Одинаковые распределения не должны давать регрессию: {same}"
+
+        slower = check_regression(_samples(rng, 130), baseline)
+        assert slower["regressed"], f"Замедление на 30% должно быть обнаружено: {slower}"
+        assert slower["effect"] >= 0.33 and slower["p_value"] < 0.01
+
+        faster = mann_whitney_u(_samples(rng, 70), [v for run in baseline for v in run])
+        assert faster["p_value"] > 0.5 and faster["effect"] < 0, "Ускорение не должно считаться ухудшением"
+
+    @allure.story("Порог величины эффекта")
+    @allure.severity('NORMAL')
+    def test_small_significant_shift_is_ignored(self):
+        """Тест игнорирования статистически значимого, но малого сдвига"""
+        rng = random.Random(11)
+        baseline = [_samples(rng, 100, 400) for _ in range(5)]
+        result = check_regression(_samples(rng, 103, 2000), baseline)
+
+        assert result["p_value"] < 0.01, "На больших выборках малый сдвиг значим"
+        assert not result["regressed"], "Малый эффект не должен валить тест"
+
+    @allure.story("Скользящая база")
+    @allure.severity('NORMAL')
+    def test_gate_uses_rolling_window_of_healthy_runs(self, tmp_path):
+        """Тест скользящей базовой линии без учета прогонов с регрессией"""
+        rng = random.Random(3)
+        store = PerfBaselineStore(tmp_path / "baseline.sqlite")
+        previous = PerfGate(store, "dev", git_commit="aaa111")
+        gate = PerfGate(store, "dev", git_commit="abc123")
+
+        first = previous.check("POST /leads", _samples(rng, 100))
+        assert not first["regressed"] and first["reason"] == "недостаточно истории для сравнения"
+        for _ in range(3):
+            previous.check("POST /leads", _samples(rng, 100))
+
+        assert gate.check("POST /leads", _samples(rng, 200))["regressed"]
+        assert gate.check("POST /leads", _samples(rng, 200))["regressed"], \
+            "Прогон с регрессией не должен попадать в базовую линию"
+        assert len(store.baseline("POST /leads", "dev", window=10)) == 4
+        assert store.baseline("POST /leads", "sm") == [], "История хранится отдельно по окружениям"
+        assert len(store.baseline("POST /leads", "dev", window=10, exclude_commit="aaa111")) == 0
+
+        rerun = PerfGate(store, "dev", git_commit="bbb222")
+        for _ in range(3):
+            rerun.check("POST /leads", _samples(rng, 100))
+        assert rerun.check("POST /leads", _samples(rng, 100))["baseline_runs"] == 4, \
+            "Перезапуски того же коммита не входят в его базовую линию"
+
+        history = store.history("POST /leads", "dev")
+        assert len(history) == 10 and history[5]["regressed"] == 1
+        assert history[0]["median"] == pytest.approx(100, rel=0.2)
+        store.close()
@@ -7,12 +7,20 @@ import os
 import time
 import statistics
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any
 import threading
 from unittest.mock import Mock, patch
 import random
 
+from config.constants import TEST_RESULTS_DIR
+from utils.api_client import APIClient
+from utils.capacity_finder import create_probe_lead, endpoint_call
+from utils.latency_histogram import LatencyHistogram
+from utils.latency_models import RealClock, SimulatedBackend, UniformLatency, VirtualClock
+from utils.load_generator import OpenLoopLoadGenerator
+from utils.perf_baseline import PerfBaselineStore, PerfGate, current_git_commit
+from utils.workload import WorkloadEngine, load_scenario
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 @pytest.fixture
@@ -107,92 +115,135 @@ def mock_performance_responses():
         }
     }
 
+@pytest.fixture(scope="session")
+def perf_gate(config):
+    """Фикстура сравнения распределений времени ответа с историей прогонов
+
+    Сравниваются только замеры реальных эндпоинтов (USE_MOCK=false):
+    время моков идет по виртуальным часам и регрессию показать не может.
+    PERF_BASELINE_DB - путь к SQLite файлу истории (по умолчанию
+    test_results/perf_baseline.sqlite, в git не попадает),
+    PERF_GATE - режим: record (по умолчанию), enforce или off. Сравнение
+    с историей включается явно, на CI с накопленной историей.
+    """
+    store = PerfBaselineStore(os.environ.get("PERF_BASELINE_DB", TEST_RESULTS_DIR / "perf_baseline.sqlite"))
+    yield PerfGate(store, config["current_environment"], mode=os.environ.get("PERF_GATE", "record"),
+                   git_commit=current_git_commit())
+    store.close()
+
+@pytest.fixture
+def perf_clock():
+    """Часы для моков: виртуальные по умолчанию, реальные при PERF_REAL_TIME=true"""
+    if os.environ.get("PERF_REAL_TIME", "false").lower() in ("true", "1", "yes"):
+        return RealClock()
+    return VirtualClock()
+
+@pytest.fixture
+def simulated_backend(perf_clock):
+    """Имитация задержек сервера с фиксированным seed (PERF_SEED)"""
+    return SimulatedBackend(clock=perf_clock, seed=int(os.environ.get("PERF_SEED", "2640")))
+
+@pytest.fixture
+def latency_histogram():
+    """Гистограмма времени ответа теста, перцентили прикрепляются к отчету Allure"""
+    histogram = LatencyHistogram()
+    yield histogram
+    histogram.attach_to_allure()
+
 class MockAPIClient:
     """Мок клиент API для перфоманс тестов"""
     
-    def __init__(self, base_url: str, api_key: str, mock_responses):
+    def __init__(self, base_url: str, api_key: str, mock_responses, backend: SimulatedBackend = None):
         self.base_url = base_url
         self.api_key = api_key
         self.mock_responses = mock_responses
+        # Без явной модели задержки выдерживаются в реальном времени
+        self.backend = backend or SimulatedBackend(clock=RealClock())
+        self.clock = self.backend.clock
         self.logger = logging.getLogger(__name__)
         
-    def _simulate_network_delay(self, min_delay=0.01, max_delay=0.1):
-        """Симуляция сетевой задержки"""
-        delay = random.uniform(min_delay, max_delay)
-        time.sleep(delay)
-        return delay
+    def _simulate_network_delay(self, operation, min_delay=0.01, max_delay=0.1):
+        """Симуляция сетевой задержки, возвращает задержку и признак ошибки"""
+        return self.backend.call(operation, UniformLatency(min_delay, max_delay))
+    
+    def _respond(self, response: Dict[str, Any], delay: float, failed: bool) -> Dict[str, Any]:
+        response = dict(self.mock_responses["error"]) if failed else response
+        response["delay"] = delay
+        return response
     
     def create_lead(self, lead_data: Dict[str, Any]) -> Dict[str, Any]:
         """Создание лида с симуляцией задержки"""
-        delay = self._simulate_network_delay(0.05, 0.2)
+        delay, failed = self._simulate_network_delay("create_lead", 0.05, 0.2)
         lead_id = random.randint(1000, 9999)
-        response = self.mock_responses["create"](lead_id)
-        response["delay"] = delay
-        return response
+        return self._respond(self.mock_responses["create"](lead_id), delay, failed)
     
     def get_lead(self, lead_id: str) -> Dict[str, Any]:
         """Получение лида с симуляцией задержки"""
-        delay = self._simulate_network_delay(0.02, 0.1)
-        response = self.mock_responses["detail"](lead_id)
-        response["delay"] = delay
-        return response
+        delay, failed = self._simulate_network_delay("get_lead", 0.02, 0.1)
+        return self._respond(self.mock_responses["detail"](lead_id), delay, failed)
     
     def search_leads(self, query_params: Dict[str, Any]) -> Dict[str, Any]:
         """Поиск лидов с симуляцией задержки"""
-        delay = self._simulate_network_delay(0.1, 0.5)
+        delay, failed = self._simulate_network_delay("search_leads", 0.1, 0.5)
         page = query_params.get("page", 1)
         limit = query_params.get("limit", 10)
-        response = self.mock_responses["search"](page, limit)
-        response["delay"] = delay
-        return response
+        return self._respond(self.mock_responses["search"](page, limit), delay, failed)
     
     def update_lead(self, lead_id: str, lead_data: Dict[str, Any]) -> Dict[str, Any]:
         """Обновление лида с симуляцией задержки"""
-        delay = self._simulate_network_delay(0.03, 0.15)
-        response = self.mock_responses["update"].copy()
-        response["delay"] = delay
-        return response
+        delay, failed = self._simulate_network_delay("update_lead", 0.03, 0.15)
+        return self._respond(self.mock_responses["update"].copy(), delay, failed)
     
     def list_leads(self, page: int = 1) -> Dict[str, Any]:
         """Получение списка лидов с симуляцией задержки"""
-        delay = self._simulate_network_delay(0.05, 0.3)
-        response = self.mock_responses["list"](page)
-        response["delay"] = delay
-        return response
+        delay, failed = self._simulate_network_delay("list_leads", 0.05, 0.3)
+        return self._respond(self.mock_responses["list"](page), delay, failed)
+
+def measure_response_time(func, *args, histogram: LatencyHistogram = None, clock=None, **kwargs):
+    """Измерение времени выполнения функции, при переданной гистограмме время записывается в нее
 
-def measure_response_time(func, *args, **kwargs):
-    """Измерение времени выполнения функции"""
-    start_time = time.time()
+    clock - часы мока (VirtualClock), по умолчанию реальное время
+    """
+    clock = clock or RealClock()
+    start_time = clock.now()
     try:
         result = func(*args, **kwargs)
-        end_time = time.time()
-        return {
+        end_time = clock.now()
+        measurement = {
             "success": True,
             "response_time": end_time - start_time,
             "result": result
         }
     except Exception as e:
-        end_time = time.time()
-        return {
+        end_time = clock.now()
+        measurement = {
             "success": False,
             "response_time": end_time - start_time,
             "error": str(e)
         }
+    if histogram is not None:
+        histogram.record_seconds(measurement["response_time"])
+    return measurement
 
-def run_concurrent_requests(client, method, iterations, *args, **kwargs):
-    """Выполнение конкурентных запросов"""
-    results = []
-    
-    with ThreadPoolExecutor(max_workers=min(iterations, 10)) as executor:
-        futures = []
-        for i in range(iterations):
-            future = executor.submit(measure_response_time, method, *args, **kwargs)
-            futures.append(future)
-        
-        for future in as_completed(futures):
-            results.append(future.result())
-    
-    return results
+def measure_real_endpoint(api_config, endpoint, payloads, histogram: LatencyHistogram = None, lead_ids=None):
+    """Последовательные запросы к эндпоинту Liner API в реальном времени"""
+    client = APIClient(api_config["base_url"], api_config["api_key"])
+    lead_ids = lead_ids or [None] * len(payloads)
+    try:
+        return [measure_response_time(endpoint_call(client, endpoint, payload, lead_id), histogram=histogram)
+                for payload, lead_id in zip(payloads, lead_ids)]
+    finally:
+        client.close()
+
+def assert_no_regression(perf_gate, endpoint, results):
+    """Сравнение времени успешных ответов эндпоинта с историей прогонов"""
+    response_times = [r["response_time"] * 1000 for r in results if r["success"]]
+    assert len(response_times) == len(results), \
+        f"Не все запросы к {endpoint} были успешными: {len(response_times)}/{len(results)}"
+    verdict = perf_gate.check(endpoint, response_times)
+    assert not verdict["regressed"], \
+        f"Время ответа {endpoint} значимо хуже базовой линии: медиана {verdict['current_median']:.1f} мс " \
+        f"против {verdict['baseline_median']:.1f} мс (p={verdict['p_value']:.4f})"
 
 @allure.feature("Перфоманс тесты API")
 class TestAPIPerformance:
@@ -210,13 +261,9 @@ class TestAPIPerformance:
     2. Измерение времени ответа
     3. Проверка стабильности
     """)
-    def test_single_lead_creation_performance(self, api_config, api_headers, use_mock, mock_performance_responses):
+    def test_single_lead_creation_performance(self, api_config, api_headers, use_mock, mock_performance_responses,
+                                              latency_histogram, simulated_backend, perf_gate):
         """Тест производительности создания одного лида"""
-        if not use_mock:
-            pytest.skip("Тест требует моков для стабильности")
-        
-        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses)
-        
         lead_data = {
             "lead_type": "straight",
             "create_method": "performance_test",
@@ -224,15 +271,27 @@ class TestAPIPerformance:
             "client_phone": "+79991234567",
             "order_id": 2640
         }
+        iterations = 10
+        
+        if not use_mock:
+            # Реальный эндпоинт проверяется только по истории прогонов, без фиксированных порогов
+            run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+            payloads = [{**lead_data, "external_id": f"perf_create_{run_id}_{i}"} for i in range(iterations)]
+            results = measure_real_endpoint(api_config, "lead/create", payloads, latency_histogram)
+            assert_no_regression(perf_gate, "lead/create", results)
+            return
+        
+        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses,
+                               simulated_backend)
         
         # Выполняем несколько запросов для получения статистики
-        iterations = 10
         results = []
         
         for i in range(iterations):
-            result = measure_response_time(client.create_lead, lead_data)
+            result = measure_response_time(client.create_lead, lead_data, histogram=latency_histogram,
+                                           clock=client.clock)
             results.append(result)
-            time.sleep(0.1)  # Небольшая пауза между запросами
+            client.clock.sleep(0.1)  # Небольшая пауза между запросами
         
         # Анализируем результаты
         successful_results = [r for r in results if r["success"]]
@@ -257,6 +316,8 @@ class TestAPIPerformance:
             
             # Проверяем, что среднее время ответа не превышает 0.5 секунды
             assert avg_time < 0.5, f"Среднее время ответа {avg_time:.3f} сек превышает 0.5 сек"
+            p99 = latency_histogram.get_percentiles()["p99"]
+            assert p99 < 500, f"99-й перцентиль времени ответа {p99:.1f} мс превышает 500 мс"
             assert len(successful_results) == iterations, f"Не все запросы были успешными: {len(successful_results)}/{iterations}"
         else:
             pytest.fail("Все запросы завершились с ошибкой")
@@ -264,17 +325,20 @@ class TestAPIPerformance:
     @allure.story("Конкурентные перфоманс тесты")
     @allure.severity('NORMAL')
     @allure.description("""
-    Тест конкурентной производительности:
-    1. Одновременное создание нескольких лидов
+    Тест производительности создания лидов при заданной интенсивности:
+    1. Отправка запросов с постоянной интенсивностью независимо от времени ответа
     2. Измерение времени ответа при нагрузке
-    3. Проверка стабильности под нагрузкой
+    3. Проверка, что интенсивность выдерживается без отброшенных запросов
     """)
-    def test_concurrent_lead_creation_performance(self, api_config, api_headers, use_mock, mock_performance_responses):
-        """Тест конкурентной производительности создания лидов"""
+    @pytest.mark.parametrize("arrival", ["constant", "poisson"])
+    def test_concurrent_lead_creation_performance(self, api_config, api_headers, use_mock, mock_performance_responses,
+                                                  arrival, latency_histogram):
+        """Тест создания лидов при открытой нагрузке"""
         if not use_mock:
             pytest.skip("Тест требует моков для стабильности")
         
-        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses)
+        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses,
+                               SimulatedBackend(clock=RealClock(), seed=2640))
         
         lead_data = {
             "lead_type": "straight",
@@ -284,12 +348,20 @@ class TestAPIPerformance:
             "order_id": 2640
         }
         
-        # Тестируем разные уровни конкурентности
-        concurrency_levels = [5, 10, 20]
+        # Тестируем разные уровни интенсивности (запросов в секунду)
+        target_rates = [5, 10, 20]
         
-        for concurrency in concurrency_levels:
-            with allure.step(f"Тестирование с {concurrency} одновременными запросами"):
-                results = run_concurrent_requests(client, client.create_lead, concurrency, lead_data)
+        for rate in target_rates:
+            with allure.step(f"Тестирование с интенсивностью {rate} запр/с ({arrival})"):
+                generator = OpenLoopLoadGenerator(rate, duration=1.0, arrival=arrival, max_in_flight=20, seed=rate)
+                summary = generator.run(client.create_lead, lead_data)
+                results = summary["results"]
+                rate_histogram = LatencyHistogram()
+                for r in results:
+                    # Время от запланированной отправки учитывает coordinated omission
+                    rate_histogram.record_seconds(r["scheduled_response_time"])
+                latency_histogram.add(rate_histogram)
+                rate_histogram.attach_to_allure(f"Перцентили для {rate} запр/с")
                 
                 successful_results = [r for r in results if r["success"]]
                 response_times = [r["response_time"] for r in successful_results]
@@ -299,17 +371,23 @@ class TestAPIPerformance:
                     max_time = max(response_times)
                     
                     allure.attach(
-                        f"Результаты для {concurrency} запросов:\n"
-                        f"Успешных запросов: {len(successful_results)}/{concurrency}\n"
+                        f"Результаты для {rate} запр/с:\n"
+                        f"Отправлено запросов: {summary['sent']}\n"
+                        f"Фактическая интенсивность: {summary['achieved_rps']:.1f} запр/с\n"
+                        f"Отброшено: {summary['dropped']}, отправлено с опозданием: {summary['late']}\n"
+                        f"Успешных запросов: {len(successful_results)}/{len(results)}\n"
                         f"Среднее время ответа: {avg_time:.3f} сек\n"
                         f"Максимальное время: {max_time:.3f} сек",
-                        f"Статистика для {concurrency} запросов",
+                        f"Статистика для {rate} запр/с",
                         allure.attachment_type.TEXT
                     )
                     
-                    # Проверяем, что все запросы завершились успешно
-                    assert len(successful_results) == concurrency, f"Не все запросы были успешными: {len(successful_results)}/{concurrency}"
-                    assert avg_time < 1.0, f"Среднее время ответа {avg_time:.3f} сек превышает 1.0 сек при {concurrency} запросах"
+                    # Проверяем, что интенсивность выдержана и все запросы завершились успешно
+                    assert summary["dropped"] == 0, f"Отброшено {summary['dropped']} запросов при {rate} запр/с"
+                    assert len(successful_results) == len(results), f"Не все запросы были успешными: {len(successful_results)}/{len(results)}"
+                    assert avg_time < 1.0, f"Среднее время ответа {avg_time:.3f} сек превышает 1.0 сек при {rate} запр/с"
+                else:
+                    pytest.fail(f"Все запросы при {rate} запр/с завершились с ошибкой")
     
     @allure.story("Тесты производительности поиска")
     @allure.severity('NORMAL')
@@ -319,12 +397,14 @@ class TestAPIPerformance:
     2. Измерение времени ответа
     3. Проверка производительности поиска
     """)
-    def test_search_performance(self, api_config, api_headers, use_mock, mock_performance_responses):
+    def test_search_performance(self, api_config, api_headers, use_mock, mock_performance_responses,
+                                latency_histogram, simulated_backend):
         """Тест производительности поиска лидов"""
         if not use_mock:
             pytest.skip("Тест требует моков для стабильности")
         
-        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses)
+        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses,
+                               simulated_backend)
         
         # Тестируем разные сценарии поиска
         search_scenarios = [
@@ -341,9 +421,10 @@ class TestAPIPerformance:
                 
                 # Выполняем несколько запросов для получения статистики
                 for j in range(5):
-                    result = measure_response_time(client.search_leads, scenario)
+                    result = measure_response_time(client.search_leads, scenario, histogram=latency_histogram,
+                                                   clock=client.clock)
                     results.append(result)
-                    time.sleep(0.1)
+                    client.clock.sleep(0.1)
                 
                 successful_results = [r for r in results if r["success"]]
                 response_times = [r["response_time"] for r in successful_results]
@@ -363,6 +444,8 @@ class TestAPIPerformance:
                     
                     # Проверяем производительность поиска
                     assert avg_time < 0.8, f"Среднее время поиска {avg_time:.3f} сек превышает 0.8 сек"
+                    p99 = latency_histogram.get_percentiles()["p99"]
+                    assert p99 < 1000, f"99-й перцентиль времени поиска {p99:.1f} мс превышает 1000 мс"
                     assert len(successful_results) == 5, f"Не все поисковые запросы были успешными"
     
     @allure.story("Тесты производительности чтения")
@@ -373,12 +456,14 @@ class TestAPIPerformance:
     2. Получение списков лидов
     3. Измерение времени ответа
     """)
-    def test_read_performance(self, api_config, api_headers, use_mock, mock_performance_responses):
+    def test_read_performance(self, api_config, api_headers, use_mock, mock_performance_responses,
+                              latency_histogram, simulated_backend):
         """Тест производительности операций чтения"""
         if not use_mock:
             pytest.skip("Тест требует моков для стабильности")
         
-        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses)
+        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses,
+                               simulated_backend)
         
         # Тестируем получение деталей лидов
         with allure.step("Тестирование получения деталей лидов"):
@@ -386,9 +471,10 @@ class TestAPIPerformance:
             get_results = []
             
             for lead_id in lead_ids:
-                result = measure_response_time(client.get_lead, lead_id)
+                result = measure_response_time(client.get_lead, lead_id, histogram=latency_histogram,
+                                               clock=client.clock)
                 get_results.append(result)
-                time.sleep(0.05)
+                client.clock.sleep(0.05)
             
             successful_gets = [r for r in get_results if r["success"]]
             get_times = [r["response_time"] for r in successful_gets]
@@ -404,15 +490,17 @@ class TestAPIPerformance:
                 )
                 
                 assert avg_get_time < 0.3, f"Среднее время получения деталей {avg_get_time:.3f} сек превышает 0.3 сек"
+                p99 = latency_histogram.get_percentiles()["p99"]
+                assert p99 < 300, f"99-й перцентиль получения деталей {p99:.1f} мс превышает 300 мс"
         
         # Тестируем получение списков лидов
         with allure.step("Тестирование получения списков лидов"):
             list_results = []
             
             for page in range(1, 6):
-                result = measure_response_time(client.list_leads, page)
+                result = measure_response_time(client.list_leads, page, clock=client.clock)
                 list_results.append(result)
-                time.sleep(0.1)
+                client.clock.sleep(0.1)
             
             successful_lists = [r for r in list_results if r["success"]]
             list_times = [r["response_time"] for r in successful_lists]
@@ -437,26 +525,44 @@ class TestAPIPerformance:
     2. Измерение времени ответа
     3. Проверка производительности обновления
     """)
-    def test_update_performance(self, api_config, api_headers, use_mock, mock_performance_responses):
+    def test_update_performance(self, api_config, api_headers, use_mock, mock_performance_responses,
+                                latency_histogram, simulated_backend, perf_gate):
         """Тест производительности обновления лидов"""
-        if not use_mock:
-            pytest.skip("Тест требует моков для стабильности")
-        
-        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses)
-        
-        # Тестируем обновление лидов
         update_data = {
             "UF_COMMENT_MANAGER": "Обновлено в перфоманс тесте",
             "status": "in_progress"
         }
         
+        if not use_mock:
+            run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+            creator = APIClient(api_config["base_url"], api_config["api_key"])
+            lead_ids = [create_probe_lead(creator, {
+                "lead_type": "straight",
+                "create_method": "performance_test",
+                "client_name": "Update Performance Lead",
+                "client_phone": "+79991234567",
+                "order_id": 2640,
+                "external_id": f"perf_update_{run_id}_{i}"
+            }) for i in range(10)]
+            creator.close()
+            assert None not in lead_ids, "Не удалось создать лиды для обновления"
+            results = measure_real_endpoint(api_config, "lead/update", [update_data] * len(lead_ids),
+                                            latency_histogram, lead_ids)
+            assert_no_regression(perf_gate, "lead/update", results)
+            return
+        
+        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses,
+                               simulated_backend)
+        
+        # Тестируем обновление лидов
         lead_ids = [f"update_test_{i}" for i in range(1, 11)]
         update_results = []
         
         for lead_id in lead_ids:
-            result = measure_response_time(client.update_lead, lead_id, update_data)
+            result = measure_response_time(client.update_lead, lead_id, update_data, histogram=latency_histogram,
+                                           clock=client.clock)
             update_results.append(result)
-            time.sleep(0.1)
+            client.clock.sleep(0.1)
         
         successful_updates = [r for r in update_results if r["success"]]
         update_times = [r["response_time"] for r in successful_updates]
@@ -475,85 +581,94 @@ class TestAPIPerformance:
             )
             
             assert avg_update_time < 0.4, f"Среднее время обновления {avg_update_time:.3f} сек превышает 0.4 сек"
+            p99 = latency_histogram.get_percentiles()["p99"]
+            assert p99 < 400, f"99-й перцентиль времени обновления {p99:.1f} мс превышает 400 мс"
             assert len(successful_updates) == len(lead_ids), f"Не все обновления были успешными"
     
     @allure.story("Стресс-тесты")
     @allure.severity('NORMAL')
     @allure.description("""
     Стресс-тест API:
-    1. Высокая нагрузка на API
+    1. Создание, поиск и получение списков лидов вперемешку от 10 пользователей без пауз
     2. Измерение производительности под нагрузкой
     3. Проверка стабильности системы
     """)
-    def test_stress_performance(self, api_config, api_headers, use_mock, mock_performance_responses):
+    def test_stress_performance(self, api_config, api_headers, use_mock, mock_performance_responses,
+                                simulated_backend):
         """Стресс-тест производительности API"""
         if not use_mock:
             pytest.skip("Тест требует моков для стабильности")
         
-        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses)
+        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses,
+                               simulated_backend)
+        # Операции выбираются по весам каждым пользователем, а не выполняются по очереди третями
+        scenario = {
+            "name": "stress",
+            "iterations": 5,
+            "virtual_users": 10,
+            "seed": 2640,
+            "operations": [
+                {
+                    "name": "create",
+                    "method": "create_lead",
+                    "weight": 1,
+                    "args": [{
+                        "lead_type": "straight",
+                        "create_method": "stress_test",
+                        "client_name": "Stress Test Lead ${seq}",
+                        "client_phone": "${phone}",
+                        "order_id": 2640
+                    }]
+                },
+                {"name": "search", "method": "search_leads", "weight": 1, "args": [{"page": 1, "limit": 10}]},
+                {"name": "list", "method": "list_leads", "weight": 1, "args": [1]}
+            ]
+        }
+        engine = WorkloadEngine(client, scenario, clock=client.clock)
         
-        # Выполняем стресс-тест с большим количеством запросов
-        total_requests = 50
-        concurrent_requests = 10
+        with allure.step("Стресс-тест: 50 запросов от 10 пользователей"):
+            summary = engine.run()
+            engine.attach_to_allure(summary)
         
-        with allure.step(f"Стресс-тест: {total_requests} запросов с {concurrent_requests} потоками"):
-            # Создаем данные для разных типов запросов
-            lead_data = {
-                "lead_type": "straight",
-                "create_method": "stress_test",
-                "client_name": "Stress Test Lead",
-                "client_phone": "+79991234567",
-                "order_id": 2640
-            }
-            
-            search_params = {"page": 1, "limit": 10}
-            
-            # Выполняем смешанные запросы
-            all_results = []
-            
-            # Создание лидов
-            create_results = run_concurrent_requests(client, client.create_lead, total_requests // 3, lead_data)
-            all_results.extend(create_results)
-            
-            # Поиск лидов
-            search_results = run_concurrent_requests(client, client.search_leads, total_requests // 3, search_params)
-            all_results.extend(search_results)
-            
-            # Получение списков
-            list_results = run_concurrent_requests(client, client.list_leads, total_requests // 3, 1)
-            all_results.extend(list_results)
-            
-            # Анализируем общие результаты
-            successful_results = [r for r in all_results if r["success"]]
-            response_times = [r["response_time"] for r in successful_results]
-            
-            if response_times:
-                avg_time = statistics.mean(response_times)
-                min_time = min(response_times)
-                max_time = max(response_times)
-                std_dev = statistics.stdev(response_times) if len(response_times) > 1 else 0
-                
-                success_rate = len(successful_results) / len(all_results) * 100
-                
-                allure.attach(
-                    f"Результаты стресс-теста:\n"
-                    f"Всего запросов: {len(all_results)}\n"
-                    f"Успешных запросов: {len(successful_results)}\n"
-                    f"Процент успеха: {success_rate:.1f}%\n"
-                    f"Среднее время ответа: {avg_time:.3f} сек\n"
-                    f"Минимальное время: {min_time:.3f} сек\n"
-                    f"Максимальное время: {max_time:.3f} сек\n"
-                    f"Стандартное отклонение: {std_dev:.3f} сек",
-                    "Результаты стресс-теста",
-                    allure.attachment_type.TEXT
-                )
-                
-                # Проверяем результаты стресс-теста
-                assert success_rate >= 95, f"Процент успешных запросов {success_rate:.1f}% ниже 95%"
-                assert avg_time < 1.0, f"Среднее время ответа {avg_time:.3f} сек превышает 1.0 сек"
-                assert max_time < 2.0, f"Максимальное время ответа {max_time:.3f} сек превышает 2.0 сек"
-            else:
-                pytest.fail("Все запросы в стресс-тесте завершились с ошибкой")
+        operations = summary["operations"]
+        success_rate = (summary["total"] - summary["errors"]) / summary["total"] * 100
+        assert summary["total"] == 50, f"Ожидалось 50 запросов, выполнено {summary['total']}"
+        assert all(op["count"] > 0 for op in operations.values()), \
+            f"Все типы запросов должны выполняться вперемешку: {operations}"
+        assert success_rate >= 95, f"Процент успешных запросов {success_rate:.1f}% ниже 95%"
+        assert summary["latency_ms"]["max"] < 2000, \
+            f"Максимальное время ответа {summary['latency_ms']['max']:.1f} мс превышает 2000 мс"
+        assert summary["latency_ms"]["p99"] < 1500, \
+            f"99-й перцентиль времени ответа {summary['latency_ms']['p99']:.1f} мс превышает 1500 мс"
+
+    @allure.story("Стресс-тесты")
+    @allure.severity('NORMAL')
+    @allure.description("""
+    Тест смешанной нагрузки по сценарию config/scenarios/typical_day.json:
+    1. Поиск, пачки созданий лидов и обновления выполняются вперемешку
+    2. Измерение перцентилей по каждой операции
+    3. Проверка отсутствия ошибок
+    """)
+    def test_mixed_workload_performance(self, api_config, use_mock, mock_performance_responses, simulated_backend):
+        """Тест смешанной нагрузки по сценарию"""
+        if not use_mock:
+            pytest.skip("Тест требует моков для стабильности")
+        
+        client = MockAPIClient(api_config["base_url"], api_config["api_key"], mock_performance_responses,
+                               simulated_backend)
+        scenario = load_scenario(os.path.join("config", "scenarios", "typical_day.json"))
+        engine = WorkloadEngine(client, scenario, clock=client.clock)
+        
+        with allure.step(f"Сценарий {scenario['name']}: 5 пользователей, 3 сек"):
+            summary = engine.run(duration=3, virtual_users=5)
+            engine.attach_to_allure(summary)
+        
+        operations = summary["operations"]
+        assert summary["errors"] == 0, f"Ошибок в сценарии: {summary['errors']}"
+        assert operations["search"]["count"] > 0 and operations["quiz_burst"]["count"] > 0, \
+            f"Сценарий должен включать поиск и создание лидов: {operations}"
+        assert summary["latency_ms"]["p99"] < 1000, \
+            f"99-й перцентиль времени ответа {summary['latency_ms']['p99']:.1f} мс превышает 1000 мс"
 
 @pytest.fixture
 def page(browser_context, request):
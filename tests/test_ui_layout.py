@@ -423,20 +423,6 @@ class TestUILayout:
     def test_performance_under_load(self, page: Page, config):
         """Тест проверяет производительность системы под нагрузкой"""
         from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
-        from urllib3.util.retry import Retry
-        from requests.adapters import HTTPAdapter
-        import requests
-        
-        # Настройка сессии с повторными попытками
-        session = requests.Session()
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[500, 502, 503, 504]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
         
         # Выполняем авторизацию
         login_page = LoginPage(page, config["baseUrl"])
@@ -0,0 +1,180 @@
+import pytest
+import allure
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import requests
+
+from utils.latency_histogram import LatencyHistogram
+from utils.latency_models import UniformLatency
+from utils.voximplant_simulator import VoximplantSimulator
+
+APP = "liner.test.voximplant.com"
+
+
+class WebhookReceiver:
+    """Прием вебхуков симулятора вместо /api/?controller=Vats"""
+
+    def __init__(self):
+        received: List[Dict[str, Any]] = []
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with lock:
+                    received.append({"method": self.path.rsplit("=", 1)[-1], **body})
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.received = received
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def callback_urls(self) -> Dict[str, str]:
+        methods = {"call_record": "rabbitSaveCallRecord", "leg_is_connected": "legIsConnected",
+                   "leg_is_disconnected": "legIsDisconnected", "finish_call": "finishCallHook"}
+        return {name: f"{self.base_url}/api/?controller=Vats&method={method}" for name, method in methods.items()}
+
+    def events(self, method: str) -> List[Dict[str, Any]]:
+        return [item for item in self.received if item["method"] == method]
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def webhook_receiver():
+    receiver = WebhookReceiver()
+    yield receiver
+    receiver.close()
+
+
+def platform_api(simulator: VoximplantSimulator, method: str, **params) -> Dict[str, Any]:
+    """Вызов метода Platform API с авторизацией, как в Voximplant SDK"""
+    params.update(account_id="test_account", api_key="test_key")
+    response = requests.post(f"{simulator.url}/platform_api/{method}/", data=params, timeout=10)
+    assert response.status_code == 200
+    return response.json()
+
+
+def start_predictive_call(simulator: VoximplantSimulator, receiver: WebhookReceiver, lead_id: int) -> Dict[str, Any]:
+    custom_data = {"callback_urls": receiver.callback_urls(), "lead_phone": f"+7999{lead_id:07d}",
+                   "lead_id": lead_id, "display_name": f"Lead #{lead_id}", "count": 1}
+    return platform_api(simulator, "StartScenarios", application_name=APP, rule_id=7,
+                        script_custom_data=json.dumps(custom_data))
+
+
+@allure.feature("Симулятор Voximplant")
+class TestVoximplantSimulator:
+    """Тесты симулятора Voximplant Platform API"""
+
+    @allure.story("Пользователи")
+    @allure.severity('CRITICAL')
+    def test_users_and_acd_status(self):
+        """Тест AddUser, GetUsers с acd_status и DelUser"""
+        with VoximplantSimulator(account_id="test_account", api_key="test_key") as simulator:
+            user_id = platform_api(simulator, "AddUser", application_name=APP, user_name="operator_1",
+                                   user_password="secret", user_display_name="Оператор 1", user_active=1)["user_id"]
+            platform_api(simulator, "AddUser", application_name=APP, user_name="operator_2", user_password="secret")
+            assert "error" in platform_api(simulator, "AddUser", user_name="operator_1", user_password="x")
+
+            simulator.set_acd_status("operator_1", "READY")
+            users = platform_api(simulator, "GetUsers", application_name=APP)["result"]
+            statuses = {user["user_name"]: user["acd_status"] for user in users}
+            assert statuses == {"operator_1": "READY", "operator_2": "OFFLINE"}
+            ready = platform_api(simulator, "GetUsers", application_name=APP, acd_status="READY")
+            assert [user["user_name"] for user in ready["result"]] == ["operator_1"]
+
+            assert platform_api(simulator, "DelUser", application_name=APP, user_id=user_id)["result"] == 1
+            assert platform_api(simulator, "GetUsers", application_name=APP)["total_count"] == 1
+            denied = requests.post(f"{simulator.url}/platform_api/GetUsers/", data={"api_key": "wrong"}).json()
+            assert denied["error"]["code"] == 100
+
+    @allure.story("Жизненный цикл звонка")
+    @allure.severity('CRITICAL')
+    def test_call_lifecycle_and_webhooks(self, webhook_receiver):
+        """Тест состояний звонка, вебхуков и истории"""
+        simulator = VoximplantSimulator(
+            account_id="test_account", api_key="test_key", answer_probability=1.0,
+            ring_time=UniformLatency(5, 5), talk_time=UniformLatency(90, 90), wrap_up_time=UniformLatency(600, 600),
+            time_scale=0.005, seed=1
+        )
+        with simulator:
+            platform_api(simulator, "AddUser", application_name=APP, user_name="operator_1", user_password="x")
+            simulator.set_acd_status("operator_1", "READY")
+            started = start_predictive_call(simulator, webhook_receiver, lead_id=42)
+            session_id = started["call_session_history_id"]
+            assert started["result"] == 1 and started["media_session_access_secure_url"].endswith(str(session_id))
+
+            assert simulator.wait_idle(timeout=10), "Звонок должен завершиться"
+            time.sleep(0.2)
+            history = platform_api(simulator, "GetCallHistory", application_name=APP,
+                                   call_session_history_id=session_id, with_calls="true", with_records="true")
+            acd_status = platform_api(simulator, "GetUsers", application_name=APP)["result"][0]["acd_status"]
+
+        finish = webhook_receiver.events("finishCallHook")
+        assert len(finish) == 1 and finish[0]["source"]["lead_id"] == 42
+        event = finish[0]["event"]
+        assert event["client_was_connected"] and event["operator_was_connected"]
+        assert event["connected_operator"] == "operator_1" and event["talk_time_duration"] == 90
+        assert event["wait_time_duration"] == 5 and event["total_time_duration"] == 95
+        assert len(webhook_receiver.events("legIsConnected")) == 2
+        assert len(webhook_receiver.events("legIsDisconnected")) == 2
+        assert webhook_receiver.events("rabbitSaveCallRecord")[0]["event"]["duration"] == 90
+
+        session = history["result"][0]
+        assert session["finish_reason"] == "hangup" and session["duration"] == 95
+        assert session["calls"][0]["cost"] == 3.0 and session["records"][0]["cost"] == pytest.approx(0.2)
+        assert acd_status == "AFTER_SERVICE", "После разговора оператор в постобработке"
+
+    @allure.story("Жизненный цикл звонка")
+    @allure.severity('NORMAL')
+    def test_predictive_terminate(self, webhook_receiver):
+        """Тест завершения звонка по ссылке управления"""
+        simulator = VoximplantSimulator(answer_probability=1.0, ring_time=UniformLatency(60, 60), time_scale=0.1)
+        with simulator:
+            started = start_predictive_call(simulator, webhook_receiver, lead_id=1)
+            requests.post(started["media_session_access_secure_url"],
+                          json={"method": "predictive_terminate", "data": []}, timeout=5)
+            assert simulator.wait_idle(timeout=2), "Звонок должен завершиться сразу"
+            call = simulator.get_call(started["call_session_history_id"])
+        assert call["finish_reason"] == "predictive_terminate" and simulator.get_stats()["terminated"] == 1
+
+    @allure.story("Пропускная способность диалера")
+    @allure.severity('CRITICAL')
+    def test_dialer_throughput_is_limited_by_operators(self, webhook_receiver):
+        """Тест потока звонков на ограниченное число операторов"""
+        simulator = VoximplantSimulator(
+            account_id="test_account", api_key="test_key", answer_probability=0.5,
+            ring_time=UniformLatency(2, 10), talk_time=UniformLatency(30, 90), wrap_up_time=UniformLatency(5, 5),
+            max_operator_wait=10, api_latency=UniformLatency(0.005, 0.01), time_scale=0.002, seed=2640
+        )
+        histogram = LatencyHistogram()
+        with simulator:
+            for index in range(3):
+                platform_api(simulator, "AddUser", application_name=APP, user_name=f"op_{index}", user_password="x")
+                simulator.set_acd_status(f"op_{index}", "READY")
+            for lead_id in range(60):
+                started = time.perf_counter()
+                assert start_predictive_call(simulator, webhook_receiver, lead_id)["result"] == 1
+                histogram.record_seconds(time.perf_counter() - started)
+            assert simulator.wait_idle(timeout=30)
+            time.sleep(0.3)
+            stats = simulator.get_stats()
+
+        assert stats["calls"] == 60 and stats["max_active"] > 3
+        assert stats["answered"] == stats["connected"] + stats["abandoned"]
+        assert 15 < stats["answered"] < 45, f"Около половины звонков должны быть отвечены: {stats}"
+        assert stats["abandoned"] > 0, f"Трех операторов не хватает на поток звонков: {stats}"
+        assert len(webhook_receiver.events("finishCallHook")) == 60 and stats["webhooks_failed"] == 0
+        assert histogram.get_percentiles()["p50"] >= 5, "Задержка API учитывается в ответе StartScenarios"
@@ -0,0 +1,111 @@
+import pytest
+import allure
+import threading
+
+from utils.api_client import APIClient
+from utils.workload import DataGenerator, ScenarioError, WorkloadEngine, load_scenario
+
+
+class RecordingClient:
+    """Клиент, запоминающий порядок вызванных операций"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, name, *args):
+        with self._lock:
+            self.calls.append((name, args))
+
+    def search_leads(self, query_params):
+        self._record("search", query_params)
+        return {"status": "success", "data": []}
+
+    def create_lead(self, lead_data):
+        self._record("create", lead_data)
+        return {"status": "success", "id": f"lead_{len(self.calls)}"}
+
+    def update_lead(self, lead_id, lead_data):
+        self._record("update", lead_id, lead_data)
+        return {"status": "error", "message": "Лид заблокирован"}
+
+
+SCENARIO = {
+    "name": "unit",
+    "iterations": 40,
+    "virtual_users": 2,
+    "seed": 7,
+    "operations": [
+        {"name": "search", "method": "search_leads", "weight": 6, "args": [{"page": "${randint:1:3}"}]},
+        {"name": "create", "method": "create_lead", "weight": 3, "burst": 2, "remember_lead": True,
+         "args": [{"client_name": "Лид ${seq}", "client_phone": "${phone}"}]},
+        {"name": "update", "method": "update_lead", "weight": 1, "args": ["${lead_id}", {"status": "new"}]}
+    ]
+}
+
+
+@allure.feature("Сценарии нагрузки")
+class TestWorkloadEngine:
+    """Тесты движка смешанной нагрузки"""
+
+    @allure.story("Смешанная нагрузка")
+    @allure.severity('CRITICAL')
+    def test_operations_are_interleaved(self):
+        """Тест перемешивания операций по весам"""
+        client = RecordingClient()
+        summary = WorkloadEngine(client, SCENARIO).run()
+        operations = summary["operations"]
+
+        names = [name for name, _ in client.calls]
+        first_create = names.index("create")
+        assert "search" in names[first_create:], "Операции должны выполняться вперемешку, а не блоками"
+        assert operations["search"]["count"] > operations["update"]["count"], "Поиск должен преобладать"
+        assert operations["create"]["count"] % 2 == 0, "Создание выполняется пачками по 2"
+        assert operations["update"]["errors"] == operations["update"]["count"], "Ответ с ошибкой считается ошибкой"
+        assert all(lead_id.startswith("lead_") for name, (lead_id, *_) in client.calls if name == "update"), \
+            "Обновляться должны только созданные в прогоне лиды"
+
+    @allure.story("Смешанная нагрузка")
+    @allure.severity('NORMAL')
+    def test_lead_placeholders_and_render_errors(self):
+        """Тест пропуска операций без лидов и учета ошибок подстановки данных"""
+        scenario = {
+            "iterations": 3,
+            "operations": [
+                {"name": "update", "method": "update_lead", "kwargs": {"lead_id": "${lead_id}", "lead_data": {}}},
+            ]
+        }
+        client = RecordingClient()
+        summary = WorkloadEngine(client, scenario).run()
+        assert summary["operations"]["update"]["skipped"] == 3, "${lead_id} в kwargs без лидов - пропуск"
+        assert client.calls == []
+
+        scenario["operations"][0]["kwargs"] = {"lead_id": "${unknown}", "lead_data": {}}
+        summary = WorkloadEngine(client, scenario).run()
+        assert summary["operations"]["update"]["count"] == 3, "Пользователь продолжает после ошибки подстановки"
+        assert summary["operations"]["update"]["errors"] == 3 and client.calls == []
+
+    @allure.story("Данные сценария")
+    @allure.severity('NORMAL')
+    def test_data_generator_templates(self):
+        """Тест подстановки шаблонов данных"""
+        data = DataGenerator(seed=1)
+        rendered = data.render({"n": "${seq}", "name": "Лид ${seq}", "page": "${randint:2:2}",
+                                "phone": "${phone}", "nested": ["${choice:a|a}"]})
+
+        assert rendered["n"] == 1 and rendered["name"] == "Лид 2", "Порядковый номер должен увеличиваться"
+        assert rendered["page"] == 2 and rendered["nested"] == ["a"]
+        assert rendered["phone"].startswith("+7999") and len(rendered["phone"]) == 12
+        with pytest.raises(ScenarioError):
+            data.render("${unknown}")
+
+    @allure.story("Данные сценария")
+    @allure.severity('MINOR')
+    def test_bundled_scenario_is_valid(self):
+        """Тест корректности сценария из config/scenarios"""
+        scenario = load_scenario("config/scenarios/typical_day.json")
+        assert {op["name"] for op in scenario["operations"]} >= {"search", "quiz_burst", "update"}
+        for operation in scenario["operations"]:
+            assert hasattr(APIClient, operation["method"]), f"У APIClient нет метода {operation['method']}"
+        with pytest.raises(ScenarioError):
+            WorkloadEngine(RecordingClient(), {"operations": [], "duration": 1})
@@ -1,15 +1,79 @@
 import requests
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Callable, Optional, Tuple
+from urllib.parse import urlparse
 import allure
 
+from utils.body_capture import BodySampler, JsonlCaptureSink, body_preview
+from utils.http_pool import PooledHTTPAdapter
+from utils.lead_pagination import LeadPageIterator
+from utils.metrics_exporter import RunMetrics, active_metrics
+from utils.request_timing import TimingHTTPAdapter, normalize_endpoint
+from utils.rate_limiter import AdaptiveRateLimiter
+from utils.resilience import CircuitBreaker, DeadlineExceededError, RetryPolicy
+from utils.response_cache import ResponseCache
+from utils.single_flight import SingleFlight
+
 class APIClient:
     """Клиент для работы с API"""
     
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(self, base_url: str, api_key: str, pooled: bool = False,
+                 pool_maxsize: int = 10, pool_size_per_host: Optional[Dict[str, int]] = None,
+                 prewarm_connections: int = 0, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 cache: Optional[ResponseCache] = None,
+                 on_request_timing: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 body_sampler: Optional[BodySampler] = None,
+                 capture_sink: Optional[JsonlCaptureSink] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 metrics: Optional[RunMetrics] = None):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.logger = logging.getLogger(__name__)
+        self.session: Optional[requests.Session] = None
+        self.adapter: Optional[PooledHTTPAdapter] = None
+        # Повторы и предохранитель включаются явно: без них одна попытка без таймаута, как до их появления.
+        # Общий для хоста предохранитель - CircuitBreaker.for_host
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1, deadline=None, attempt_timeout=None)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(failure_threshold=0)
+        self.cache = cache
+        self.on_request_timing = on_request_timing
+        # Без выборки тела логируются все, но только при включенном DEBUG
+        self.body_sampler = body_sampler
+        self.capture_sink = capture_sink
+        self.single_flight = single_flight
+        self.rate_limiter = rate_limiter
+        # Без явных метрик используются метрики, включенные для процесса
+        self.metrics = metrics
+        
+        # Фазы запроса измеряются на уровне соединений, поэтому требуют сессии
+        if pooled or on_request_timing is not None:
+            self._init_pool(pool_maxsize, pool_size_per_host, prewarm_connections)
+        
+    def _init_pool(self, pool_maxsize: int, pool_size_per_host: Optional[Dict[str, int]],
+                   prewarm_connections: int) -> None:
+        """Инициализация сессии с пулом keep-alive соединений"""
+        adapter_class = TimingHTTPAdapter if self.on_request_timing is not None else PooledHTTPAdapter
+        self.adapter = adapter_class(pool_maxsize=pool_maxsize, pool_size_per_host=pool_size_per_host)
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        
+        if prewarm_connections > 0:
+            self.adapter.prewarm(self.base_url, prewarm_connections)
+        
+    def get_pool_stats(self) -> Dict[str, int]:
+        """Получение счетчиков попаданий и промахов пула соединений"""
+        if self.adapter is None:
+            return {"hits": 0, "misses": 0, "prewarmed": 0}
+        return self.adapter.get_pool_stats()
+        
+    def close(self) -> None:
+        """Закрытие пула соединений"""
+        if self.session is not None:
+            self.session.close()
         
     def _get_headers(self) -> Dict[str, str]:
         """Получение заголовков для запросов"""
@@ -20,33 +84,203 @@ class APIClient:
             "User-Agent": "Python/Requests"
         }
         
-    def _make_request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
-        """Выполнение HTTP запроса"""
+    def _make_request(self, method: str, endpoint: str, strict: bool = False,
+                      invalidates: Tuple[str, ...] = (), **kwargs) -> requests.Response:
+        """Выполнение HTTP запроса
+
+        Успешные GET ответы берутся из кэша, если он подключен и не передан
+        strict=True. Одновременные одинаковые GET запросы объединяются в один,
+        если подключен single_flight. Любой изменяющий запрос сбрасывает кэш
+        своего URL и связанных эндпоинтов из invalidates.
+        """
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         headers = self._get_headers()
         
         if "headers" in kwargs:
             headers.update(kwargs.pop("headers"))
         
-        self.logger.info(f"Выполнение {method} запроса к {url}")
+        if method != "GET":
+            try:
+                return self._request_with_retries(method, url, headers, **kwargs)
+            finally:
+                self._invalidate_cache(endpoint, *invalidates)
+        if strict or kwargs.get("stream"):
+            return self._request_with_retries(method, url, headers, **kwargs)
+        if self.cache is None or self.cache.strict:
+            return self._coalesced_get(url, headers, **kwargs)
+        
+        cache_key = ResponseCache.make_key(url, kwargs.get("params"))
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.logger.info(f"Ответ для {url} получен из кэша")
+            return cached
+        
+        response = self._coalesced_get(url, headers, **kwargs)
+        if response.ok:
+            self.cache.put(cache_key, response)
+        return response
+        
+    def _coalesced_get(self, url: str, headers: Dict[str, str], **kwargs) -> requests.Response:
+        """GET запрос, общий для всех потоков, запросивших тот же URL одновременно"""
+        if self.single_flight is None:
+            return self._request_with_retries("GET", url, headers, **kwargs)
+        return self.single_flight.do(
+            ResponseCache.make_key(url, kwargs.get("params")),
+            lambda: self._request_with_retries("GET", url, headers, **kwargs)
+        )
+        
+    def get_rate_limit_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Текущая скорость и время ожидания по бюджетам ограничителя"""
+        if self.rate_limiter is None:
+            return {}
+        return self.rate_limiter.get_metrics()
+        
+    def get_single_flight_stats(self) -> Dict[str, int]:
+        """Число объединенных GET запросов"""
+        if self.single_flight is None:
+            return {"executed": 0, "saved": 0, "in_flight": 0}
+        return self.single_flight.get_stats()
+        
+    def _invalidate_cache(self, *endpoints: str) -> None:
+        """Сброс закэшированных ответов для связанных эндпоинтов"""
+        if self.cache is None:
+            return
+        for endpoint in endpoints:
+            self.cache.invalidate(f"{self.base_url}/{endpoint.lstrip('/')}")
+        
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Статистика кэша ответов"""
+        if self.cache is None:
+            return {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "size": 0}
+        return self.cache.get_stats()
+        
+    def _request_with_retries(self, method: str, url: str, headers: Dict[str, str],
+                              **kwargs) -> requests.Response:
+        """Выполнение HTTP запроса с повторными попытками в пределах дедлайна"""
+        policy = self.retry_policy
+        retryable = policy.is_retryable_request(method, headers)
+        deadline = time.monotonic() + policy.deadline if policy.deadline else None
+        requested_timeout = kwargs.pop("timeout", policy.attempt_timeout)
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url)
+            timeout = requested_timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceededError(f"Превышен дедлайн {policy.deadline} сек для {method} {url}")
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            
+            self.circuit_breaker.before_request()
+            try:
+                response = self._send(method, url, headers, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.circuit_breaker.record_failure()
+                if not retryable or not self._wait_before_retry(attempt, deadline):
+                    raise
+                self.logger.warning(f"Попытка {attempt} {method} {url} не удалась: {str(e)}")
+                continue
+            except Exception:
+                self.circuit_breaker.release()
+                raise
+            if self.rate_limiter is not None:
+                self.rate_limiter.record_response(url, response.status_code, response.headers,
+                                                  policy.get_retry_after(response))
+            
+            if response.status_code not in policy.retry_statuses:
+                self.circuit_breaker.record_success()
+                return response
+            
+            if response.status_code == 429:
+                self.circuit_breaker.release()
+            else:
+                self.circuit_breaker.record_failure()
+            if not retryable or not self._wait_before_retry(attempt, deadline, policy.get_retry_after(response)):
+                return response
+            self.logger.warning(f"Попытка {attempt} {method} {url}: статус {response.status_code}, повторяем")
+            
+    def _wait_before_retry(self, attempt: int, deadline: Optional[float],
+                           retry_after: Optional[float] = None) -> bool:
+        """Ожидание перед повторной попыткой, False если попытки или время исчерпаны"""
+        if attempt >= self.retry_policy.max_attempts:
+            return False
+        delay = self.retry_policy.get_backoff(attempt)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
         
+    def _send(self, method: str, url: str, headers: Dict[str, str], **kwargs) -> requests.Response:
+        """Выполнение одной попытки HTTP запроса"""
+        self.logger.info("Выполнение %s запроса к %s", method, url)
+        
+        metrics = self.metrics if self.metrics is not None else active_metrics()
+        if metrics is not None:
+            metrics.request_started()
+        status = "error"
+        started = time.perf_counter()
         try:
-            response = requests.request(
+            transport = self.session if self.session is not None else requests
+            response = transport.request(
                 method=method,
                 url=url,
                 headers=headers,
                 **kwargs
             )
+            status = response.status_code
+            if self.on_request_timing is not None:
+                self._emit_request_timing(method, url, response, (time.perf_counter() - started) * 1000)
             
-            self.logger.info(f"Получен ответ: {response.status_code}")
-            if response.text:
-                self.logger.debug(f"Тело ответа: {response.text[:1000]}")
+            self.logger.info("Получен ответ: %s", response.status_code)
+            if not kwargs.get("stream"):
+                self._log_body(method, url, response)
                 
             return response
             
         except Exception as e:
             self.logger.error(f"Ошибка при выполнении запроса: {str(e)}")
             raise
+        finally:
+            if metrics is not None:
+                metrics.request_finished(method, normalize_endpoint(urlparse(url).path), status,
+                                         time.perf_counter() - started)
+            
+    def _log_body(self, method: str, url: str, response: requests.Response) -> None:
+        """Логирование и сохранение тела ответа, если оно попало в выборку"""
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        if not debug and self.capture_sink is None:
+            return
+        if self.body_sampler is not None and not self.body_sampler.should_sample(response.status_code):
+            return
+        if debug and response.content:
+            self.logger.debug("Тело ответа: %s", body_preview(response.content))
+        if self.capture_sink is not None:
+            try:
+                self.capture_sink.capture(method, url, response)
+            except OSError as e:
+                self.logger.warning(f"Не удалось сохранить тело ответа: {str(e)}")
+            
+    def _emit_request_timing(self, method: str, url: str, response: requests.Response, total: float) -> None:
+        """Передача фаз запроса в обработчик on_request_timing"""
+        phases = getattr(response, "phase_timings", None) or {"dns": 0.0, "connect": 0.0, "tls": 0.0, "ttfb": 0.0}
+        event = {
+            "method": method,
+            "url": url,
+            "endpoint": normalize_endpoint(urlparse(url).path),
+            "status": response.status_code,
+            **phases,
+            "download": max(0.0, total - sum(phases.values())),
+            "total": total
+        }
+        try:
+            self.on_request_timing(event)
+        except Exception as e:
+            self.logger.warning(f"Ошибка в обработчике фаз запроса: {str(e)}")
             
     def get(self, endpoint: str, **kwargs) -> requests.Response:
         """Выполнение GET запроса"""
@@ -73,10 +307,15 @@ class APIClient:
             self.logger.error(f"Ошибка при поиске лидов: {str(e)}")
             return {"status": "error", "message": str(e)}
 
-    def get_lead(self, lead_id: int) -> Dict[str, Any]:
+    def iter_search_leads(self, query_params: Optional[Dict[str, Any]] = None, limit: int = 100,
+                          prefetch: int = 1) -> LeadPageIterator:
+        """Итератор по всем лидам результата поиска с предзагрузкой следующих страниц"""
+        return LeadPageIterator(self, query_params, limit=limit, prefetch=prefetch)
+
+    def get_lead(self, lead_id: int, strict: bool = False) -> Dict[str, Any]:
         """Получение информации о лиде"""
         try:
-            response = self._make_request('GET', f'/leads/{lead_id}')
+            response = self._make_request('GET', f'/leads/{lead_id}', strict=strict)
             return response.json()
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Ошибка при получении лида {lead_id}: {str(e)}")
@@ -91,18 +330,33 @@ class APIClient:
             self.logger.error(f"Ошибка при создании лида: {str(e)}")
             return {"status": "error", "message": str(e)}
 
+    def create_lead_async(self, lead_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Постановка лида в очередь на асинхронное создание"""
+        try:
+            response = self._make_request('POST', '/v1/lead/create-async/', json=lead_data)
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Ошибка при асинхронном создании лида: {str(e)}")
+            return {"status": "error", "message": str(e)}
+
     def update_lead(self, lead_id: int, lead_data: Dict[str, Any]) -> Dict[str, Any]:
         """Обновление информации о лиде"""
-        return self._make_request('PUT', f'/leads/{lead_id}', json=lead_data).json()
+        return self._make_request(
+            'PUT', f'/leads/{lead_id}', json=lead_data, invalidates=(f'/leads/{lead_id}/telegram',)
+        ).json()
 
     def delete_lead(self, lead_id: int) -> Dict[str, Any]:
         """Удаление лида"""
-        return self._make_request('DELETE', f'/leads/{lead_id}').json()
+        return self._make_request(
+            'DELETE', f'/leads/{lead_id}', invalidates=(f'/leads/{lead_id}/telegram',)
+        ).json()
 
-    def get_telegram_info(self, lead_id: int) -> Dict[str, Any]:
+    def get_telegram_info(self, lead_id: int, strict: bool = False) -> Dict[str, Any]:
         """Получение информации о Telegram лида"""
-        return self._make_request('GET', f'/leads/{lead_id}/telegram').json()
+        return self._make_request('GET', f'/leads/{lead_id}/telegram', strict=strict).json()
 
     def update_telegram_info(self, lead_id: int, telegram_data: Dict[str, Any]) -> Dict[str, Any]:
         """Обновление информации о Telegram лида"""
-        return self._make_request('PUT', f'/leads/{lead_id}/telegram', json=telegram_data).json() 
\ No newline at end of file
+        return self._make_request(
+            'PUT', f'/leads/{lead_id}/telegram', json=telegram_data, invalidates=(f'/leads/{lead_id}',)
+        ).json() 
\ No newline at end of file
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from utils.metrics_exporter import RunMetrics, active_metrics
+from utils.rate_limiter import AdaptiveRateLimiter
+from utils.request_timing import normalize_endpoint
+from utils.resilience import RetryPolicy
+
+
+class AsyncAPIResponse:
+    """Ответ асинхронного клиента с интерфейсом, повторяющим requests.Response"""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes, url: str,
+                 elapsed: float):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class AsyncAPIClient:
+    """Асинхронный клиент для работы с API"""
+
+    def __init__(self, base_url: str, api_key: str, max_connections: int = 1000,
+                 timeout: Optional[float] = 30, rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 metrics: Optional[RunMetrics] = None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.logger = logging.getLogger(__name__)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncAPIClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def _get_headers(self) -> Dict[str, str]:
+        """Получение заголовков для запросов"""
+        return {
+            "X-Api-Key": self.api_key,
+            "Content-Type": "application/json",
+            "Accept": "*/*",
+            "User-Agent": "Python/aiohttp"
+        }
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Ленивое создание сессии, привязанной к текущему event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=0)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self._get_headers())
+        return self._session
+
+    async def close(self) -> None:
+        """Закрытие сессии и всех открытых соединений"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _make_request(self, method: str, endpoint: str, timeout: Optional[float] = None,
+                            **kwargs) -> AsyncAPIResponse:
+        """Выполнение HTTP запроса с таймаутом на весь вызов"""
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        call_timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+
+        if self.rate_limiter is not None:
+            delay = self.rate_limiter.reserve(url)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self.logger.debug("Выполнение %s запроса к %s", method, url)
+
+        metrics = self.metrics if self.metrics is not None else active_metrics()
+        if metrics is not None:
+            metrics.request_started()
+        status = "error"
+        started = loop.time()
+        try:
+            async with self._get_session().request(
+                method,
+                url,
+                timeout=aiohttp.ClientTimeout(total=call_timeout),
+                **kwargs
+            ) as response:
+                content = await response.read()
+                status = response.status
+        except asyncio.TimeoutError:
+            self.logger.error("Превышен таймаут %s сек для %s %s", call_timeout, method, url)
+            raise
+        except aiohttp.ClientError as e:
+            self.logger.error("Ошибка при выполнении запроса: %s", e)
+            raise
+        finally:
+            if metrics is not None:
+                metrics.request_finished(method, normalize_endpoint(urlparse(url).path), status,
+                                         loop.time() - started)
+
+        self.logger.debug("Получен ответ: %s", response.status)
+        if self.rate_limiter is not None:
+            self.rate_limiter.record_response(url, response.status, response.headers,
+                                              RetryPolicy.get_retry_after(response))
+        return AsyncAPIResponse(
+            status_code=response.status,
+            headers=dict(response.headers),
+            content=content,
+            url=url,
+            elapsed=loop.time() - started
+        )
+
+    async def get(self, endpoint: str, **kwargs) -> AsyncAPIResponse:
+        """Выполнение GET запроса"""
+        return await self._make_request("GET", endpoint, **kwargs)
+
+    async def post(self, endpoint: str, **kwargs) -> AsyncAPIResponse:
+        """Выполнение POST запроса"""
+        return await self._make_request("POST", endpoint, **kwargs)
+
+    async def put(self, endpoint: str, **kwargs) -> AsyncAPIResponse:
+        """Выполнение PUT запроса"""
+        return await self._make_request("PUT", endpoint, **kwargs)
+
+    async def delete(self, endpoint: str, **kwargs) -> AsyncAPIResponse:
+        """Выполнение DELETE запроса"""
+        return await self._make_request("DELETE", endpoint, **kwargs)
+
+    async def search_leads(self, query_params: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Поиск лидов по параметрам"""
+        try:
+            response = await self._make_request('GET', '/leads/search', params=query_params, **kwargs)
+            return response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.error(f"Ошибка при поиске лидов: {str(e)}")
+            return {"status": "error", "message": str(e)}
+
+    async def get_lead(self, lead_id: int, **kwargs) -> Dict[str, Any]:
+        """Получение информации о лиде"""
+        try:
+            response = await self._make_request('GET', f'/leads/{lead_id}', **kwargs)
+            return response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.error(f"Ошибка при получении лида {lead_id}: {str(e)}")
+            return {"status": "error", "message": str(e)}
+
+    async def create_lead(self, lead_data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Создание нового лида"""
+        try:
+            response = await self._make_request('POST', '/leads', json=lead_data, **kwargs)
+            return response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.error(f"Ошибка при создании лида: {str(e)}")
+            return {"status": "error", "message": str(e)}
+
+    async def create_lead_async(self, lead_data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Постановка лида в очередь на асинхронное создание"""
+        try:
+            response = await self._make_request('POST', '/v1/lead/create-async/', json=lead_data, **kwargs)
+            return response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.error(f"Ошибка при асинхронном создании лида: {str(e)}")
+            return {"status": "error", "message": str(e)}
+
+    async def update_lead(self, lead_id: int, lead_data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Обновление информации о лиде"""
+        return (await self._make_request('PUT', f'/leads/{lead_id}', json=lead_data, **kwargs)).json()
+
+    async def delete_lead(self, lead_id: int, **kwargs) -> Dict[str, Any]:
+        """Удаление лида"""
+        return (await self._make_request('DELETE', f'/leads/{lead_id}', **kwargs)).json()
+
+    async def get_telegram_info(self, lead_id: int, **kwargs) -> Dict[str, Any]:
+        """Получение информации о Telegram лида"""
+        return (await self._make_request('GET', f'/leads/{lead_id}/telegram', **kwargs)).json()
+
+    async def update_telegram_info(self, lead_id: int, telegram_data: Dict[str, Any],
+                                   **kwargs) -> Dict[str, Any]:
+        """Обновление информации о Telegram лида"""
+        return (await self._make_request(
+            'PUT', f'/leads/{lead_id}/telegram', json=telegram_data, **kwargs
+        )).json()
+
+
+async def run_bounded(calls: Iterable[Callable[[], Awaitable[Any]]], concurrency: int,
+                      return_exceptions: bool = True) -> List[Any]:
+    """Выполнение корутин с ограничением числа одновременно выполняемых вызовов
+
+    Вызовы берутся из итератора лениво, поэтому в памяти одновременно
+    находится не более concurrency корутин. Результаты возвращаются
+    в порядке исходных вызовов.
+    """
+    pending = enumerate(calls)
+    results: Dict[int, Any] = {}
+
+    async def worker() -> None:
+        for index, call in pending:
+            try:
+                results[index] = await call()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results[index] = e
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+
+    return [results[index] for index in sorted(results)]
@@ -0,0 +1,98 @@
+import gzip
+import json
+import threading
+import time
+from pathlib import Path
+from typing import IO, Optional, Union
+
+import requests
+
+
+def body_preview(content: Optional[bytes], limit: int = 1000) -> str:
+    """Декодирование только начала тела, а не всего ответа"""
+    if not content:
+        return ""
+    return content[:limit].decode("utf-8", errors="replace")
+
+
+class BodySampler:
+    """Выборка тел запросов для логирования и сохранения
+
+    every=N пропускает каждое N-е тело (1 - все, 0 - ни одного успешного),
+    errors_only=True оставляет только ответы со статусом вне 2xx.
+    Ответы с ошибками при always_errors=True попадают в выборку всегда.
+    """
+
+    def __init__(self, every: int = 1, errors_only: bool = False, always_errors: bool = True):
+        self.every = every
+        self.errors_only = errors_only
+        self.always_errors = always_errors
+        self._lock = threading.Lock()
+        self._seen = 0
+
+    def should_sample(self, status_code: int) -> bool:
+        """Нужно ли сохранять тело ответа с данным статусом"""
+        is_error = not 200 <= status_code < 300
+        if is_error and (self.errors_only or self.always_errors):
+            return True
+        if self.errors_only or self.every <= 0:
+            return False
+        with self._lock:
+            self._seen += 1
+            return self._seen % self.every == 0
+
+
+class JsonlCaptureSink:
+    """Запись запросов и ответов в JSONL файл, для путей .gz - со сжатием gzip
+
+    Каждая строка содержит метод, URL, статус, время ответа и тела,
+    обрезанные до max_body_bytes.
+    """
+
+    def __init__(self, path: Union[str, Path], max_body_bytes: int = 4096):
+        self.path = Path(path)
+        self.max_body_bytes = max_body_bytes
+        self._lock = threading.Lock()
+        self._file: Optional[IO[str]] = None
+        self.written = 0
+
+    def _open(self) -> IO[str]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.suffix == ".gz":
+            return gzip.open(self.path, "at", encoding="utf-8")
+        return open(self.path, "a", encoding="utf-8")
+
+    def capture(self, method: str, url: str, response: requests.Response) -> None:
+        """Сохранение пары запрос/ответ"""
+        request_body = getattr(response.request, "body", None)
+        if isinstance(request_body, str):
+            request_body = request_body.encode("utf-8")
+        record = {
+            "ts": time.time(),
+            "method": method,
+            "url": url,
+            "status": response.status_code,
+            "elapsed_ms": round(response.elapsed.total_seconds() * 1000, 3),
+            "request_body": body_preview(request_body if isinstance(request_body, bytes) else None,
+                                         self.max_body_bytes),
+            "response_body": body_preview(response.content, self.max_body_bytes)
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = self._open()
+            self._file.write(line)
+            self.written += 1
+
+    def close(self) -> None:
+        """Закрытие файла"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "JsonlCaptureSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
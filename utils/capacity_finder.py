@@ -0,0 +1,274 @@
+import argparse
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import allure
+import requests
+
+from utils.latency_histogram import LatencyHistogram
+from utils.load_generator import OpenLoopLoadGenerator
+
+# Эндпоинты Liner API, для которых ищется пропускная способность
+LINER_ENDPOINTS = {
+    "lead/create": ("POST", "/v1/lead/create/"),
+    "lead/detail": ("GET", "/v1/lead/detail/{lead_id}"),
+    "lead/update": ("PUT", "/v1/lead/update/{lead_id}"),
+    "create-async": ("POST", "/v1/lead/create-async/"),
+}
+# Эндпоинты, которым нужен созданный заранее лид
+LEAD_ENDPOINTS = ("lead/detail", "lead/update")
+
+
+class CapacityFinder:
+    """Поиск устойчивой пропускной способности и точки перегиба
+
+    Нагрузка подается открытым циклом ступенями по step_duration секунд:
+    сначала интенсивность растет в growth раз от start_rps, пока ступень
+    не нарушит ограничения, затем граница уточняется бинарным поиском
+    до относительной точности precision. Ступень проходит, если p99
+    (с учетом coordinated omission) не больше slo_p99_ms, доля ошибок
+    не больше max_error_rate, ни один запрос не отброшен и фактическая
+    интенсивность не ниже min_achieved_ratio от заданной.
+    Точка перегиба - наибольшая пройденная интенсивность, при которой p99
+    не выше knee_factor от p99 на самой низкой нагрузке.
+    """
+
+    def __init__(self, slo_p99_ms: float = 1000.0, max_error_rate: float = 0.01, step_duration: float = 10.0,
+                 start_rps: float = 1.0, max_rps: float = 100.0, min_rps: float = 0.5, growth: float = 2.0,
+                 precision: float = 0.1, knee_factor: float = 2.0, max_in_flight: int = 200,
+                 min_achieved_ratio: float = 0.9):
+        if growth <= 1:
+            raise ValueError("Множитель роста нагрузки должен быть больше 1")
+        self.slo_p99_ms = slo_p99_ms
+        self.max_error_rate = max_error_rate
+        self.step_duration = step_duration
+        self.start_rps = start_rps
+        self.max_rps = max_rps
+        self.min_rps = min_rps
+        self.growth = growth
+        self.precision = precision
+        self.knee_factor = knee_factor
+        self.max_in_flight = max_in_flight
+        self.min_achieved_ratio = min_achieved_ratio
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], endpoint: Optional[str] = None) -> "CapacityFinder":
+        """Создание по секции capacity конфигурации с переопределениями для эндпоинта"""
+        settings = dict(config.get("capacity", {}))
+        overrides = settings.pop("endpoints", {})
+        if endpoint is not None:
+            settings.update(overrides.get(endpoint, {}))
+        return cls(**settings)
+
+    def evaluate(self, rate: float, func: Callable[..., Any], *args, **kwargs) -> Dict[str, Any]:
+        """Одна ступень нагрузки с заданной интенсивностью"""
+        histogram = LatencyHistogram()
+        errors = [0]
+        lock = threading.Lock()
+
+        def on_result(record: Dict[str, Any]) -> None:
+            histogram.record_seconds(record["scheduled_response_time"])
+            if not record["success"]:
+                with lock:
+                    errors[0] += 1
+
+        generator = OpenLoopLoadGenerator(rate, duration=self.step_duration, max_in_flight=self.max_in_flight,
+                                          on_result=on_result, keep_results=False)
+        summary = generator.run(func, *args, **kwargs)
+        latency = histogram.get_percentiles()
+        error_rate = errors[0] / summary["sent"] if summary["sent"] else 1.0
+
+        reasons = []
+        if latency["p99"] > self.slo_p99_ms:
+            reasons.append(f"p99 {latency['p99']:.1f} мс > {self.slo_p99_ms} мс")
+        if error_rate > self.max_error_rate:
+            reasons.append(f"ошибок {error_rate:.1%} > {self.max_error_rate:.1%}")
+        if summary["dropped"]:
+            reasons.append(f"отброшено {summary['dropped']} запросов")
+        if summary["achieved_rps"] < self.min_achieved_ratio * rate:
+            reasons.append(f"фактически {summary['achieved_rps']:.1f} запр/с")
+
+        step = {
+            "rate": rate,
+            "achieved_rps": summary["achieved_rps"],
+            "sent": summary["sent"],
+            "errors": errors[0],
+            "error_rate": error_rate,
+            "dropped": summary["dropped"],
+            "p50_ms": latency["p50"],
+            "p99_ms": latency["p99"],
+            "passed": not reasons,
+            "reason": "; ".join(reasons)
+        }
+        self.logger.info(f"Ступень {rate:.2f} запр/с: p99 {latency['p99']:.1f} мс, ошибок {error_rate:.1%}, "
+                         f"{'пройдена' if step['passed'] else 'не пройдена: ' + step['reason']}")
+        return step
+
+    def find(self, func: Callable[..., Any], *args, name: str = "", **kwargs) -> Dict[str, Any]:
+        """Поиск наибольшей интенсивности, выдерживающей ограничения"""
+        steps: List[Dict[str, Any]] = []
+        passed: Optional[float] = None
+        failed: Optional[Dict[str, Any]] = None
+
+        rate = self.start_rps
+        while rate <= self.max_rps:
+            step = self.evaluate(rate, func, *args, **kwargs)
+            steps.append(step)
+            if not step["passed"]:
+                failed = step
+                break
+            passed = rate
+            if rate == self.max_rps:
+                break
+            rate = min(rate * self.growth, self.max_rps)
+
+        if failed is not None:
+            low, high = passed or 0.0, failed["rate"]
+            while high - low > self.precision * high:
+                rate = (low + high) / 2
+                if rate < self.min_rps:
+                    break
+                step = self.evaluate(rate, func, *args, **kwargs)
+                steps.append(step)
+                if step["passed"]:
+                    low = passed = rate
+                else:
+                    high = rate
+                    failed = step
+
+        steps.sort(key=lambda s: s["rate"])
+        baseline_p99 = steps[0]["p99_ms"] if steps else 0.0
+        knee = None
+        for step in steps:
+            if step["passed"] and step["p99_ms"] <= self.knee_factor * max(baseline_p99, 1.0):
+                knee = step["rate"]
+        result = {
+            "name": name,
+            "sustainable_rps": passed or 0.0,
+            "knee_rps": knee,
+            "capped": failed is None,
+            "limit_reason": failed["reason"] if failed is not None else f"достигнут предел {self.max_rps} запр/с",
+            "slo_p99_ms": self.slo_p99_ms,
+            "max_error_rate": self.max_error_rate,
+            "steps": steps
+        }
+        self.logger.info(f"Пропускная способность {name}: {result['sustainable_rps']:.2f} запр/с, "
+                         f"перегиб {knee}, ограничение: {result['limit_reason']}")
+        return result
+
+    @staticmethod
+    def format_report(result: Dict[str, Any]) -> str:
+        """Текстовая таблица ступеней поиска"""
+        knee = f"{result['knee_rps']:.2f}" if result["knee_rps"] is not None else "-"
+        lines = [
+            f"Эндпоинт: {result['name']}",
+            f"Устойчивая интенсивность: {result['sustainable_rps']:.2f} запр/с, точка перегиба: {knee} запр/с",
+            f"Ограничение: {result['limit_reason']}",
+            "",
+            f"{'запр/с':>10}{'факт':>8}{'ошибок':>9}{'p50, мс':>10}{'p99, мс':>10}  результат"
+        ]
+        for step in result["steps"]:
+            lines.append(
+                f"{step['rate']:>10.2f}{step['achieved_rps']:>8.1f}{step['error_rate']:>9.1%}"
+                f"{step['p50_ms']:>10.1f}{step['p99_ms']:>10.1f}  {'OK' if step['passed'] else step['reason']}"
+            )
+        return "\n".join(lines)
+
+    @classmethod
+    def attach_to_allure(cls, result: Dict[str, Any]) -> None:
+        """Прикрепление результата поиска к отчету Allure"""
+        allure.attach(cls.format_report(result), f"Пропускная способность {result['name']}",
+                      allure.attachment_type.TEXT)
+
+
+def endpoint_call(client, endpoint: str, payload: Dict[str, Any], lead_id: Any = None) -> Callable[[], Any]:
+    """Функция одного запроса к эндпоинту Liner API, неуспешный статус - исключение"""
+    method, path = LINER_ENDPOINTS[endpoint]
+    path = path.format(lead_id=lead_id)
+    body = None if method == "GET" else payload
+
+    def call():
+        response = client._make_request(method, path, json=body)
+        if not response.ok:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        return response
+
+    return call
+
+
+def create_probe_lead(client, payload: Dict[str, Any]) -> Optional[Any]:
+    """Создание лида для эндпоинтов из LEAD_ENDPOINTS, None если лид создать не удалось"""
+    logger = logging.getLogger(__name__)
+    try:
+        response = client._make_request("POST", LINER_ENDPOINTS["lead/create"][1], json=payload)
+        created = response.json() if response.ok else None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Ошибка при создании лида: {str(e)}")
+        return None
+    if not isinstance(created, dict):
+        created = {}
+    lead_id = created.get("id") or created.get("lead_id")
+    if lead_id is None:
+        logger.error(f"Лид не создан: HTTP {response.status_code}, ответ без id")
+    return lead_id
+
+
+def main() -> None:
+    """Поиск пропускной способности эндпоинтов для окружений из config/config.json"""
+    from config.constants import REPORTS_DIR
+    from utils.api_client import APIClient
+    from utils.config_loader import ConfigLoader
+    from utils.resilience import CircuitBreaker, RetryPolicy
+
+    config_loader = ConfigLoader()
+    parser = argparse.ArgumentParser(description="Поиск пропускной способности эндпоинтов Liner API")
+    environments = [name for name, env in config_loader.config["environments"].items() if env.get("apiUrl")]
+    parser.add_argument("--env", nargs="+", default=environments,
+                        help="Окружения (по умолчанию все из конфигурации с apiUrl)")
+    parser.add_argument("--endpoints", nargs="+", default=list(LINER_ENDPOINTS), choices=list(LINER_ENDPOINTS))
+    parser.add_argument("--output", default=str(REPORTS_DIR / "capacity.json"), help="Файл отчета")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    payload = {
+        "lead_type": "straight",
+        "create_method": "capacity_test",
+        "client_name": "Capacity Test Lead",
+        "client_phone": "+79991234567",
+        "order_id": 2640
+    }
+    finders = {endpoint: CapacityFinder.from_config(config_loader.config, endpoint) for endpoint in args.endpoints}
+    report: Dict[str, Dict[str, Any]] = {}
+    for env in args.env:
+        # Без ограничителя скорости, повторов и предохранителя, чтобы измерять сам сервер,
+        # пул рассчитан на все запросы ступени в работе одновременно
+        client = APIClient(config_loader.get_api_url(env), config_loader.get_api_key(env), pooled=True,
+                           pool_maxsize=max(finder.max_in_flight for finder in finders.values()),
+                           retry_policy=RetryPolicy(max_attempts=1),
+                           circuit_breaker=CircuitBreaker(failure_threshold=0))
+        endpoints = list(args.endpoints)
+        lead_id = None
+        if set(LEAD_ENDPOINTS) & set(endpoints):
+            lead_id = create_probe_lead(client, payload)
+            if lead_id is None:
+                skipped = [endpoint for endpoint in endpoints if endpoint in LEAD_ENDPOINTS]
+                print(f"{env}: не удалось создать лид, эндпоинты {', '.join(skipped)} пропущены", end="\n\n")
+                endpoints = [endpoint for endpoint in endpoints if endpoint not in LEAD_ENDPOINTS]
+        report[env] = {}
+        for endpoint in endpoints:
+            finder = finders[endpoint]
+            result = finder.find(endpoint_call(client, endpoint, payload, lead_id), name=f"{env} {endpoint}")
+            report[env][endpoint] = result
+            print(CapacityFinder.format_report(result), end="\n\n")
+        client.close()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Отчет сохранен в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
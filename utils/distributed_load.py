@@ -0,0 +1,372 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple
+
+import allure
+
+from utils.multiprocess_load import merge_snapshots, resolve_factory
+from utils.workload import WorkloadEngine, load_scenario, validate_scenario
+
+# Протокол: JSON объекты, по одному на строку, в обе стороны одного TCP соединения.
+# Агент -> координатор: hello, pong, snapshot (final=true для последнего), error.
+# Координатор -> агент: ping, run, shutdown.
+
+# Фабрики клиентов, которые агент создает по команде run без явного разрешения
+AGENT_CLIENT_FACTORIES = ("utils.api_client:APIClient",)
+
+
+def send_message(stream: BinaryIO, message: Dict[str, Any]) -> None:
+    stream.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+    stream.flush()
+
+
+def read_message(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Следующее сообщение или None, если соединение закрыто, ValueError для строки не по протоколу"""
+    line = stream.readline()
+    if not line:
+        return None
+    message = json.loads(line)
+    if not isinstance(message, dict) or "type" not in message:
+        raise ValueError(f"Сообщение без типа: {line[:100]!r}")
+    return message
+
+
+def split_users(total: int, agents: int) -> List[int]:
+    """Распределение виртуальных пользователей между агентами поровну"""
+    base, extra = divmod(total, agents)
+    return [base + (1 if index < extra else 0) for index in range(agents)]
+
+
+class _AgentConnection:
+    def __init__(self, index: int, sock: socket.socket, hello: Dict[str, Any], stream: BinaryIO):
+        self.index = index
+        self.sock = sock
+        self.stream = stream
+        self.name = hello.get("name") or f"agent-{index}"
+        self.clock_offset = 0.0
+        self.rtt = 0.0
+        self.users = 0
+        self.last_seen = time.monotonic()
+        self.finished = False
+        self.lost = False
+
+
+class LoadCoordinator:
+    """Координатор распределенной нагрузки
+
+    Агенты (python -m utils.distributed_load agent) подключаются к
+    координатору по TCP. Координатор оценивает смещение часов каждого
+    агента, делит виртуальных пользователей сценария между агентами и
+    назначает общий момент старта на start_delay секунд вперед. Агенты
+    присылают накопленные гистограммы раз в snapshot_interval секунд.
+    Агент, закрывший соединение или молчащий дольше agent_timeout секунд,
+    считается выбывшим: его последний снимок остается в сводке, а сам он
+    попадает в lost_agents. Подключение, которое не прошло hello и
+    синхронизацию часов за handshake_timeout секунд, закрывается, и
+    координатор продолжает ждать агентов.
+    """
+
+    def __init__(self, scenario: Dict[str, Any], client_factory: str, client_kwargs: Optional[Dict[str, Any]] = None,
+                 host: str = "127.0.0.1", port: int = 0, snapshot_interval: float = 1.0,
+                 agent_timeout: float = 10.0, start_delay: float = 1.0, handshake_timeout: float = 5.0):
+        validate_scenario(scenario)
+        self.scenario = scenario
+        self.client_factory = client_factory
+        self.client_kwargs = dict(client_kwargs or {})
+        self.snapshot_interval = snapshot_interval
+        self.agent_timeout = agent_timeout
+        self.start_delay = start_delay
+        self.handshake_timeout = handshake_timeout
+        self.logger = logging.getLogger(__name__)
+        self.agents: List[_AgentConnection] = []
+        self._server = socket.create_server((host, port))
+        self.address: Tuple[str, int] = self._server.getsockname()[:2]
+
+    def __enter__(self) -> "LoadCoordinator":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _sync_clock(self, agent: _AgentConnection, rounds: int = 5) -> None:
+        """Оценка смещения часов агента по обмену ping/pong с наименьшей задержкой"""
+        samples = []
+        for _ in range(rounds):
+            sent = time.time()
+            send_message(agent.stream, {"type": "ping", "t0": sent})
+            reply = read_message(agent.stream)
+            received = time.time()
+            if reply is None or reply["type"] != "pong" or "agent_time" not in reply:
+                raise ConnectionError(f"Агент {agent.name} не ответил на ping")
+            samples.append((received - sent, reply["agent_time"] - (sent + received) / 2))
+        agent.rtt, agent.clock_offset = min(samples)
+
+    def wait_for_agents(self, count: int, timeout: float = 30.0) -> None:
+        """Ожидание подключения count агентов"""
+        deadline = time.monotonic() + timeout
+        while len(self.agents) < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Подключилось {len(self.agents)} агентов из {count}")
+            self._server.settimeout(remaining)
+            try:
+                sock, address = self._server.accept()
+            except socket.timeout:
+                continue
+            # Одно неисправное подключение не должно прерывать ожидание остальных агентов
+            sock.settimeout(min(self.handshake_timeout, remaining))
+            try:
+                agent = self._handshake(sock)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Подключение {address[0]}:{address[1]} отклонено: {str(e) or type(e).__name__}")
+                sock.close()
+                continue
+            sock.settimeout(None)
+            self.agents.append(agent)
+            self.logger.info(f"Подключен агент {agent.name} ({address[0]}): смещение часов "
+                             f"{agent.clock_offset * 1000:.1f} мс, RTT {agent.rtt * 1000:.1f} мс")
+
+    def _handshake(self, sock: socket.socket) -> _AgentConnection:
+        """Приветствие и синхронизация часов нового подключения"""
+        stream = sock.makefile("rwb")
+        hello = read_message(stream)
+        if hello is None or hello["type"] != "hello":
+            raise ConnectionError("первое сообщение не hello")
+        agent = _AgentConnection(len(self.agents), sock, hello, stream)
+        self._sync_clock(agent)
+        return agent
+
+    def _reader(self, agent: _AgentConnection, inbox: "queue.Queue") -> None:
+        try:
+            while True:
+                message = read_message(agent.stream)
+                inbox.put((agent, message))
+                if message is None:
+                    return
+        except (OSError, ValueError):
+            inbox.put((agent, None))
+
+    def run(self, duration: Optional[float] = None, virtual_users: Optional[int] = None,
+            on_snapshot: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Запуск сценария на подключенных агентах и сбор объединенной сводки"""
+        if not self.agents:
+            raise RuntimeError("Нет подключенных агентов")
+        total_users = virtual_users or self.scenario.get("virtual_users", 1)
+        shares = split_users(max(total_users, len(self.agents)), len(self.agents))
+        start_at = time.time() + self.start_delay
+        seed = self.scenario.get("seed")
+        for agent, users in zip(self.agents, shares):
+            agent.users = users
+            send_message(agent.stream, {
+                "type": "run",
+                "scenario": self.scenario,
+                "seed": None if seed is None else seed + agent.index,
+                "client_factory": self.client_factory,
+                "client_kwargs": self.client_kwargs,
+                "duration": duration,
+                "virtual_users": users,
+                "snapshot_interval": self.snapshot_interval,
+                # Момент старта в часах агента
+                "start_at": start_at + agent.clock_offset
+            })
+        self.logger.info(f"Запуск на {len(self.agents)} агентах, пользователи: {shares}")
+
+        inbox: "queue.Queue" = queue.Queue()
+        for agent in self.agents:
+            agent.last_seen = time.monotonic() + self.start_delay
+            threading.Thread(target=self._reader, args=(agent, inbox), daemon=True,
+                             name=f"coordinator-{agent.name}").start()
+
+        latest: Dict[int, Dict[str, Any]] = {}
+        errors: List[str] = []
+        while not all(agent.finished or agent.lost for agent in self.agents):
+            try:
+                agent, message = inbox.get(timeout=self.snapshot_interval)
+            except queue.Empty:
+                agent, message = None, None
+            now = time.monotonic()
+            if agent is not None and not agent.lost:
+                if message is None:
+                    if not agent.finished:
+                        self._mark_lost(agent, "соединение закрыто")
+                elif message.get("type") == "error":
+                    errors.append(f"Агент {agent.name}: {message['error']}")
+                    agent.finished = True
+                elif message.get("type") == "snapshot":
+                    agent.last_seen = now
+                    latest[agent.index] = message
+                    agent.finished = bool(message.get("final"))
+                    if on_snapshot is not None:
+                        on_snapshot(merge_snapshots(list(latest.values()), time.time() - start_at))
+            for candidate in self.agents:
+                if not (candidate.finished or candidate.lost) and now - candidate.last_seen > self.agent_timeout:
+                    self._mark_lost(candidate, f"нет данных {self.agent_timeout} сек")
+
+        summary = merge_snapshots(list(latest.values()), max(time.time() - start_at, 0.0))
+        summary["agents"] = {
+            agent.name: {"users": agent.users, "clock_offset_ms": agent.clock_offset * 1000,
+                         "rps": self._agent_rps(latest.get(agent.index)), "lost": agent.lost}
+            for agent in self.agents
+        }
+        summary["lost_agents"] = [agent.name for agent in self.agents if agent.lost]
+        summary["agent_errors"] = errors
+        for error in errors:
+            self.logger.error(error)
+        return summary
+
+    @staticmethod
+    def _agent_rps(snapshot: Optional[Dict[str, Any]]) -> float:
+        if not snapshot or snapshot["elapsed"] <= 0:
+            return 0.0
+        return sum(op["count"] for op in snapshot["operations"].values()) / snapshot["elapsed"]
+
+    def _mark_lost(self, agent: _AgentConnection, reason: str) -> None:
+        agent.lost = True
+        self.logger.warning(f"Агент {agent.name} выбыл: {reason}")
+        try:
+            agent.sock.close()
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        """Остановка агентов и закрытие соединений"""
+        for agent in self.agents:
+            if not agent.lost:
+                try:
+                    send_message(agent.stream, {"type": "shutdown"})
+                except OSError:
+                    pass
+            agent.sock.close()
+        self.agents.clear()
+        self._server.close()
+
+    @staticmethod
+    def attach_to_allure(summary: Dict[str, Any], name: str = "Распределенная нагрузка") -> None:
+        """Прикрепление итоговой сводки к отчету Allure"""
+        allure.attach(json.dumps(summary, ensure_ascii=False, indent=2), name, allure.attachment_type.JSON)
+
+
+class LoadAgent:
+    """Агент распределенной нагрузки: выполняет свою часть сценария по команде координатора
+
+    Клиент создается только фабриками из client_factories: команда run
+    с любой другой фабрикой отклоняется сообщением error.
+    """
+
+    def __init__(self, host: str, port: int, name: Optional[str] = None, connect_timeout: float = 30.0,
+                 client_factories: Sequence[str] = AGENT_CLIENT_FACTORIES):
+        self.host = host
+        self.port = port
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.connect_timeout = connect_timeout
+        self.client_factories = tuple(client_factories)
+        self.logger = logging.getLogger(__name__)
+
+    def _connect(self) -> socket.socket:
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.2)
+
+    def serve(self) -> None:
+        """Подключение к координатору и выполнение команд до shutdown"""
+        sock = self._connect()
+        sock.settimeout(None)
+        stream = sock.makefile("rwb")
+        try:
+            send_message(stream, {"type": "hello", "name": self.name, "pid": os.getpid()})
+            while True:
+                message = read_message(stream)
+                if message is None or message["type"] == "shutdown":
+                    return
+                if message["type"] == "ping":
+                    send_message(stream, {"type": "pong", "t0": message["t0"], "agent_time": time.time()})
+                elif message["type"] == "run":
+                    self._run(message, stream)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Соединение с координатором потеряно: {str(e)}")
+        finally:
+            sock.close()
+
+    def _run(self, job: Dict[str, Any], stream: BinaryIO) -> None:
+        try:
+            if job["client_factory"] not in self.client_factories:
+                raise PermissionError(f"Фабрика клиента {job['client_factory']} не разрешена агенту")
+            client = resolve_factory(job["client_factory"])(**job["client_kwargs"])
+            engine = WorkloadEngine(client, job["scenario"], seed=job["seed"])
+        except Exception as e:
+            send_message(stream, {"type": "error", "error": str(e)})
+            return
+        delay = job["start_at"] - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        runner = threading.Thread(target=engine.run, args=(job["duration"], job["virtual_users"]), daemon=True)
+        started = time.perf_counter()
+        runner.start()
+        final = False
+        while not final:
+            runner.join(job["snapshot_interval"])
+            # Признак фиксируется до снимка, чтобы последний снимок всегда уходил с final
+            final = not runner.is_alive()
+            send_message(stream, {"type": "snapshot", "final": final,
+                                  "elapsed": time.perf_counter() - started, **engine.snapshot()})
+
+
+def main() -> None:
+    """Запуск координатора или агента распределенной нагрузки"""
+    parser = argparse.ArgumentParser(description="Распределенная нагрузка на API: координатор и агенты")
+    commands = parser.add_subparsers(dest="command", required=True)
+    coordinator = commands.add_parser("coordinator", help="Раздать сценарий агентам и собрать результаты")
+    coordinator.add_argument("scenario", help="JSON файл сценария (см. config/scenarios)")
+    coordinator.add_argument("--agents", type=int, required=True, help="Сколько агентов ждать")
+    coordinator.add_argument("--host", default="0.0.0.0", help="Адрес для подключения агентов")
+    coordinator.add_argument("--port", type=int, default=5557)
+    coordinator.add_argument("--env", default=None, help="Окружение (dev, sm, ask-yug)")
+    coordinator.add_argument("--duration", type=float, default=None, help="Длительность, сек")
+    coordinator.add_argument("--users", type=int, default=None, help="Всего виртуальных пользователей")
+    agent = commands.add_parser("agent", help="Выполнять нагрузку по командам координатора")
+    agent.add_argument("--coordinator", required=True, help="Адрес координатора host:port")
+    agent.add_argument("--name", default=None)
+    agent.add_argument("--allow-factory", action="append", default=[], metavar="MODULE:ATTR",
+                       help="Дополнительная разрешенная фабрика клиента")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.command == "agent":
+        host, _, port = args.coordinator.rpartition(":")
+        LoadAgent(host, int(port), name=args.name,
+                  client_factories=AGENT_CLIENT_FACTORIES + tuple(args.allow_factory)).serve()
+        return
+
+    from utils.config_loader import ConfigLoader
+
+    config_loader = ConfigLoader()
+    # Ключ API передается агентам по тому же соединению, координатор стоит запускать во внутренней сети
+    with LoadCoordinator(
+        load_scenario(args.scenario),
+        "utils.api_client:APIClient",
+        {"base_url": config_loader.get_api_url(args.env), "api_key": config_loader.get_api_key(args.env)},
+        host=args.host,
+        port=args.port
+    ) as runner:
+        print(f"Ожидание {args.agents} агентов на {runner.address[0]}:{runner.address[1]}")
+        runner.wait_for_agents(args.agents, timeout=300)
+        summary = runner.run(duration=args.duration, virtual_users=args.users, on_snapshot=lambda s: print(
+            f"{s['duration_s']:6.1f} сек: {s['total']} запросов, {s['rps']:.1f} запр/с, "
+            f"p99 {s['latency_ms']['p99']:.1f} мс, ошибок {s['errors']}"
+        ))
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
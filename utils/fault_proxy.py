@@ -0,0 +1,319 @@
+import argparse
+import asyncio
+import fnmatch
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+import aiohttp
+import allure
+from aiohttp import web
+
+from utils.latency_histogram import LatencyHistogram
+from utils.latency_models import ErrorBurstModel, LatencyModel, UniformLatency
+from utils.request_timing import normalize_endpoint
+from utils.stub_server import BackgroundAppServer
+
+# Заголовки одного соединения не передаются дальше (RFC 7230, 6.1)
+HOP_BY_HOP_HEADERS = frozenset((
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+    "transfer-encoding", "upgrade", "host", "content-length",
+))
+FAULT_TYPES = ("latency", "bandwidth", "reset", "truncate", "error")
+
+
+class Fault:
+    """Неисправность сети или сервера для запросов, попавших под правило
+
+    latency - задержка перед отправкой запроса на стенд, bandwidth - скорость
+    отдачи тела ответа в байтах в секунду, reset_probability - обрыв
+    соединения без ответа (запрос до стенда не доходит), truncate_probability -
+    обрыв после truncate_ratio тела ответа при полном Content-Length,
+    errors - серии ответов error_status без обращения к стенду.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, bandwidth: Optional[float] = None,
+                 reset_probability: float = 0.0, truncate_probability: float = 0.0, truncate_ratio: float = 0.5,
+                 errors: Optional[ErrorBurstModel] = None, error_status: int = 503):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.reset_probability = reset_probability
+        self.truncate_probability = truncate_probability
+        self.truncate_ratio = truncate_ratio
+        self.errors = errors
+        self.error_status = error_status
+
+
+class FaultRule:
+    """Правило расписания: маршрут, метод и окно запросов, в котором действует неисправность
+
+    route - шаблон пути в стиле fnmatch ("/v1/lead/*"), method - HTTP метод
+    или None для всех. Правило считает все подходящие запросы и применяет
+    fault к запросам с номерами от after до after + count (count=None -
+    до конца), поэтому несколько правил на один маршрут задают расписание:
+    10 запросов без ошибок, затем 5 обрывов, затем снова без ошибок.
+    """
+
+    def __init__(self, route: str = "*", fault: Optional[Fault] = None, method: Optional[str] = None,
+                 after: int = 0, count: Optional[int] = None, name: Optional[str] = None):
+        self.route = route
+        self.fault = fault or Fault()
+        self.method = method.upper() if method else None
+        self.after = after
+        self.count = count
+        self.name = name or (f"{self.method} {route}" if self.method else route)
+        self.matched = 0
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and fnmatch.fnmatchcase(path, self.route)
+
+    def is_active(self, index: int) -> bool:
+        return index >= self.after and (self.count is None or index < self.after + self.count)
+
+
+class FaultProxy(BackgroundAppServer):
+    """HTTP прокси между тестовыми клиентами и стендом с внесением неисправностей
+
+    Клиенты (APIClient, TelephonyAPIClient, страницы Playwright) обращаются
+    к url прокси вместо target_url. К каждому запросу применяется первое
+    активное правило из rules: задержка, ограничение полосы, обрыв
+    соединения, обрезанное тело или ответ с ошибкой. Время каждого обмена
+    записывается в exchanges (последние max_exchanges), поэтому хвосты
+    задержек и число повторов клиента видны по маршрутам в get_summary.
+    Случайные решения правил воспроизводимы при заданном seed.
+    """
+
+    description = "Прокси с неисправностями"
+
+    def __init__(self, target_url: str, rules: Iterable[FaultRule] = (), seed: Optional[int] = None,
+                 upstream_timeout: float = 60.0, max_exchanges: int = 100_000, host: str = "127.0.0.1",
+                 port: int = 0, backlog: int = 4096):
+        super().__init__(host, port, backlog)
+        self.target_url = target_url.rstrip("/")
+        self.rules: List[FaultRule] = list(rules)
+        self.upstream_timeout = upstream_timeout
+        self.exchanges: Deque[Dict[str, Any]] = deque(maxlen=max_exchanges)
+        self._rng = random.Random(seed)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._stats = {"requests": 0, "upstream_requests": 0, "upstream_errors": 0,
+                       "faults": {name: 0 for name in FAULT_TYPES}, "in_flight": 0, "max_in_flight": 0}
+
+    def make_app(self) -> web.Application:
+        """Приложение aiohttp, передающее все запросы на target_url"""
+        app = web.Application(client_max_size=1024 ** 3)
+        app.on_startup.append(self._open_session)
+        app.on_cleanup.append(self._close_session)
+        app.router.add_route("*", "/{path:.*}", self._proxy)
+        return app
+
+    async def _open_session(self, app: web.Application) -> None:
+        # Тело и куки передаются как есть: без распаковки и без своего хранилища кук
+        self._session = aiohttp.ClientSession(
+            auto_decompress=False, cookie_jar=aiohttp.DummyCookieJar(),
+            timeout=aiohttp.ClientTimeout(total=self.upstream_timeout),
+            connector=aiohttp.TCPConnector(limit=0, ssl=False)
+        )
+
+    async def _close_session(self, app: web.Application) -> None:
+        await self._session.close()
+
+    def set_rules(self, rules: Iterable[FaultRule]) -> None:
+        """Замена расписания неисправностей во время теста"""
+        rules = list(rules)
+        self.call_in_loop(lambda: setattr(self, "rules", rules))
+
+    def add_rule(self, rule: FaultRule) -> None:
+        """Добавление правила в конец расписания"""
+        self.call_in_loop(self.rules.append, rule)
+
+    def clear_rules(self) -> None:
+        """Снятие всех неисправностей"""
+        self.set_rules([])
+
+    def _select_rule(self, method: str, path: str) -> Optional[FaultRule]:
+        selected = None
+        for rule in self.rules:
+            if rule.matches(method, path):
+                index = rule.matched
+                rule.matched += 1
+                if selected is None and rule.is_active(index):
+                    selected = rule
+        return selected
+
+    async def _proxy(self, request: web.Request) -> web.StreamResponse:
+        stats = self._stats
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        started = time.perf_counter()
+        rule = self._select_rule(request.method, request.path)
+        exchange = {
+            "method": request.method, "path": request.path, "route": rule.name if rule else None,
+            "started_at": time.time(), "status": None, "faults": [], "injected_delay": 0.0,
+            "upstream_time": None, "bytes": 0, "total_time": None,
+        }
+        try:
+            return await self._exchange(request, rule.fault if rule else None, exchange)
+        finally:
+            exchange["total_time"] = time.perf_counter() - started
+            stats["in_flight"] -= 1
+            for fault in exchange["faults"]:
+                stats["faults"][fault] += 1
+            self.exchanges.append(exchange)
+
+    async def _exchange(self, request: web.Request, fault: Optional[Fault],
+                        exchange: Dict[str, Any]) -> web.StreamResponse:
+        if fault is not None and fault.latency is not None:
+            delay = fault.latency.sample(self._rng)
+            exchange["injected_delay"] = delay
+            exchange["faults"].append("latency")
+            await asyncio.sleep(delay)
+        if fault is not None and fault.reset_probability and self._rng.random() < fault.reset_probability:
+            exchange["faults"].append("reset")
+            return self._abort(request)
+        if fault is not None and fault.errors is not None and fault.errors.should_fail(self._rng):
+            exchange["faults"].append("error")
+            exchange["status"] = fault.error_status
+            return web.json_response({"status": "error", "message": "Injected fault"}, status=fault.error_status)
+
+        body = await request.read()
+        headers = {key: value for key, value in request.headers.items() if key.lower() not in HOP_BY_HOP_HEADERS}
+        upstream_started = time.perf_counter()
+        self._stats["upstream_requests"] += 1
+        try:
+            async with self._session.request(request.method, self.target_url + request.path_qs, headers=headers,
+                                             data=body, allow_redirects=False) as upstream:
+                payload = await upstream.read()
+                status, upstream_headers = upstream.status, upstream.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._stats["upstream_errors"] += 1
+            self.logger.warning(f"Стенд {self.target_url} недоступен для {request.method} {request.path}: {e}")
+            exchange["status"] = 502
+            return web.json_response({"status": "error", "message": f"Upstream error: {e}"}, status=502)
+        finally:
+            exchange["upstream_time"] = time.perf_counter() - upstream_started
+        exchange["status"] = status
+
+        response = web.StreamResponse(status=status)
+        for key, value in upstream_headers.items():
+            if key.lower() not in HOP_BY_HOP_HEADERS:
+                if key.lower() == "location" and value.startswith(self.target_url):
+                    value = self.url + value[len(self.target_url):]
+                response.headers.add(key, value)
+        response.content_length = len(payload)
+        await response.prepare(request)
+
+        limit = len(payload)
+        if fault is not None and fault.truncate_probability and self._rng.random() < fault.truncate_probability:
+            exchange["faults"].append("truncate")
+            limit = int(len(payload) * fault.truncate_ratio)
+        if fault is not None and fault.bandwidth:
+            exchange["faults"].append("bandwidth")
+            await self._write_throttled(response, payload[:limit], fault.bandwidth)
+        else:
+            await response.write(payload[:limit])
+        exchange["bytes"] = limit
+        if limit < len(payload):
+            return self._abort(request, response)
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    async def _write_throttled(response: web.StreamResponse, payload: bytes, bandwidth: float) -> None:
+        # Порции по 50 мс передачи на заданной скорости
+        chunk = max(1, int(bandwidth / 20))
+        for offset in range(0, len(payload), chunk):
+            part = payload[offset:offset + chunk]
+            await response.write(part)
+            await asyncio.sleep(len(part) / bandwidth)
+
+    @staticmethod
+    def _abort(request: web.Request, response: Optional[web.StreamResponse] = None) -> web.StreamResponse:
+        """Обрыв TCP соединения без корректного завершения ответа"""
+        if request.transport is not None:
+            request.transport.abort()
+        return response or web.Response(status=499)
+
+    def reset_exchanges(self) -> None:
+        """Очистка записанных обменов и счетчиков правил перед новым замером"""
+        def reset():
+            self.exchanges.clear()
+            for rule in self.rules:
+                rule.matched = 0
+        self.call_in_loop(reset)
+
+    def get_summary(self) -> Dict[str, Dict[str, Any]]:
+        """Перцентили полного времени обмена (мс), статусы и неисправности по маршрутам
+
+        Маршрут - шаблон пути с {id} вместо числовых идентификаторов.
+        """
+        routes: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
+            "histogram": LatencyHistogram(), "statuses": Counter(), "faults": Counter()})
+        for exchange in list(self.exchanges):
+            route = routes[f"{exchange['method']} {normalize_endpoint(exchange['path'])}"]
+            route["histogram"].record_seconds(exchange["total_time"])
+            route["statuses"][str(exchange["status"]) if exchange["status"] else "reset"] += 1
+            route["faults"].update(exchange["faults"])
+        return {
+            name: {"count": route["histogram"].total_count, **route["histogram"].get_percentiles(),
+                   "statuses": dict(route["statuses"]), "faults": dict(route["faults"])}
+            for name, route in sorted(routes.items())
+        }
+
+    def format_summary(self) -> str:
+        """Таблица времени обменов по маршрутам"""
+        lines = [f"{'Маршрут':<40} {'Обменов':>8} {'p50, мс':>9} {'p99, мс':>9}  Статусы / неисправности"]
+        for name, route in self.get_summary().items():
+            lines.append(f"{name:<40} {route['count']:>8} {route['p50']:>9.1f} {route['p99']:>9.1f}  "
+                         f"{route['statuses']} / {route['faults']}")
+        return "\n".join(lines)
+
+    def attach_to_allure(self, name: str = "Обмены через прокси с неисправностями") -> None:
+        """Прикрепление таблицы обменов к отчету Allure"""
+        allure.attach(self.format_summary(), name=name, attachment_type=allure.attachment_type.TEXT)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Число запросов, обращений к стенду, внесенных неисправностей и пик одновременных обменов"""
+        return {**self._stats, "faults": dict(self._stats["faults"])}
+
+
+def main() -> None:
+    """Запуск прокси с одним правилом для всех запросов, подходящих под --route"""
+    parser = argparse.ArgumentParser(description="Прокси с внесением неисправностей между клиентом и стендом")
+    parser.add_argument("--target", required=True, help="URL стенда, например https://sm.linerapp.io")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--route", default="*", help="Шаблон пути (fnmatch)")
+    parser.add_argument("--latency-ms", type=float, nargs=2, metavar=("MIN", "MAX"), default=None)
+    parser.add_argument("--bandwidth-kbps", type=float, default=None, help="Скорость отдачи ответа, КБ/с")
+    parser.add_argument("--reset", type=float, default=0.0, help="Вероятность обрыва соединения")
+    parser.add_argument("--truncate", type=float, default=0.0, help="Вероятность обрезанного тела ответа")
+    parser.add_argument("--error-burst", type=float, default=0.0, help="Вероятность начала серии ошибок")
+    parser.add_argument("--burst-length", type=int, default=5)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    fault = Fault(
+        latency=UniformLatency(args.latency_ms[0] / 1000, args.latency_ms[1] / 1000) if args.latency_ms else None,
+        bandwidth=args.bandwidth_kbps * 1024 if args.bandwidth_kbps else None,
+        reset_probability=args.reset, truncate_probability=args.truncate,
+        errors=ErrorBurstModel(args.error_burst, args.burst_length) if args.error_burst else None,
+        error_status=args.error_status
+    )
+    with FaultProxy(args.target, [FaultRule(args.route, fault)], seed=args.seed, host=args.host,
+                    port=args.port) as proxy:
+        print(f"Прокси на {args.target} доступен на {proxy.url}, Ctrl+C для остановки")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        print(proxy.format_summary())
+
+
+if __name__ == "__main__":
+    main()
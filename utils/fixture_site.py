@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import html
+import logging
+import mimetypes
+import random
+import secrets
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from string import Template
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from utils.latency_models import SimulatedBackend
+from utils.lead_api_server import LEAD_TYPES, backend_from_profile
+from utils.stub_server import BackgroundAppServer
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SITE_DIR = PROJECT_ROOT / "tests" / "fixtures" / "site"
+FILTER_FORM_PATH = PROJECT_ROOT / "filtr.txt"
+SESSION_COOKIE = "PHPSESSID"
+# Значения статусов из формы фильтра (filtr.txt)
+LEAD_STATUSES = ("primary", "dark", "success", "success-problem", "warning", "double", "danger", "black")
+OPERATIONS = ("auth", "auth/login", "leads", "leads/list", "users", "static")
+
+
+def generate_leads(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    """Детерминированный набор лидов для таблицы"""
+    rng = random.Random(seed)
+    created = datetime(2025, 5, 23, 9, 0)
+    leads = []
+    for lead_id in range(1, count + 1):
+        created += timedelta(minutes=rng.randint(1, 30))
+        leads.append({
+            "id": lead_id,
+            "external_id": 100000 + lead_id,
+            "type": rng.choice(LEAD_TYPES),
+            "status": rng.choice(LEAD_STATUSES),
+            "client_name": f"Клиент {lead_id}",
+            "client_phone": f"+7999{rng.randint(0, 9999999):07d}",
+            "created": created.strftime("%d.%m.%Y %H:%M"),
+        })
+    return leads
+
+
+def filter_leads(leads: List[Dict[str, Any]], params) -> List[Dict[str, Any]]:
+    """Отбор лидов по полям формы фильтра: id, external_id, type и status[]"""
+    result = leads
+    for field in ("id", "external_id"):
+        value = params.get(field)
+        if value:
+            result = [lead for lead in result if str(lead[field]) == value]
+    lead_type = params.get("type")
+    if lead_type and lead_type != "all":
+        result = [lead for lead in result if lead["type"] == lead_type]
+    statuses = params.getall("status[]", [])
+    if statuses:
+        result = [lead for lead in result if lead["status"] in statuses]
+    return result
+
+
+class FixtureSiteServer(BackgroundAppServer):
+    """Локальный сайт Лайнера из сохраненной верстки для UI тестов без стенда
+
+    Отдает страницу авторизации (/auth/), страницу лидов с формой фильтра
+    из filtr.txt (/leads/), настройки пользователя (/users/{id}/) и статику
+    из tests/fixtures/site. Вход через /auth/login/ ставит куку сессии,
+    без нее страницы офиса перенаправляют на /auth/. Кнопка фильтра
+    запрашивает /leads/list/ и перерисовывает таблицу.
+
+    Задержки и ошибки берутся из backend (SimulatedBackend) по именам
+    операций из OPERATIONS и выдерживаются через asyncio.sleep, поэтому
+    параллельные браузеры не ждут друг друга. users - пары email: пароль;
+    без них принимается любой непустой логин и пароль.
+    """
+
+    description = "Локальный сайт"
+
+    def __init__(self, backend: Optional[SimulatedBackend] = None, users: Optional[Dict[str, str]] = None,
+                 leads_count: int = 50, seed: int = 1, error_status: int = 503, site_dir: Path = SITE_DIR,
+                 filter_form_path: Path = FILTER_FORM_PATH, host: str = "127.0.0.1", port: int = 0,
+                 backlog: int = 4096):
+        super().__init__(host, port, backlog)
+        self.backend = backend
+        self.users = users
+        self.error_status = error_status
+        self.leads = generate_leads(leads_count, seed)
+        self.sessions: Dict[str, str] = {}
+        # Верстка читается один раз, чтобы диск не влиял на время ответа
+        self.templates = {path.stem: Template(path.read_text(encoding="utf-8")) for path in site_dir.glob("*.html")}
+        self.static = {path.name: path.read_bytes() for path in (site_dir / "static").iterdir() if path.is_file()}
+        self.filter_form = filter_form_path.read_text(encoding="utf-8")
+        self._stats = {"requests": {name: 0 for name in OPERATIONS}, "injected_errors": 0,
+                       "in_flight": 0, "max_in_flight": 0}
+
+    @classmethod
+    def from_profile(cls, profile: Dict[str, Any], **kwargs) -> "FixtureSiteServer":
+        """Создание по профилю задержек и ошибок (см. backend_from_profile)"""
+        kwargs.setdefault("error_status", profile.get("error_status", 503))
+        return cls(backend_from_profile(profile), **kwargs)
+
+    def make_app(self) -> web.Application:
+        """Приложение aiohttp со страницами и статикой сайта"""
+        app = web.Application()
+        routes = [
+            ("GET", "/", "auth", self._root),
+            ("GET", "/auth", "auth", self._auth),
+            ("GET", "/auth/forgot", "auth", self._forgot),
+            ("GET", "/auth/logout", "auth", self._logout),
+            ("GET", "/auth/leads", "leads", self._leads_alias),
+            ("POST", "/auth/login", "auth/login", self._login),
+            ("GET", "/leads", "leads", self._leads),
+            ("GET", "/leads/list", "leads/list", self._leads_list),
+            ("GET", "/users/{user_id}", "users", self._user),
+            ("GET", "/static/{name}", "static", self._static_file),
+        ]
+        for method, path, name, handler in routes:
+            handler = self._endpoint(name, handler)
+            app.router.add_route(method, path, handler)
+            if path != "/":
+                app.router.add_route(method, path + "/", handler)
+        return app
+
+    def _endpoint(self, name: str, handler):
+        async def wrapper(request: web.Request) -> web.StreamResponse:
+            stats = self._stats
+            stats["requests"][name] += 1
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+            try:
+                if self.backend is not None:
+                    delay, failed = self.backend.sample(name)
+                    await asyncio.sleep(delay)
+                    if failed:
+                        stats["injected_errors"] += 1
+                        return web.Response(text="Service Unavailable", status=self.error_status)
+                return await handler(request)
+            finally:
+                stats["in_flight"] -= 1
+        return wrapper
+
+    def _session_user(self, request: web.Request) -> Optional[str]:
+        return self.sessions.get(request.cookies.get(SESSION_COOKIE, ""))
+
+    def _render(self, template: str, **values: Any) -> str:
+        return self.templates[template].substitute(**values)
+
+    def _page(self, request: web.Request, title: str, template: str, **values: Any) -> web.Response:
+        user = self._session_user(request)
+        content = self._render(template, user=html.escape(user), **values)
+        body = self._render("layout", title=title, user=html.escape(user), content=content)
+        return web.Response(text=body, content_type="text/html")
+
+    def _auth_page(self, login: str = "", error: Optional[str] = None) -> web.Response:
+        toast = f'<div class="toast toast-error">{html.escape(error)}</div>' if error else ""
+        body = self._render("auth", login=html.escape(login), toast=toast)
+        return web.Response(text=body, content_type="text/html")
+
+    async def _root(self, request: web.Request) -> web.Response:
+        raise web.HTTPFound("/leads/" if self._session_user(request) else "/auth/")
+
+    async def _auth(self, request: web.Request) -> web.Response:
+        if self._session_user(request):
+            raise web.HTTPFound("/leads/")
+        return self._auth_page()
+
+    async def _forgot(self, request: web.Request) -> web.Response:
+        return web.Response(text=self._render("forgot"), content_type="text/html")
+
+    async def _login(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        login, password = form.get("login", ""), form.get("password", "")
+        if not login or not password:
+            return self._auth_page(login, "Заполните логин и пароль")
+        if self.users is not None and self.users.get(login) != password:
+            return self._auth_page(login, "Неверный логин или пароль")
+        token = secrets.token_hex(16)
+        self.sessions[token] = login
+        response = web.HTTPFound("/leads/")
+        response.set_cookie(SESSION_COOKIE, token, httponly=True,
+                            max_age=30 * 24 * 3600 if form.get("remember") else None)
+        raise response
+
+    async def _logout(self, request: web.Request) -> web.Response:
+        self.sessions.pop(request.cookies.get(SESSION_COOKIE, ""), None)
+        response = web.HTTPFound("/auth/")
+        response.del_cookie(SESSION_COOKIE)
+        raise response
+
+    def _require_session(self, request: web.Request) -> None:
+        if not self._session_user(request):
+            raise web.HTTPFound("/auth/")
+
+    async def _leads_alias(self, request: web.Request) -> web.Response:
+        # В конфигурации baseUrl заканчивается на /auth, тесты открывают {baseUrl}/leads
+        raise web.HTTPFound("/leads/")
+
+    async def _leads(self, request: web.Request) -> web.Response:
+        self._require_session(request)
+        fields = ("id", "external_id", "type", "status", "client_name", "client_phone", "created")
+        rows = "\n".join(
+            "<tr>" + "".join(f"<td>{html.escape(str(lead[field]))}</td>" for field in fields) + "</tr>"
+            for lead in filter_leads(self.leads, request.query)
+        )
+        return self._page(request, "Лиды", "leads", filter_form=self.filter_form, rows=rows)
+
+    async def _leads_list(self, request: web.Request) -> web.Response:
+        if not self._session_user(request):
+            return web.json_response({"success": False, "message": "Unauthorized"}, status=401)
+        leads = filter_leads(self.leads, request.query)
+        return web.json_response({"data": leads, "recordsTotal": len(self.leads), "recordsFiltered": len(leads)})
+
+    async def _user(self, request: web.Request) -> web.Response:
+        self._require_session(request)
+        return self._page(request, "Настройки пользователя", "users", user_id=request.match_info["user_id"])
+
+    async def _static_file(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        if name not in self.static:
+            raise web.HTTPNotFound()
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        return web.Response(body=self.static[name], content_type=content_type,
+                            headers={"Cache-Control": "max-age=3600"})
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Число запросов по операциям, внесенные ошибки, пик одновременных запросов и сессии"""
+        return {**self._stats, "requests": dict(self._stats["requests"]), "sessions": len(self.sessions)}
+
+
+def main() -> None:
+    """Запуск локального сайта с профилем задержек из config/config.json"""
+    from utils.config_loader import ConfigLoader
+
+    profiles = ConfigLoader().config.get("fixture_site", {}).get("profiles", {})
+    parser = argparse.ArgumentParser(description="Локальный сайт Лайнера из сохраненной верстки")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--profile", default=None, choices=list(profiles) or None,
+                        help="Профиль задержек и ошибок (без профиля - ответы без задержки)")
+    parser.add_argument("--leads", type=int, default=50, help="Число лидов в таблице")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    kwargs = {"leads_count": args.leads, "host": args.host, "port": args.port}
+    server = FixtureSiteServer.from_profile(profiles[args.profile], **kwargs) if args.profile \
+        else FixtureSiteServer(**kwargs)
+    with server:
+        print(f"Сайт доступен на {server.url}/auth/, Ctrl+C для остановки")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import logging
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTP адаптер с пулом keep-alive соединений и счетчиками попаданий в пул"""
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10,
+                 pool_size_per_host: Optional[Dict[str, int]] = None, **kwargs):
+        self.pool_size_per_host = dict(pool_size_per_host or {})
+        self.logger = logging.getLogger(__name__)
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._prewarmed = 0
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, **kwargs)
+
+    def get_connection(self, url, proxies=None):
+        """Получение пула соединений с учетом размера пула для конкретного хоста"""
+        host = urlparse(url).hostname
+        if not proxies and host in self.pool_size_per_host:
+            return self.poolmanager.connection_from_url(
+                url, pool_kwargs={"maxsize": self.pool_size_per_host[host]}
+            )
+        return super().get_connection(url, proxies)
+
+    def send(self, request, **kwargs):
+        """Отправка запроса с учетом того, было ли переиспользовано соединение"""
+        pool = self.get_connection(request.url, kwargs.get("proxies"))
+        connections_before = pool.num_connections
+
+        response = super().send(request, **kwargs)
+
+        with self._stats_lock:
+            if pool.num_connections > connections_before:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return response
+
+    def prewarm(self, url: str, connections: int) -> int:
+        """Предварительное открытие соединений к хосту, возвращает число открытых соединений"""
+        pool = self.get_connection(url)
+        connections = min(connections, pool.pool.maxsize if pool.pool else connections)
+
+        opened = []
+        try:
+            for _ in range(connections):
+                conn = pool._get_conn()
+                if conn.sock is None:
+                    conn.connect()
+                opened.append(conn)
+        except Exception as e:
+            self.logger.warning(f"Не удалось прогреть соединение к {url}: {str(e)}")
+        finally:
+            for conn in opened:
+                pool._put_conn(conn)
+
+        with self._stats_lock:
+            self._prewarmed += len(opened)
+        self.logger.info(f"Прогрето соединений к {url}: {len(opened)}")
+        return len(opened)
+
+    def get_pool_stats(self) -> Dict[str, int]:
+        """Получение счетчиков попаданий и промахов пула соединений"""
+        with self._stats_lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "prewarmed": self._prewarmed
+            }
+
+    def reset_pool_stats(self) -> None:
+        """Сброс счетчиков пула соединений"""
+        with self._stats_lock:
+            self._hits = 0
+            self._misses = 0
+            self._prewarmed = 0
@@ -0,0 +1,206 @@
+import math
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Optional
+
+import allure
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """Гистограмма задержек в формате HDR с фиксированным объемом памяти
+
+    Значения хранятся в микросекундах в диапазоне от lowest до highest
+    с относительной точностью significant_digits значащих цифр. Память
+    не зависит от числа записанных значений. Гистограммы с одинаковыми
+    параметрами можно объединять через add() и передавать между
+    процессами через to_dict()/from_dict().
+    """
+
+    def __init__(self, lowest: int = 1, highest: int = 3_600_000_000, significant_digits: int = 2):
+        if lowest < 1 or highest < 2 * lowest:
+            raise ValueError("Некорректный диапазон гистограммы")
+        if not 1 <= significant_digits <= 5:
+            raise ValueError("Точность гистограммы должна быть от 1 до 5 значащих цифр")
+        self.lowest = lowest
+        self.highest = highest
+        self.significant_digits = significant_digits
+
+        largest_single_unit = 2 * 10 ** significant_digits
+        self._sub_bucket_count = 1 << math.ceil(math.log2(largest_single_unit))
+        self._sub_bucket_half_count = self._sub_bucket_count // 2
+        self._sub_bucket_half_count_magnitude = self._sub_bucket_half_count.bit_length() - 1
+        self._unit_magnitude = lowest.bit_length() - 1
+        self._sub_bucket_mask = (self._sub_bucket_count - 1) << self._unit_magnitude
+
+        smallest_untrackable = self._sub_bucket_count << self._unit_magnitude
+        bucket_count = 1
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self._counts = array("q", [0]) * ((bucket_count + 1) * self._sub_bucket_half_count)
+
+        self._lock = threading.Lock()
+        self.total_count = 0
+        self.min_value = 0
+        self.max_value = 0
+        self._sum = 0
+
+    def _counts_index(self, value: int) -> int:
+        bucket_index = (value | self._sub_bucket_mask).bit_length() - (
+            self._unit_magnitude + self._sub_bucket_half_count_magnitude + 1
+        )
+        sub_bucket_index = value >> (bucket_index + self._unit_magnitude)
+        return ((bucket_index + 1) << self._sub_bucket_half_count_magnitude) + (
+            sub_bucket_index - self._sub_bucket_half_count
+        )
+
+    def _value_from_index(self, index: int) -> int:
+        bucket_index = (index >> self._sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self._sub_bucket_half_count
+            bucket_index = 0
+        return sub_bucket_index << (bucket_index + self._unit_magnitude)
+
+    def _highest_equivalent_value(self, index: int) -> int:
+        """Наибольшее значение, попадающее в ту же ячейку"""
+        bucket_index = max(0, (index >> self._sub_bucket_half_count_magnitude) - 1)
+        return self._value_from_index(index) + (1 << (self._unit_magnitude + bucket_index)) - 1
+
+    def record(self, value: int, count: int = 1) -> None:
+        """Запись значения в микросекундах"""
+        value = min(max(int(value), 0), self.highest)
+        index = self._counts_index(value)
+        with self._lock:
+            self._counts[index] += count
+            if self.total_count == 0 or value < self.min_value:
+                self.min_value = value
+            self.max_value = max(self.max_value, value)
+            self.total_count += count
+            self._sum += value * count
+
+    def record_corrected(self, value: int, expected_interval: Optional[int]) -> None:
+        """Запись значения с поправкой на coordinated omission
+
+        Если ответ задержался дольше ожидаемого интервала между запросами,
+        генератор нагрузки за это время не отправил запросы, которые должны
+        были быть отправлены. Их задержки досчитываются как value - interval,
+        value - 2 * interval и так далее.
+        """
+        self.record(value)
+        if not expected_interval or expected_interval <= 0:
+            return
+        missing = value - expected_interval
+        while missing >= expected_interval:
+            self.record(missing)
+            missing -= expected_interval
+
+    def record_seconds(self, seconds: float, expected_interval: Optional[float] = None) -> None:
+        """Запись задержки в секундах, при expected_interval - с поправкой на coordinated omission"""
+        value = round(seconds * 1_000_000)
+        if expected_interval:
+            self.record_corrected(value, round(expected_interval * 1_000_000))
+        else:
+            self.record(value)
+
+    def record_scheduled(self, scheduled_at: float, finished_at: float) -> None:
+        """Запись задержки от запланированного момента отправки до получения ответа (сек)"""
+        self.record_seconds(max(0.0, finished_at - scheduled_at))
+
+    def add(self, other: "LatencyHistogram") -> None:
+        """Добавление значений другой гистограммы с теми же параметрами"""
+        if (other.lowest, other.highest, other.significant_digits) != (
+                self.lowest, self.highest, self.significant_digits):
+            raise ValueError("Можно объединять только гистограммы с одинаковыми параметрами")
+        with other._lock:
+            counts = array("q", other._counts)
+            total, min_value, max_value, total_sum = other.total_count, other.min_value, other.max_value, other._sum
+        if total == 0:
+            return
+        with self._lock:
+            for index, count in enumerate(counts):
+                if count:
+                    self._counts[index] += count
+            if self.total_count == 0 or min_value < self.min_value:
+                self.min_value = min_value
+            self.max_value = max(self.max_value, max_value)
+            self.total_count += total
+            self._sum += total_sum
+
+    def reset(self) -> None:
+        """Очистка гистограммы"""
+        with self._lock:
+            for index in range(len(self._counts)):
+                self._counts[index] = 0
+            self.total_count = 0
+            self.min_value = 0
+            self.max_value = 0
+            self._sum = 0
+
+    def get_value_at_percentile(self, percentile: float) -> int:
+        """Значение перцентиля в микросекундах"""
+        with self._lock:
+            if self.total_count == 0:
+                return 0
+            target = max(1, math.ceil(min(percentile, 100.0) / 100 * self.total_count))
+            running = 0
+            for index, count in enumerate(self._counts):
+                running += count
+                if running >= target:
+                    return min(self._highest_equivalent_value(index), self.max_value)
+            return self.max_value
+
+    def get_mean(self) -> float:
+        """Среднее значение в микросекундах"""
+        with self._lock:
+            return self._sum / self.total_count if self.total_count else 0.0
+
+    def get_percentiles(self, percentiles: Iterable[float] = PERCENTILES) -> Dict[str, float]:
+        """Перцентили, среднее и максимум в миллисекундах"""
+        result = {f"p{p:g}": self.get_value_at_percentile(p) / 1000 for p in percentiles}
+        result["mean"] = self.get_mean() / 1000
+        result["max"] = self.max_value / 1000
+        result["count"] = self.total_count
+        return result
+
+    def format_table(self, title: str = "") -> str:
+        """Таблица перцентилей в миллисекундах"""
+        stats = self.get_percentiles()
+        lines = [title] if title else []
+        lines.append(f"Запросов: {stats.pop('count')}")
+        for name, value in stats.items():
+            lines.append(f"{name:>8}: {value:10.3f} мс")
+        return "\n".join(lines)
+
+    def attach_to_allure(self, name: str = "Перцентили времени ответа") -> None:
+        """Прикрепление таблицы перцентилей к отчету Allure"""
+        if self.total_count == 0:
+            return
+        allure.attach(self.format_table(), name, allure.attachment_type.TEXT)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Компактное представление для передачи между процессами"""
+        with self._lock:
+            return {
+                "lowest": self.lowest,
+                "highest": self.highest,
+                "significant_digits": self.significant_digits,
+                "counts": {str(index): count for index, count in enumerate(self._counts) if count},
+                "min": self.min_value,
+                "max": self.max_value,
+                "sum": self._sum
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        """Восстановление гистограммы из to_dict()"""
+        histogram = cls(data["lowest"], data["highest"], data["significant_digits"])
+        for index, count in data["counts"].items():
+            histogram._counts[int(index)] = count
+            histogram.total_count += count
+        histogram.min_value = data["min"]
+        histogram.max_value = data["max"]
+        histogram._sum = data["sum"]
+        return histogram
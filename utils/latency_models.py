@@ -0,0 +1,170 @@
+import math
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class RealClock:
+    """Реальное время: perf_counter и time.sleep"""
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def sync(self) -> float:
+        """Точка синхронизации после ожидания других потоков"""
+        return self.now()
+
+
+class VirtualClock:
+    """Виртуальное время для моков: sleep не ждет, а сдвигает часы
+
+    Каждый поток ведет собственную шкалу времени: параллельные запросы
+    не суммируют задержки, а время между двумя вызовами now() в одном
+    потоке равно сумме его sleep. sync() переводит часы вызвавшего потока
+    на самое позднее время среди всех потоков, что соответствует ожиданию
+    их завершения; потоки, впервые обратившиеся к часам после этого,
+    начинают с того же момента.
+    """
+
+    def __init__(self, origin: float = 0.0):
+        self.origin = origin
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._horizon = origin
+        self._epoch = origin
+
+    def now(self) -> float:
+        current = getattr(self._local, "time", None)
+        if current is None:
+            with self._lock:
+                current = self._local.time = self._epoch
+        return current
+
+    def sleep(self, seconds: float) -> None:
+        current = self.now() + max(0.0, seconds)
+        self._local.time = current
+        with self._lock:
+            self._horizon = max(self._horizon, current)
+
+    def sync(self) -> float:
+        current = self.now()
+        with self._lock:
+            self._local.time = self._epoch = max(current, self._horizon)
+        return self._local.time
+
+
+class LatencyModel:
+    """Распределение задержки ответа в секундах"""
+
+    def sample(self, rng: random.Random) -> float:
+        raise NotImplementedError
+
+
+class UniformLatency(LatencyModel):
+    """Равномерная задержка в диапазоне [low, high]"""
+
+    def __init__(self, low: float, high: float):
+        self.low = low
+        self.high = high
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.uniform(self.low, self.high)
+
+
+class LogNormalLatency(LatencyModel):
+    """Логнормальная задержка с медианой median и редкими всплесками
+
+    С вероятностью spike_probability задержка умножается на spike_multiplier,
+    что дает тяжелый хвост, как у сервера во время GC или блокировок.
+    """
+
+    def __init__(self, median: float, sigma: float = 0.5, spike_probability: float = 0.0,
+                 spike_multiplier: float = 10.0):
+        self.median = median
+        self.sigma = sigma
+        self.spike_probability = spike_probability
+        self.spike_multiplier = spike_multiplier
+
+    def sample(self, rng: random.Random) -> float:
+        delay = rng.lognormvariate(math.log(self.median), self.sigma)
+        if self.spike_probability and rng.random() < self.spike_probability:
+            delay *= self.spike_multiplier
+        return delay
+
+
+class BimodalLatency(LatencyModel):
+    """Смесь двух распределений, например ответ из кэша и из базы"""
+
+    def __init__(self, fast: LatencyModel, slow: LatencyModel, slow_probability: float):
+        self.fast = fast
+        self.slow = slow
+        self.slow_probability = slow_probability
+
+    def sample(self, rng: random.Random) -> float:
+        return (self.slow if rng.random() < self.slow_probability else self.fast).sample(rng)
+
+
+class ErrorBurstModel:
+    """Ошибки сериями: с вероятностью burst_probability начинается серия
+    из burst_length подряд неуспешных ответов"""
+
+    def __init__(self, burst_probability: float = 0.0, burst_length: int = 5):
+        self.burst_probability = burst_probability
+        self.burst_length = burst_length
+        self._remaining = 0
+
+    def should_fail(self, rng: random.Random) -> bool:
+        if self._remaining == 0 and rng.random() < self.burst_probability:
+            self._remaining = self.burst_length
+        if self._remaining > 0:
+            self._remaining -= 1
+            return True
+        return False
+
+
+class SimulatedBackend:
+    """Имитация сервера для моков: задержки и ошибки по моделям с фиксированным seed
+
+    latency - модель по умолчанию, operations - модели для отдельных
+    операций. Задержка выдерживается на clock: с VirtualClock прогон
+    занимает миллисекунды, с RealClock - реальное время. У каждой операции
+    свой поток случайных чисел от seed, поэтому при том же числе вызовов
+    операции ее перцентили совпадают от прогона к прогону независимо от
+    порядка вызовов в потоках.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None,
+                 operations: Optional[Dict[str, LatencyModel]] = None,
+                 errors: Optional[ErrorBurstModel] = None, clock=None, seed: Optional[int] = None):
+        self.latency = latency
+        self.operations = dict(operations or {})
+        self.errors = errors
+        self.clock = clock or VirtualClock()
+        self.seed = seed
+        self._streams: Dict[str, random.Random] = {}
+        self._error_rng = random.Random(None if seed is None else f"{seed}:errors")
+        self._lock = threading.Lock()
+
+    def _stream(self, operation: str) -> random.Random:
+        if operation not in self._streams:
+            self._streams[operation] = random.Random(None if self.seed is None else f"{self.seed}:{operation}")
+        return self._streams[operation]
+
+    def sample(self, operation: str, default: Optional[LatencyModel] = None) -> Tuple[float, bool]:
+        """Задержка и признак ошибки очередного вызова операции без ожидания"""
+        model = self.operations.get(operation) or self.latency or default or UniformLatency(0.01, 0.1)
+        with self._lock:
+            delay = model.sample(self._stream(operation))
+            failed = self.errors.should_fail(self._error_rng) if self.errors is not None else False
+        return delay, failed
+
+    def call(self, operation: str, default: Optional[LatencyModel] = None) -> Tuple[float, bool]:
+        """Выдержка задержки операции, возвращает задержку и признак ошибки"""
+        delay, failed = self.sample(operation, default)
+        self.clock.sleep(delay)
+        return delay, failed
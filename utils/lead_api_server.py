@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import itertools
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+
+from utils.capacity_finder import LINER_ENDPOINTS
+from utils.latency_models import ErrorBurstModel, LogNormalLatency, SimulatedBackend
+from utils.stub_server import BackgroundAppServer
+
+REQUIRED_FIELDS = ("lead_type", "client_name", "client_phone")
+STRING_FIELDS = ("client_name", "client_phone", "external_id", "campaign_id", "status", "priority", "utc_offset")
+LEAD_TYPES = ("straight", "selection")
+# Маршруты методов APIClient (create_lead, get_lead, update_lead, delete_lead, search_leads):
+# имя эндпоинта для статистики и модели задержек, метод и путь. Поиск раньше {lead_id}
+CLIENT_ROUTES = (
+    ("lead/search", "GET", "/leads/search"),
+    ("lead/create", "POST", "/leads"),
+    ("lead/detail", "GET", "/leads/{lead_id}"),
+    ("lead/update", "PUT", "/leads/{lead_id}"),
+    ("lead/delete", "DELETE", "/leads/{lead_id}"),
+)
+
+
+def _error(message: str, status: int) -> web.Response:
+    return web.json_response({"status": "error", "message": message}, status=status)
+
+
+def validate_lead(data: Any, partial: bool = False) -> Optional[web.Response]:
+    """Проверка полей лида, возвращает ответ с ошибкой или None"""
+    if not isinstance(data, dict) or (not data and not partial):
+        return _error("Пустое тело запроса", 400)
+    if not partial:
+        missing = [field for field in REQUIRED_FIELDS if field not in data]
+        if missing:
+            return _error(f"Не заполнены обязательные поля: {', '.join(missing)}", 400)
+    wrong = [field for field in STRING_FIELDS if field in data and not isinstance(data[field], str)]
+    if "order_id" in data and not str(data["order_id"]).isdigit():
+        wrong.append("order_id")
+    if wrong:
+        return _error(f"Неверный тип полей: {', '.join(wrong)}", 422)
+    if "lead_type" in data and data["lead_type"] not in LEAD_TYPES:
+        return _error(f"Неизвестный тип лида {data['lead_type']}", 422)
+    return None
+
+
+def backend_from_profile(profile: Dict[str, Any]) -> SimulatedBackend:
+    """Модель задержек и ошибок по описанию профиля
+
+    Задержки задаются логнормальным распределением в миллисекундах:
+    {"latency": {"median_ms": 20, "sigma": 0.5, "spike_probability": 0.01,
+    "spike_multiplier": 10}, "endpoints": {"lead/create": {...}},
+    "errors": {"burst_probability": 0.01, "burst_length": 1}, "seed": 1}
+    """
+    def latency(settings: Dict[str, Any]) -> LogNormalLatency:
+        settings = dict(settings)
+        return LogNormalLatency(settings.pop("median_ms", 10) / 1000, **settings)
+
+    errors = profile.get("errors")
+    return SimulatedBackend(
+        latency(profile.get("latency", {})),
+        operations={name: latency(settings) for name, settings in profile.get("endpoints", {}).items()},
+        errors=ErrorBurstModel(**errors) if errors else None,
+        seed=profile.get("seed")
+    )
+
+
+class LeadAPIServer(BackgroundAppServer):
+    """Локальная замена Liner API лидов на aiohttp для измерений без сети
+
+    Обслуживает /v1/lead/create/, /v1/lead/create-async/,
+    /v1/lead/detail/{id} и /v1/lead/update/{id} как в коллекции Postman,
+    а также /leads, /leads/{id} и /leads/search, по которым ходят методы
+    APIClient в сценариях нагрузки. Лиды хранятся в памяти. Задержки и ошибки берутся из backend
+    (SimulatedBackend) по именам эндпоинтов из LINER_ENDPOINTS; задержка
+    выдерживается через asyncio.sleep, поэтому тысячи одновременных
+    соединений не занимают потоки. Лид из create-async появляется через
+    async_delay секунд.
+    """
+
+    description = "Сервер API лидов"
+
+    def __init__(self, backend: Optional[SimulatedBackend] = None, api_key: Optional[str] = None,
+                 host: str = "127.0.0.1", port: int = 0, error_status: int = 503, async_delay: float = 0.0,
+                 backlog: int = 4096):
+        super().__init__(host, port, backlog)
+        self.backend = backend
+        self.api_key = api_key
+        self.error_status = error_status
+        self.async_delay = async_delay
+        self.leads: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._tasks = itertools.count(1)
+        endpoints = list(LINER_ENDPOINTS) + [name for name, _, _ in CLIENT_ROUTES if name not in LINER_ENDPOINTS]
+        self._stats = {"requests": {name: 0 for name in endpoints}, "injected_errors": 0,
+                       "in_flight": 0, "max_in_flight": 0}
+
+    @classmethod
+    def from_profile(cls, profile: Dict[str, Any], **kwargs) -> "LeadAPIServer":
+        """Создание по профилю задержек и ошибок (см. backend_from_profile)"""
+        kwargs.setdefault("error_status", profile.get("error_status", 503))
+        return cls(backend_from_profile(profile), **kwargs)
+
+    def make_app(self) -> web.Application:
+        """Приложение aiohttp с маршрутами API лидов"""
+        handlers = {
+            "lead/create": self._create,
+            "lead/detail": self._detail,
+            "lead/update": self._update,
+            "create-async": self._create_async,
+            "lead/search": self._search,
+            "lead/delete": self._delete,
+        }
+        app = web.Application()
+        app.router.add_get("/v1/", self._root)
+        for name, (method, path) in LINER_ENDPOINTS.items():
+            path = path.format(lead_id="{lead_id}").rstrip("/")
+            handler = self._endpoint(name, handlers[name])
+            # Клиенты обращаются и со слешем на конце, и без него
+            app.router.add_route(method, path, handler)
+            app.router.add_route(method, path + "/", handler)
+        for name, method, path in CLIENT_ROUTES:
+            app.router.add_route(method, path, self._endpoint(name, handlers[name]))
+        return app
+
+    def _endpoint(self, name: str, handler):
+        async def wrapper(request: web.Request) -> web.Response:
+            stats = self._stats
+            stats["requests"][name] += 1
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+            try:
+                if self.api_key is not None and request.headers.get("X-Api-Key") != self.api_key:
+                    return _error("Неверный API ключ", 401)
+                if self.backend is not None:
+                    delay, failed = self.backend.sample(name)
+                    await asyncio.sleep(delay)
+                    if failed:
+                        stats["injected_errors"] += 1
+                        return _error("Сервис временно недоступен", self.error_status)
+                return await handler(request)
+            finally:
+                stats["in_flight"] -= 1
+        return wrapper
+
+    @staticmethod
+    async def _read_json(request: web.Request) -> Any:
+        try:
+            return await request.json()
+        except ValueError:
+            return None
+
+    def _store(self, data: Dict[str, Any]) -> str:
+        lead_id = str(next(self._ids))
+        self.leads[lead_id] = {"status": "new", **data, "id": lead_id}
+        return lead_id
+
+    def _duplicate(self, data: Dict[str, Any]) -> bool:
+        external_id = data.get("external_id")
+        return bool(external_id) and any(lead.get("external_id") == external_id for lead in self.leads.values())
+
+    async def _root(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "success", "message": "Liner API"})
+
+    async def _create(self, request: web.Request) -> web.Response:
+        data = await self._read_json(request)
+        error = validate_lead(data)
+        if error is not None:
+            return error
+        if self._duplicate(data):
+            return _error(f"Лид с external_id {data['external_id']} уже существует", 409)
+        lead_id = self._store(data)
+        return web.json_response({"status": "success", "id": lead_id, "message": "Лид успешно создан"})
+
+    async def _create_async(self, request: web.Request) -> web.Response:
+        data = await self._read_json(request)
+        error = validate_lead(data)
+        if error is not None:
+            return error
+        task_id = f"task_{next(self._tasks)}"
+        asyncio.get_running_loop().call_later(self.async_delay, self._store, data)
+        return web.json_response({"task_id": task_id}, status=202)
+
+    async def _detail(self, request: web.Request) -> web.Response:
+        lead = self.leads.get(request.match_info["lead_id"])
+        if lead is None:
+            return _error("Лид не найден", 404)
+        return web.json_response({**lead, "UF_NAME": lead["client_name"],
+                                  "UF_EXTERNAL_ID": lead.get("external_id"), "UF_STAGE": "Новый"})
+
+    async def _update(self, request: web.Request) -> web.Response:
+        lead = self.leads.get(request.match_info["lead_id"])
+        if lead is None:
+            return _error("Лид не найден", 404)
+        data = await self._read_json(request)
+        error = validate_lead(data, partial=True)
+        if error is not None:
+            return error
+        lead.update({key: value for key, value in data.items() if key != "id"})
+        return web.json_response({"status": "success", "message": "Лид успешно обновлен"})
+
+    async def _delete(self, request: web.Request) -> web.Response:
+        if self.leads.pop(request.match_info["lead_id"], None) is None:
+            return _error("Лид не найден", 404)
+        return web.json_response({"status": "success", "message": "Лид удален"})
+
+    async def _search(self, request: web.Request) -> web.Response:
+        params = dict(request.query)
+        try:
+            page = max(int(params.pop("page", 1)), 1)
+            limit = max(int(params.pop("limit", 10)), 1)
+        except ValueError:
+            return _error("page и limit должны быть числами", 422)
+        found = [lead for lead in self.leads.values()
+                 if all(str(lead.get(key)) == value for key, value in params.items())]
+        return web.json_response({
+            "status": "success",
+            "data": found[(page - 1) * limit:page * limit],
+            "pagination": {"page": page, "limit": limit, "total": len(found), "pages": -(-len(found) // limit)}
+        })
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Число запросов по эндпоинтам, внесенные ошибки и пик одновременных запросов"""
+        return {**self._stats, "requests": dict(self._stats["requests"]), "leads": len(self.leads)}
+
+
+def main() -> None:
+    """Запуск локального сервера API лидов с профилем из config/config.json"""
+    from utils.config_loader import ConfigLoader
+
+    profiles = ConfigLoader().config.get("lead_api_server", {}).get("profiles", {})
+    parser = argparse.ArgumentParser(description="Локальная замена Liner API лидов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--profile", default=None, choices=list(profiles) or None,
+                        help="Профиль задержек и ошибок (без профиля - ответы без задержки)")
+    parser.add_argument("--api-key", default=None, help="Требуемый X-Api-Key")
+    parser.add_argument("--async-delay", type=float, default=0.0, help="Задержка появления лида из create-async")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    kwargs = {"api_key": args.api_key, "host": args.host, "port": args.port, "async_delay": args.async_delay}
+    server = LeadAPIServer.from_profile(profiles[args.profile], **kwargs) if args.profile else LeadAPIServer(**kwargs)
+    with server:
+        print(f"API лидов доступно на {server.url}, Ctrl+C для остановки")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
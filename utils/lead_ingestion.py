@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+from utils.async_api_client import AsyncAPIClient
+from utils.config_loader import ConfigLoader
+from utils.rate_limiter import AdaptiveRateLimiter
+
+CREATE_ENDPOINT = "/leads"
+CREATE_ASYNC_ENDPOINT = "/v1/lead/create-async/"
+
+logger = logging.getLogger(__name__)
+
+
+def iter_leads_jsonl(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Построчное чтение лидов из JSONL файла без загрузки файла в память"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.error(f"Некорректная строка {line_number} в {path}: {str(e)}")
+
+
+def _extract_lead_id(payload: Any) -> Optional[Any]:
+    """Получение ID лида или задачи из ответа API"""
+    if not isinstance(payload, dict):
+        return None
+    for key in ("lead_id", "id", "task_id"):
+        if payload.get(key) is not None:
+            return payload[key]
+    return None
+
+
+async def create_leads_bulk(client: AsyncAPIClient,
+                            leads: Union[Iterable[Dict[str, Any]], str, Path],
+                            output_path: Union[str, Path],
+                            concurrency: int = 50,
+                            use_async_endpoint: bool = False,
+                            queue_size: Optional[int] = None) -> Dict[str, Any]:
+    """Потоковое массовое создание лидов с ограничением конкурентности
+
+    Лиды читаются из итератора или JSONL файла через ограниченную очередь:
+    когда все воркеры заняты, чтение входа приостанавливается. Результат
+    каждого лида (index, lead_id, status, latency_ms, error) дописывается
+    в выходной JSONL сразу после завершения запроса.
+    """
+    if isinstance(leads, (str, Path)):
+        leads = iter_leads_jsonl(leads)
+    endpoint = CREATE_ASYNC_ENDPOINT if use_async_endpoint else CREATE_ENDPOINT
+    queue_size = queue_size or concurrency * 2
+
+    pending: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    finished: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    summary = {"total": 0, "succeeded": 0, "failed": 0}
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    senders_left = concurrency
+
+    async def produce() -> None:
+        for index, lead in enumerate(leads):
+            await pending.put((index, lead))
+        for _ in range(concurrency):
+            await pending.put(None)
+
+    async def send() -> None:
+        nonlocal senders_left
+        while True:
+            item = await pending.get()
+            if item is None:
+                # Последний завершившийся воркер сообщает записи, что результатов больше не будет
+                senders_left -= 1
+                if not senders_left:
+                    await finished.put(None)
+                return
+            index, lead = item
+            request_started = loop.time()
+            result = {"index": index, "lead_id": None, "status": None, "latency_ms": None, "error": None}
+            try:
+                response = await client.post(endpoint, json=lead)
+                result["status"] = response.status_code
+                try:
+                    result["lead_id"] = _extract_lead_id(response.json())
+                except ValueError:
+                    pass
+                if not response.ok:
+                    result["error"] = response.text[:200]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result["error"] = str(e) or type(e).__name__
+            result["latency_ms"] = round((loop.time() - request_started) * 1000, 3)
+            await finished.put(result)
+
+    async def write(out) -> None:
+        while True:
+            result = await finished.get()
+            if result is None:
+                return
+            summary["total"] += 1
+            if result["error"] is None:
+                summary["succeeded"] += 1
+            else:
+                summary["failed"] += 1
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            if finished.empty():
+                out.flush()
+
+    # Файл открывается до запуска воркеров, чтобы ошибка открытия не оставила их ждать записи
+    with open(output_path, "w", encoding="utf-8") as out:
+        tasks = [asyncio.create_task(write(out)), asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(send()) for _ in range(concurrency)]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+    duration = loop.time() - started
+    summary["duration_s"] = round(duration, 3)
+    summary["rps"] = round(summary["total"] / duration, 2) if duration > 0 else 0.0
+    logger.info(f"Массовое создание лидов завершено: {summary}")
+    return summary
+
+
+def main() -> None:
+    """Запуск массового создания лидов из командной строки"""
+    parser = argparse.ArgumentParser(description="Массовое создание лидов из JSONL файла")
+    parser.add_argument("input", help="JSONL файл с данными лидов")
+    parser.add_argument("output", help="JSONL файл для результатов")
+    parser.add_argument("--env", default=None, help="Окружение (dev, sm, ask-yug)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Число одновременных запросов")
+    parser.add_argument("--async-endpoint", action="store_true", help="Использовать /v1/lead/create-async/")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    config_loader = ConfigLoader()
+    rate_limiter = AdaptiveRateLimiter.from_config(config_loader.config)
+
+    async def run() -> Dict[str, Any]:
+        async with AsyncAPIClient(
+            config_loader.get_api_url(args.env),
+            config_loader.get_api_key(args.env),
+            max_connections=args.concurrency,
+            rate_limiter=rate_limiter
+        ) as client:
+            return await create_leads_bulk(
+                client,
+                args.input,
+                args.output,
+                concurrency=args.concurrency,
+                use_async_endpoint=args.async_endpoint
+            )
+
+    started = time.time()
+    summary = asyncio.run(run())
+    print(f"Готово за {time.time() - started:.1f} сек: {summary}")
+    if rate_limiter is not None:
+        print(f"Ограничение скорости: {rate_limiter.get_metrics()}")
+
+
+if __name__ == "__main__":
+    main()
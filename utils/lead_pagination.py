@@ -0,0 +1,209 @@
+import codecs
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import allure
+import requests
+
+if TYPE_CHECKING:
+    from utils.api_client import APIClient
+
+SEARCH_ENDPOINT = "/leads/search"
+
+
+class StreamingJSONPage:
+    """Потоковый разбор страницы вида {"data": [...], "pagination": {...}}
+
+    Элементы массива data выдаются по одному по мере чтения тела ответа,
+    поэтому в памяти находится не больше одного элемента и одного блока
+    данных. Остальные ключи верхнего уровня сохраняются в meta. Если тело
+    является массивом, выдаются его элементы.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], array_key: str = "data"):
+        self.array_key = array_key
+        self.meta: Dict[str, Any] = {}
+        self.read_time = 0.0
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Чтение следующего блока, False при окончании тела"""
+        if self._eof:
+            return False
+        started = time.perf_counter()
+        chunk = next(self._chunks, None)
+        self.read_time += time.perf_counter() - started
+        if chunk is None:
+            self._eof = True
+            text = self._text_decoder.decode(b"", final=True)
+        else:
+            text = self._text_decoder.decode(chunk)
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return chunk is not None or bool(text)
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Неожиданный конец JSON")
+
+    def _next_char(self, *expected: str) -> str:
+        char = self._peek()
+        if char not in expected:
+            raise ValueError(f"Некорректный JSON: ожидалось {' или '.join(expected)}, получено {char!r}")
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Число в конце буфера может продолжаться в следующем блоке
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _array_items(self) -> Iterator[Any]:
+        self._next_char("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._next_char(",", "]") == "]":
+                return
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._peek() == "[":
+            yield from self._array_items()
+            return
+        self._next_char("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._next_char(":")
+            if key == self.array_key and self._peek() == "[":
+                yield from self._array_items()
+            else:
+                self.meta[key] = self._value()
+            if self._next_char(",", "}") == "}":
+                return
+
+
+class LeadPageIterator:
+    """Итератор по всем лидам результата поиска с предзагрузкой страниц
+
+    Пока вызывающий код обрабатывает страницу N, в фоне уже запрошены
+    следующие prefetch страниц. Лиды декодируются из потока по одному.
+    Для каждой страницы в page_stats записываются:
+    fetch_ms - время до получения заголовков ответа,
+    read_ms - время чтения и разбора тела,
+    wait_ms - сколько итератор ждал страницу (0 при успешной предзагрузке).
+    """
+
+    def __init__(self, client: "APIClient", query_params: Optional[Dict[str, Any]] = None,
+                 limit: int = 100, prefetch: int = 1, start_page: int = 1, chunk_size: int = 65536):
+        self.client = client
+        self.query_params = dict(query_params or {})
+        self.limit = limit
+        self.prefetch = max(0, prefetch)
+        self.start_page = start_page
+        self.chunk_size = chunk_size
+        self.page_stats: List[Dict[str, Any]] = []
+        self.logger = logging.getLogger(__name__)
+
+    def _fetch_page(self, page: int) -> Tuple[requests.Response, float]:
+        params = {**self.query_params, "page": page, "limit": self.limit}
+        started = time.perf_counter()
+        response = self.client._make_request("GET", SEARCH_ENDPOINT, strict=True, params=params, stream=True)
+        return response, (time.perf_counter() - started) * 1000
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        executor = ThreadPoolExecutor(max_workers=max(1, self.prefetch), thread_name_prefix="lead-prefetch")
+        pending: Deque[Tuple[int, Future]] = deque()
+        next_page = self.start_page
+        last_page: Optional[int] = None
+        response: Optional[requests.Response] = None
+
+        def schedule() -> None:
+            nonlocal next_page
+            while len(pending) <= self.prefetch and (last_page is None or next_page <= last_page):
+                pending.append((next_page, executor.submit(self._fetch_page, next_page)))
+                next_page += 1
+
+        try:
+            while True:
+                schedule()
+                if not pending:
+                    break
+                page, future = pending.popleft()
+                wait_started = time.perf_counter()
+                response, fetch_ms = future.result()
+                wait_ms = (time.perf_counter() - wait_started) * 1000
+                response.raise_for_status()
+
+                decoder = StreamingJSONPage(response.iter_content(chunk_size=self.chunk_size))
+                count = 0
+                for item in decoder:
+                    count += 1
+                    yield item
+                response.close()
+                response = None
+
+                self._record_page(page, count, fetch_ms, decoder.read_time * 1000, wait_ms)
+                pages = (decoder.meta.get("pagination") or {}).get("pages")
+                if count < self.limit or (pages is not None and page >= pages):
+                    break
+                if pages is not None and last_page is None:
+                    last_page = pages
+        finally:
+            if response is not None:
+                response.close()
+            for _, future in pending:
+                if not future.cancel():
+                    try:
+                        future.result()[0].close()
+                    except Exception:
+                        pass
+            executor.shutdown(wait=False)
+
+    def _record_page(self, page: int, items: int, fetch_ms: float, read_ms: float, wait_ms: float) -> None:
+        stats = {"page": page, "items": items, "fetch_ms": fetch_ms, "read_ms": read_ms, "wait_ms": wait_ms}
+        self.page_stats.append(stats)
+        self.logger.debug(
+            "Страница %s: %s лидов, запрос %.1f мс, чтение %.1f мс, ожидание %.1f мс",
+            page, items, fetch_ms, read_ms, wait_ms
+        )
+
+    def attach_to_allure(self, name: str = "Задержки страниц поиска лидов") -> None:
+        """Прикрепление таблицы задержек по страницам к отчету Allure"""
+        if not self.page_stats:
+            return
+        lines = [f"{'страница':>8} {'лидов':>6} {'запрос, мс':>11} {'чтение, мс':>11} {'ожидание, мс':>13}"]
+        for stats in self.page_stats:
+            lines.append(
+                f"{stats['page']:>8} {stats['items']:>6} {stats['fetch_ms']:>11.1f} "
+                f"{stats['read_ms']:>11.1f} {stats['wait_ms']:>13.1f}"
+            )
+        allure.attach("\n".join(lines), name, allure.attachment_type.TEXT)
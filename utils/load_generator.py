@@ -0,0 +1,141 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class OpenLoopLoadGenerator:
+    """Генератор нагрузки с открытым циклом
+
+    Запросы отправляются по расписанию с заданной интенсивностью независимо
+    от того, как быстро отвечает сервер. Интервалы между запросами
+    постоянные (arrival="constant") или экспоненциальные (arrival="poisson").
+    Одновременно выполняется не более max_in_flight запросов: запрос, для
+    которого нет свободного слота, отбрасывается и учитывается в dropped.
+    Запрос, отправленный позже расписания больше чем на late_threshold
+    секунд, учитывается в late.
+    Для длительных прогонов результаты можно не хранить (keep_results=False),
+    а передавать в on_result по мере завершения запросов. Отброшенные
+    запросы передаются в on_drop с запланированным моментом отправки.
+    """
+
+    ARRIVALS = ("constant", "poisson")
+
+    def __init__(self, rate: float, duration: Optional[float] = None, total_requests: Optional[int] = None,
+                 arrival: str = "constant", max_in_flight: int = 100, late_threshold: float = 0.01,
+                 seed: Optional[int] = None, on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 keep_results: bool = True, on_drop: Optional[Callable[[float], None]] = None):
+        if rate <= 0:
+            raise ValueError("Интенсивность должна быть больше нуля")
+        if duration is None and total_requests is None:
+            raise ValueError("Нужно указать duration или total_requests")
+        if arrival not in self.ARRIVALS:
+            raise ValueError(f"Неизвестный тип поступления запросов: {arrival}")
+        self.rate = rate
+        self.duration = duration
+        self.total_requests = total_requests
+        self.arrival = arrival
+        self.max_in_flight = max_in_flight
+        self.late_threshold = late_threshold
+        self.on_result = on_result
+        self.on_drop = on_drop
+        self.keep_results = keep_results
+        self.logger = logging.getLogger(__name__)
+        self._random = random.Random(seed)
+
+    def schedule(self) -> Iterator[float]:
+        """Запланированные моменты отправки относительно начала теста"""
+        offset = 0.0
+        sent = 0
+        while True:
+            if self.total_requests is not None and sent >= self.total_requests:
+                return
+            if self.duration is not None and offset >= self.duration:
+                return
+            yield offset
+            sent += 1
+            if self.arrival == "poisson":
+                offset += self._random.expovariate(self.rate)
+            else:
+                offset = sent / self.rate
+
+    def run(self, func: Callable[..., Any], *args, **kwargs) -> Dict[str, Any]:
+        """Запуск нагрузки, возвращает сводку и результаты отдельных запросов
+
+        Для каждого запроса сохраняются response_time (от фактической
+        отправки) и scheduled_response_time (от запланированного момента),
+        которое учитывает задержку самого генератора.
+        """
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+        lock = threading.Lock()
+        results: List[Dict[str, Any]] = []
+        counters = {"sent": 0, "succeeded": 0}
+        dropped = 0
+        late = 0
+        max_lag = 0.0
+
+        def execute(scheduled_at: float, sent_at: float) -> None:
+            try:
+                result = func(*args, **kwargs)
+                record = {"success": True, "result": result}
+            except Exception as e:
+                record = {"success": False, "error": str(e)}
+            finished = time.perf_counter()
+            record["response_time"] = finished - sent_at
+            record["scheduled_response_time"] = finished - scheduled_at
+            record["send_lag"] = sent_at - scheduled_at
+            record["scheduled_offset"] = scheduled_at - started
+            slots.release()
+            if self.on_result is not None:
+                self.on_result(record)
+            with lock:
+                counters["sent"] += 1
+                counters["succeeded"] += int(record["success"])
+                if self.keep_results:
+                    results.append(record)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="open-loop")
+        started = time.perf_counter()
+        try:
+            for offset in self.schedule():
+                scheduled_at = started + offset
+                pause = scheduled_at - time.perf_counter()
+                if pause > 0:
+                    time.sleep(pause)
+                if not slots.acquire(blocking=False):
+                    dropped += 1
+                    if self.on_drop is not None:
+                        self.on_drop(offset)
+                    continue
+                sent_at = time.perf_counter()
+                lag = sent_at - scheduled_at
+                max_lag = max(max_lag, lag)
+                if lag > self.late_threshold:
+                    late += 1
+                executor.submit(execute, scheduled_at, sent_at)
+            send_duration = time.perf_counter() - started
+        finally:
+            executor.shutdown(wait=True)
+        duration = time.perf_counter() - started
+
+        sent, succeeded = counters["sent"], counters["succeeded"]
+        summary = {
+            "target_rps": self.rate,
+            "arrival": self.arrival,
+            "sent": sent,
+            "dropped": dropped,
+            "late": late,
+            "max_send_lag": max_lag,
+            "succeeded": succeeded,
+            "failed": sent - succeeded,
+            "achieved_rps": sent / (send_duration + 1.0 / self.rate),
+            "duration_s": duration,
+            "results": results
+        }
+        self.logger.info(
+            f"Открытая нагрузка {self.rate} запр/с ({self.arrival}): отправлено {sent}, "
+            f"отброшено {dropped}, с опозданием {late}, ошибок {summary['failed']}"
+        )
+        return summary
@@ -0,0 +1,372 @@
+import argparse
+import csv
+import html
+import io
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import allure
+
+from utils.latency_histogram import LatencyHistogram
+from utils.load_generator import OpenLoopLoadGenerator
+
+TIMESERIES_COLUMNS = ("second", "target_rps", "throughput", "errors", "error_rate", "dropped", "p50_ms", "p90_ms",
+                      "p99_ms", "max_ms")
+
+
+class LoadProfile:
+    """Профиль нагрузки: последовательность этапов с линейным изменением интенсивности
+
+    Этап задается кортежем (длительность в секундах, начальная и конечная
+    интенсивность в запросах в секунду).
+    """
+
+    def __init__(self, name: str, stages: Sequence[Tuple[float, float, float]]):
+        if not stages:
+            raise ValueError("Профиль нагрузки должен содержать хотя бы один этап")
+        self.name = name
+        self.stages = [tuple(float(x) for x in stage) for stage in stages]
+
+    @property
+    def duration(self) -> float:
+        return sum(stage[0] for stage in self.stages)
+
+    @property
+    def peak_rate(self) -> float:
+        return max(max(stage[1], stage[2]) for stage in self.stages)
+
+    def rate_at(self, offset: float) -> float:
+        """Целевая интенсивность в момент offset от начала теста"""
+        for duration, start_rate, end_rate in self.stages:
+            if offset < duration:
+                return start_rate + (end_rate - start_rate) * offset / duration
+            offset -= duration
+        return 0.0
+
+    @classmethod
+    def ramp(cls, start_rps: float, end_rps: float, duration: float) -> "LoadProfile":
+        """Линейный рост интенсивности"""
+        return cls("ramp", [(duration, start_rps, end_rps)])
+
+    @classmethod
+    def steps(cls, rates: Sequence[float], step_duration: float) -> "LoadProfile":
+        """Ступени с постоянной интенсивностью"""
+        return cls("steps", [(step_duration, rate, rate) for rate in rates])
+
+    @classmethod
+    def spike(cls, base_rps: float, peak_rps: float, duration: float, spike_start: float,
+              spike_duration: float) -> "LoadProfile":
+        """Постоянная нагрузка с кратковременным всплеском"""
+        stages = [(spike_start, base_rps, base_rps), (spike_duration, peak_rps, peak_rps)]
+        rest = duration - spike_start - spike_duration
+        if rest > 0:
+            stages.append((rest, base_rps, base_rps))
+        return cls("spike", [stage for stage in stages if stage[0] > 0])
+
+    @classmethod
+    def soak(cls, rps: float, duration: float, warmup: float = 60.0) -> "LoadProfile":
+        """Длительная постоянная нагрузка с плавным разгоном"""
+        warmup = min(warmup, duration)
+        stages = [(warmup, 0.0, rps), (duration - warmup, rps, rps)]
+        return cls("soak", [stage for stage in stages if stage[0] > 0])
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "LoadProfile":
+        """Создание профиля из описания вида {"type": "ramp", "start_rps": 1, ...}"""
+        spec = dict(spec)
+        builders: Dict[str, Callable[..., "LoadProfile"]] = {
+            "ramp": cls.ramp, "steps": cls.steps, "spike": cls.spike, "soak": cls.soak
+        }
+        profile_type = spec.pop("type", None)
+        if profile_type == "stages":
+            return cls(spec.get("name", "stages"), spec["stages"])
+        if profile_type not in builders:
+            raise ValueError(f"Неизвестный тип профиля нагрузки: {profile_type}")
+        return builders[profile_type](**spec)
+
+
+class ProfileLoadGenerator(OpenLoopLoadGenerator):
+    """Генератор открытой нагрузки с интенсивностью, меняющейся по профилю"""
+
+    def __init__(self, profile: LoadProfile, **kwargs):
+        kwargs.setdefault("keep_results", False)
+        super().__init__(rate=max(profile.peak_rate, 1e-6), duration=profile.duration, **kwargs)
+        self.profile = profile
+
+    def schedule(self) -> Iterator[float]:
+        """Моменты отправки: n-й запрос этапа отправляется, когда интеграл интенсивности достигает n"""
+        stage_start = 0.0
+        for duration, start_rate, end_rate in self.profile.stages:
+            slope = (end_rate - start_rate) / duration
+            arrivals = 0.0
+            while True:
+                if slope == 0:
+                    if start_rate <= 0:
+                        break
+                    offset = arrivals / start_rate
+                else:
+                    discriminant = start_rate * start_rate + 2 * slope * arrivals
+                    if discriminant < 0:
+                        break
+                    offset = (math.sqrt(discriminant) - start_rate) / slope
+                if offset >= duration:
+                    break
+                yield stage_start + offset
+                arrivals += self._random.expovariate(1.0) if self.arrival == "poisson" else 1.0
+            stage_start += duration
+
+
+class TimeSeriesRecorder:
+    """Посекундный временной ряд нагрузки в SQLite
+
+    Для каждой секунды прогона сохраняются целевая интенсивность, число
+    завершенных запросов, ошибки, запросы, отброшенные генератором
+    из-за нехватки слотов, и перцентили времени ответа. Завершенные
+    секунды сбрасываются в базу и удаляются из памяти, поэтому многочасовой
+    прогон не накапливает данные в памяти. Экземпляр передается
+    в генератор как on_result, метод record_drop - как on_drop.
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:", profile: Optional[LoadProfile] = None,
+                 run_name: str = ""):
+        self.profile = profile
+        self.run_name = run_name or (profile.name if profile else "load")
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, "
+            "started_at REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS timeseries (run_id INTEGER, second INTEGER, target_rps REAL, "
+            "throughput INTEGER, errors INTEGER, error_rate REAL, dropped INTEGER, p50_ms REAL, p90_ms REAL, "
+            "p99_ms REAL, max_ms REAL, PRIMARY KEY (run_id, second))"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(timeseries)")}
+        if "dropped" not in columns:
+            # База прежних прогонов без учета отброшенных запросов
+            self._db.execute("ALTER TABLE timeseries ADD COLUMN dropped INTEGER DEFAULT 0")
+        self.run_id = self._db.execute(
+            "INSERT INTO runs (name, started_at) VALUES (?, ?)", (self.run_name, time.time())
+        ).lastrowid
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._buckets: Dict[int, Dict[str, Any]] = {}
+        self._next_second = 0
+        self._started = time.perf_counter()
+
+    def start(self) -> None:
+        """Отсчет секунд от текущего момента"""
+        self._started = time.perf_counter()
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        self.record(record)
+
+    def record(self, record: Dict[str, Any]) -> None:
+        """Учет завершенного запроса в секунде его завершения"""
+        with self._lock:
+            bucket = self._current_bucket()
+            bucket["count"] += 1
+            bucket["errors"] += 0 if record.get("success", True) else 1
+            bucket["histogram"].record_seconds(record.get("scheduled_response_time", record["response_time"]))
+
+    def record_drop(self, scheduled_offset: float) -> None:
+        """Учет отброшенного запроса в секунде, когда его нужно было отправить"""
+        with self._lock:
+            self._current_bucket()["dropped"] += 1
+
+    def _current_bucket(self) -> Dict[str, Any]:
+        """Счетчики текущей секунды, секунды раньше предыдущей сбрасываются в базу"""
+        second = int(time.perf_counter() - self._started)
+        bucket = self._buckets.get(second)
+        if bucket is None:
+            bucket = self._buckets[second] = {"count": 0, "errors": 0, "dropped": 0,
+                                              "histogram": LatencyHistogram()}
+        if second > self._next_second + 1:
+            self._flush(second - 1)
+        return bucket
+
+    def _flush(self, until: int) -> None:
+        """Запись в базу всех секунд раньше until"""
+        rows = []
+        for second in range(self._next_second, until):
+            bucket = self._buckets.pop(second, None)
+            count = bucket["count"] if bucket else 0
+            errors = bucket["errors"] if bucket else 0
+            dropped = bucket["dropped"] if bucket else 0
+            latency = bucket["histogram"].get_percentiles() if bucket else {"p50": 0, "p90": 0, "p99": 0, "max": 0}
+            target = self.profile.rate_at(second + 0.5) if self.profile else None
+            rows.append((self.run_id, second, target, count, errors, errors / count if count else 0.0, dropped,
+                         latency["p50"], latency["p90"], latency["p99"], latency["max"]))
+        if rows:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO timeseries (run_id, {', '.join(TIMESERIES_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(TIMESERIES_COLUMNS) + 1))})", rows
+            )
+            self._db.commit()
+        self._next_second = max(self._next_second, until)
+
+    def finish(self) -> None:
+        """Сброс в базу оставшихся секунд"""
+        with self._lock:
+            last = max(self._buckets) + 1 if self._buckets else self._next_second
+            self._flush(last)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Временной ряд текущего прогона"""
+        with self._lock:
+            cursor = self._db.execute(
+                f"SELECT {', '.join(TIMESERIES_COLUMNS)} FROM timeseries WHERE run_id = ? ORDER BY second",
+                (self.run_id,)
+            )
+            return [dict(zip(TIMESERIES_COLUMNS, row)) for row in cursor.fetchall()]
+
+    def to_csv(self) -> str:
+        """Временной ряд в формате CSV"""
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=TIMESERIES_COLUMNS)
+        writer.writeheader()
+        writer.writerows(self.rows())
+        return output.getvalue()
+
+    def close(self) -> None:
+        self.finish()
+        self._db.close()
+
+    def attach_to_allure(self, name: str = "График нагрузки") -> None:
+        """Прикрепление графика и CSV временного ряда к отчету Allure"""
+        rows = self.rows()
+        if not rows:
+            return
+        allure.attach(render_timeline_svg(rows, title=self.run_name), name, allure.attachment_type.SVG)
+        allure.attach(self.to_csv(), f"{name} (CSV)", allure.attachment_type.CSV)
+
+
+def _polyline(points: List[Tuple[float, float]], color: str, dashed: bool = False) -> str:
+    coords = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+    dash = ' stroke-dasharray="6,4"' if dashed else ""
+    return f'<polyline fill="none" stroke="{color}" stroke-width="2"{dash} points="{coords}"/>'
+
+
+def render_timeline_svg(rows: List[Dict[str, Any]], title: str = "", width: int = 900, height: int = 420) -> str:
+    """SVG график: пропускная способность и целевая интенсивность сверху, p99 снизу, ошибки и отброшенные отметками"""
+    margin_left, margin_right, margin_top, gap = 60, 20, 30, 40
+    panel_height = (height - margin_top - gap - 30) / 2
+    plot_width = width - margin_left - margin_right
+    last_second = max(row["second"] for row in rows) or 1
+    max_rps = max(max(row["throughput"], row["target_rps"] or 0) for row in rows) or 1
+    max_latency = max(row["p99_ms"] for row in rows) or 1
+
+    def x(second: float) -> float:
+        return margin_left + plot_width * second / last_second
+
+    def y(value: float, top: float, maximum: float) -> float:
+        return top + panel_height * (1 - value / maximum)
+
+    top_panel, bottom_panel = margin_top, margin_top + panel_height + gap
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="sans-serif" '
+        f'font-size="12">',
+        f'<rect width="{width}" height="{height}" fill="white"/>',
+        f'<text x="{margin_left}" y="18" font-size="14">{html.escape(title)}</text>',
+    ]
+    for top, maximum, label in ((top_panel, max_rps, "запр/с"), (bottom_panel, max_latency, "p99, мс")):
+        parts.append(f'<rect x="{margin_left}" y="{top}" width="{plot_width}" height="{panel_height:.1f}" '
+                     f'fill="none" stroke="#ccc"/>')
+        parts.append(f'<text x="5" y="{top + 12:.1f}">{maximum:.0f}</text>')
+        parts.append(f'<text x="5" y="{top + panel_height:.1f}">0</text>')
+        parts.append(f'<text x="{margin_left + 5}" y="{top + 14:.1f}" fill="#555">{label}</text>')
+
+    if any(row["target_rps"] is not None for row in rows):
+        parts.append(_polyline([(x(r["second"]), y(r["target_rps"] or 0, top_panel, max_rps)) for r in rows],
+                               "#999", dashed=True))
+    parts.append(_polyline([(x(r["second"]), y(r["throughput"], top_panel, max_rps)) for r in rows], "#1f77b4"))
+    parts.append(_polyline([(x(r["second"]), y(r["p99_ms"], bottom_panel, max_latency)) for r in rows], "#ff7f0e"))
+    for row in rows:
+        if row["errors"]:
+            parts.append(f'<circle cx="{x(row["second"]):.1f}" cy="{y(0, top_panel, max_rps):.1f}" r="3" fill="#d62728">'
+                         f'<title>{row["errors"]} ошибок</title></circle>')
+        if row.get("dropped"):
+            parts.append(f'<circle cx="{x(row["second"]):.1f}" cy="{y(0, top_panel, max_rps) - 8:.1f}" r="3" '
+                         f'fill="#9467bd"><title>{row["dropped"]} отброшено</title></circle>')
+    parts.append(f'<text x="{margin_left}" y="{height - 8}">0 сек</text>')
+    parts.append(f'<text x="{width - margin_right - 60}" y="{height - 8}">{last_second} сек</text>')
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def run_profile(profile: LoadProfile, func: Callable[..., Any], *args,
+                timeseries_path: Union[str, Path] = ":memory:", max_in_flight: int = 100,
+                arrival: str = "constant", **kwargs) -> Tuple[Dict[str, Any], TimeSeriesRecorder]:
+    """Запуск нагрузки по профилю с записью посекундного временного ряда"""
+    recorder = TimeSeriesRecorder(timeseries_path, profile=profile)
+    generator = ProfileLoadGenerator(profile, max_in_flight=max_in_flight, arrival=arrival, on_result=recorder,
+                                     on_drop=recorder.record_drop)
+    recorder.start()
+    summary = generator.run(func, *args, **kwargs)
+    recorder.finish()
+    return summary, recorder
+
+
+def main() -> None:
+    """Прогон эндпоинта Liner API по профилю нагрузки с записью временного ряда"""
+    from config.constants import REPORTS_DIR
+    from utils.api_client import APIClient
+    from utils.capacity_finder import LEAD_ENDPOINTS, LINER_ENDPOINTS, create_probe_lead, endpoint_call
+    from utils.config_loader import ConfigLoader
+
+    parser = argparse.ArgumentParser(description="Нагрузка на эндпоинт Liner API по профилю")
+    parser.add_argument("--profile", required=True,
+                        help='Профиль в JSON или путь к JSON файлу, например {"type": "ramp", "start_rps": 1, '
+                             '"end_rps": 50, "duration": 300}; типы: ramp, steps, spike, soak, stages')
+    parser.add_argument("--env", default=None, help="Окружение из конфигурации (по умолчанию defaultEnvironment)")
+    parser.add_argument("--target", default=None, help="URL API вместо apiUrl окружения")
+    parser.add_argument("--endpoint", default="lead/create", choices=list(LINER_ENDPOINTS))
+    parser.add_argument("--output", default=str(REPORTS_DIR / "load_timeseries.sqlite"),
+                        help="SQLite файл временного ряда, рядом сохраняется CSV")
+    parser.add_argument("--arrival", default="constant", choices=OpenLoopLoadGenerator.ARRIVALS)
+    parser.add_argument("--max-in-flight", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    spec = Path(args.profile).read_text(encoding="utf-8") if args.profile.endswith(".json") else args.profile
+    profile = LoadProfile.from_dict(json.loads(spec))
+    config_loader = ConfigLoader()
+    client = APIClient(args.target or config_loader.get_api_url(args.env), config_loader.get_api_key(args.env),
+                       pooled=True, pool_maxsize=args.max_in_flight)
+    payload = {
+        "lead_type": "straight",
+        "create_method": "load_profile",
+        "client_name": "Load Profile Lead",
+        "client_phone": "+79991234567",
+        "order_id": 2640
+    }
+    lead_id = None
+    if args.endpoint in LEAD_ENDPOINTS:
+        lead_id = create_probe_lead(client, payload)
+        if lead_id is None:
+            client.close()
+            parser.exit(1, f"Не удалось создать лид для {args.endpoint}\n")
+    try:
+        summary, recorder = run_profile(profile, endpoint_call(client, args.endpoint, payload, lead_id),
+                                        timeseries_path=args.output, max_in_flight=args.max_in_flight,
+                                        arrival=args.arrival)
+    finally:
+        client.close()
+    csv_path = Path(args.output).with_suffix(".csv")
+    csv_path.write_text(recorder.to_csv(), encoding="utf-8")
+    recorder.close()
+    print(f"{profile.name}: отправлено {summary['sent']}, отброшено {summary['dropped']}, "
+          f"ошибок {summary['failed']}")
+    print(f"Временной ряд сохранен в {args.output} и {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+import logging
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PAGE_LOAD_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Family:
+    """Семейство метрик одного имени с набором меток"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.label_names}, получено {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _header(self) -> List[str]:
+        return [f"# TYPE {self.name} {self.kind}", f"# HELP {self.name} {_escape(self.documentation)}"]
+
+    def drain(self) -> List[list]:
+        """Накопленные значения в виде списков (для передачи между процессами) с обнулением"""
+        with self._lock:
+            values, self._values = self._values, {}
+        return [[list(key), value] for key, value in values.items()]
+
+    def merge(self, samples: List[list]) -> None:
+        """Прибавление значений, полученных через drain в другом процессе"""
+        with self._lock:
+            for key, value in samples:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Counter(_Family):
+    """Монотонно растущий счетчик"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}_total{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Gauge(_Family):
+    """Текущее значение, которое может расти и уменьшаться"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Histogram(_Family):
+    """Гистограмма с фиксированными границами корзин (в секундах)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Для каждой комбинации меток: счетчики корзин (последняя - +Inf) и сумма
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def drain(self) -> List[list]:
+        with self._lock:
+            values, self._values = self._values, {}
+        return [[list(key), counts, total[0]] for key, (counts, total) in values.items()]
+
+    def merge(self, samples: List[list]) -> None:
+        with self._lock:
+            for key, counts, value in samples:
+                current, total = self._values.setdefault(tuple(key), ([0] * (len(self.buckets) + 1), [0.0]))
+                for index, count in enumerate(counts):
+                    current[index] += count
+                total[0] += value
+
+    def get_count(self, **labels: str) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], [0.0]))
+            return sum(counts)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = self._header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket_labels = _format_labels(self.label_names, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Набор метрик, отдаваемых одним экспортером"""
+
+    def __init__(self):
+        self._families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _register(self, family: _Family) -> _Family:
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                if type(existing) is not type(family) or existing.label_names != family.label_names:
+                    raise ValueError(f"Метрика {family.name} уже зарегистрирована с другим типом или метками")
+                return existing
+            self._families[family.name] = family
+            return family
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def drain(self) -> Dict[str, List[list]]:
+        """Значения всех метрик с обнулением
+
+        Воркеры xdist отдают так накопленное контроллеру, который
+        экспортирует метрики. Значения (gauge) передаются как приращения,
+        поэтому для них подходят только inc и dec.
+        """
+        with self._lock:
+            families = list(self._families.values())
+        return {family.name: samples for family in families for samples in [family.drain()] if samples}
+
+    def merge(self, snapshot: Dict[str, List[list]]) -> None:
+        """Прибавление значений, полученных через drain"""
+        for name, samples in snapshot.items():
+            family = self._families.get(name)
+            if family is None:
+                self.logger.warning(f"Метрика {name} не зарегистрирована, значения пропущены")
+                continue
+            family.merge(samples)
+
+    def render(self) -> str:
+        """Текст в формате OpenMetrics"""
+        with self._lock:
+            families = list(self._families.values())
+        lines = [line for family in families for line in family.render()]
+        return "\n".join(lines + ["# EOF"]) + "\n"
+
+
+class RunMetrics:
+    """Стандартный набор метрик прогона тестов и нагрузки
+
+    Запросы к API по эндпоинтам и статусам, время ответа, число запросов
+    в работе, время загрузки страниц в браузере и результаты тестов.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        self.api_requests = self.registry.counter(
+            "liner_api_requests", "Запросы к API", ("method", "endpoint", "status")
+        )
+        self.api_latency = self.registry.histogram(
+            "liner_api_request_duration_seconds", "Время ответа API", ("method", "endpoint")
+        )
+        self.api_in_flight = self.registry.gauge("liner_api_requests_in_flight", "Запросы к API в работе")
+        self.page_load = self.registry.histogram(
+            "liner_page_load_seconds", "Время загрузки страницы в браузере", ("page", "phase"), PAGE_LOAD_BUCKETS
+        )
+        self.tests = self.registry.counter("liner_tests", "Завершенные тесты", ("outcome",))
+
+    def request_started(self) -> None:
+        self.api_in_flight.inc()
+
+    def request_finished(self, method: str, endpoint: str, status: Union[int, str], seconds: float) -> None:
+        """Учет завершенного запроса, status="error" для запросов без ответа"""
+        self.api_in_flight.dec()
+        self.api_requests.inc(method=method, endpoint=endpoint, status=str(status))
+        self.api_latency.observe(seconds, method=method, endpoint=endpoint)
+
+    def observe_page_load(self, page: str, timings: Dict[str, float]) -> None:
+        """Учет фаз загрузки страницы (в секундах), например ttfb, dom_content_loaded, load"""
+        for phase, seconds in timings.items():
+            if seconds is not None and seconds >= 0:
+                self.page_load.observe(seconds, page=page, phase=phase)
+
+    def test_finished(self, outcome: str) -> None:
+        self.tests.inc(outcome=outcome)
+
+
+_active_metrics: Optional[RunMetrics] = None
+
+
+def active_metrics() -> Optional[RunMetrics]:
+    """Метрики, включенные для текущего процесса, или None"""
+    return _active_metrics
+
+
+def set_active_metrics(metrics: Optional[RunMetrics]) -> None:
+    global _active_metrics
+    _active_metrics = metrics
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter:
+    """Публикация метрик для внешнего сборщика во время прогона
+
+    port - HTTP эндпоинт /metrics на host (0 - свободный порт),
+    textfile - файл, перезаписываемый раз в interval секунд (атомарно,
+    для textfile-коллектора node_exporter). Можно включить оба варианта.
+    """
+
+    def __init__(self, registry: MetricsRegistry, port: Optional[int] = None, host: str = "127.0.0.1",
+                 textfile: Optional[Union[str, Path]] = None, interval: float = 5.0):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.textfile = Path(textfile) if textfile else None
+        self.interval = interval
+        self.logger = logging.getLogger(__name__)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._threads: List[threading.Thread] = []
+        self._stopped = threading.Event()
+
+    def __enter__(self) -> "MetricsExporter":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> Optional[str]:
+        if self._server is None:
+            return None
+        return f"http://{self.host}:{self._server.server_address[1]}/metrics"
+
+    def start(self) -> "MetricsExporter":
+        self._stopped.clear()
+        if self.port is not None:
+            self._server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+            self._server.daemon_threads = True
+            self._server.registry = self.registry
+            self._threads.append(threading.Thread(target=self._server.serve_forever, name="metrics-http",
+                                                  daemon=True))
+            self.logger.info(f"Метрики доступны по адресу {self.url}")
+        if self.textfile is not None:
+            self.textfile.parent.mkdir(parents=True, exist_ok=True)
+            self._threads.append(threading.Thread(target=self._write_loop, name="metrics-textfile", daemon=True))
+            self.logger.info(f"Метрики записываются в {self.textfile}")
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def write_textfile(self) -> None:
+        """Атомарная перезапись файла метрик"""
+        temporary = self.textfile.with_name(self.textfile.name + ".tmp")
+        temporary.write_text(self.registry.render(), encoding="utf-8")
+        os.replace(temporary, self.textfile)
+
+    def _write_loop(self) -> None:
+        while True:
+            try:
+                self.write_textfile()
+            except OSError as e:
+                self.logger.warning(f"Не удалось записать файл метрик: {str(e)}")
+            if self._stopped.wait(self.interval):
+                break
+
+    def stop(self) -> None:
+        """Остановка экспорта, файл метрик перезаписывается последний раз"""
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads.clear()
+        self._server = None
+        if self.textfile is not None:
+            self.write_textfile()
@@ -0,0 +1,217 @@
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import allure
+
+from utils.latency_histogram import LatencyHistogram
+from utils.metrics_exporter import MetricsExporter, MetricsRegistry
+from utils.workload import WorkloadEngine, load_scenario, validate_scenario
+
+
+def resolve_factory(path: str) -> Callable[..., Any]:
+    """Получение фабрики клиента по строке вида "module:attribute" """
+    module_name, _, attribute = path.partition(":")
+    if not attribute:
+        raise ValueError(f"Фабрика клиента должна быть указана как module:attribute, получено {path}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _worker_main(index: int, scenario: Dict[str, Any], client_factory: str, client_kwargs: Dict[str, Any],
+                 duration: Optional[float], virtual_users: Optional[int], snapshot_interval: float,
+                 results: "multiprocessing.Queue") -> None:
+    """Процесс-воркер: выполняет сценарий и периодически отправляет снимки гистограмм"""
+    try:
+        client = resolve_factory(client_factory)(**client_kwargs)
+        seed = scenario.get("seed")
+        engine = WorkloadEngine(client, scenario, seed=None if seed is None else seed + index)
+        runner = threading.Thread(target=engine.run, args=(duration, virtual_users), daemon=True)
+        started = time.perf_counter()
+        runner.start()
+        final = False
+        while not final:
+            runner.join(snapshot_interval)
+            # Признак фиксируется до снимка, чтобы последний снимок всегда уходил с final
+            final = not runner.is_alive()
+            results.put({"worker": index, "final": final,
+                         "elapsed": time.perf_counter() - started, **engine.snapshot()})
+    except Exception as e:
+        results.put({"worker": index, "final": True, "error": str(e)})
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Объединение последних снимков воркеров в одну сводку"""
+    total = LatencyHistogram()
+    operations: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        if "total" not in snapshot:
+            continue
+        total.add(LatencyHistogram.from_dict(snapshot["total"]))
+        for name, stats in snapshot["operations"].items():
+            merged = operations.setdefault(
+                name, {"count": 0, "errors": 0, "skipped": 0, "histogram": LatencyHistogram()}
+            )
+            for key in ("count", "errors", "skipped"):
+                merged[key] += stats[key]
+            merged["histogram"].add(LatencyHistogram.from_dict(stats["histogram"]))
+
+    count = sum(op["count"] for op in operations.values())
+    return {
+        "workers": len(snapshots),
+        "duration_s": elapsed,
+        "total": count,
+        "errors": sum(op["errors"] for op in operations.values()),
+        "rps": count / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": total.get_percentiles(),
+        "operations": {
+            name: {
+                "count": op["count"],
+                "errors": op["errors"],
+                "skipped": op["skipped"],
+                "latency_ms": op.pop("histogram").get_percentiles()
+            }
+            for name, op in operations.items()
+        }
+    }
+
+
+class MultiProcessLoadRunner:
+    """Запуск сценария нагрузки в нескольких процессах
+
+    Каждый процесс создает свой клиент через client_factory ("module:attribute",
+    например "utils.api_client:APIClient") и выполняет сценарий в потоках,
+    поэтому нагрузка не упирается в GIL одного интерпретатора. Воркеры раз
+    в snapshot_interval секунд присылают накопленные гистограммы, координатор
+    объединяет последние снимки в текущую и итоговую сводку.
+    """
+
+    def __init__(self, scenario: Dict[str, Any], client_factory: str, client_kwargs: Optional[Dict[str, Any]] = None,
+                 workers: int = 2, snapshot_interval: float = 1.0, start_method: str = "spawn"):
+        validate_scenario(scenario)
+        self.scenario = scenario
+        self.client_factory = client_factory
+        self.client_kwargs = dict(client_kwargs or {})
+        self.workers = max(1, workers)
+        self.snapshot_interval = snapshot_interval
+        self.logger = logging.getLogger(__name__)
+        self._context = multiprocessing.get_context(start_method)
+
+    def run(self, duration: Optional[float] = None, virtual_users: Optional[int] = None,
+            on_snapshot: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Запуск воркеров и сбор результатов
+
+        on_snapshot вызывается с объединенной сводкой при каждом новом снимке.
+        virtual_users задает число пользователей в каждом воркере.
+        """
+        results = self._context.Queue()
+        processes = [
+            self._context.Process(
+                target=_worker_main,
+                args=(index, self.scenario, self.client_factory, self.client_kwargs, duration, virtual_users,
+                      self.snapshot_interval, results),
+                name=f"load-worker-{index}",
+                daemon=True
+            )
+            for index in range(self.workers)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+
+        latest: Dict[int, Dict[str, Any]] = {}
+        finished = set()
+        errors: List[str] = []
+        while len(finished) < self.workers:
+            try:
+                snapshot = results.get(timeout=self.snapshot_interval)
+            except queue.Empty:
+                dead = {i for i, p in enumerate(processes) if not p.is_alive() and p.exitcode != 0}
+                for index in dead - finished:
+                    errors.append(f"Воркер {index} завершился с кодом {processes[index].exitcode}")
+                finished |= dead
+                continue
+            index = snapshot["worker"]
+            if "error" in snapshot:
+                errors.append(f"Воркер {index}: {snapshot['error']}")
+            else:
+                latest[index] = snapshot
+            if snapshot["final"]:
+                finished.add(index)
+            if on_snapshot is not None and latest:
+                on_snapshot(merge_snapshots(list(latest.values()), time.perf_counter() - started))
+
+        for process in processes:
+            process.join(timeout=5)
+        summary = merge_snapshots(list(latest.values()), time.perf_counter() - started)
+        summary["worker_errors"] = errors
+        summary["per_worker_rps"] = {
+            index: sum(op["count"] for op in snapshot["operations"].values()) / snapshot["elapsed"]
+            for index, snapshot in sorted(latest.items()) if snapshot["elapsed"] > 0
+        }
+        for error in errors:
+            self.logger.error(error)
+        return summary
+
+    @staticmethod
+    def attach_to_allure(summary: Dict[str, Any], name: str = "Многопроцессная нагрузка") -> None:
+        """Прикрепление итоговой сводки к отчету Allure"""
+        allure.attach(json.dumps(summary, ensure_ascii=False, indent=2), name, allure.attachment_type.JSON)
+
+
+def main() -> None:
+    """Запуск сценария нагрузки в нескольких процессах из командной строки"""
+    from utils.config_loader import ConfigLoader
+
+    parser = argparse.ArgumentParser(description="Многопроцессный запуск сценария нагрузки на API")
+    parser.add_argument("scenario", help="JSON файл сценария (см. config/scenarios)")
+    parser.add_argument("--env", default=None, help="Окружение (dev, sm, ask-yug)")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="Число процессов")
+    parser.add_argument("--duration", type=float, default=None, help="Длительность, сек")
+    parser.add_argument("--users", type=int, default=None, help="Пользователей в каждом процессе")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Порт эндпоинта /metrics (OpenMetrics)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    config_loader = ConfigLoader()
+    runner = MultiProcessLoadRunner(
+        load_scenario(args.scenario),
+        "utils.api_client:APIClient",
+        {"base_url": config_loader.get_api_url(args.env), "api_key": config_loader.get_api_key(args.env)},
+        workers=args.workers
+    )
+
+    # Воркеры - отдельные процессы, поэтому наружу отдается объединенная сводка
+    registry = MetricsRegistry()
+    requests_gauge = registry.gauge("liner_load_requests", "Выполнено операций", ("operation",))
+    errors_gauge = registry.gauge("liner_load_errors", "Операций с ошибкой", ("operation",))
+    latency_gauge = registry.gauge("liner_load_latency_seconds", "Перцентили времени ответа", ("quantile",))
+    rps_gauge = registry.gauge("liner_load_rps", "Текущая пропускная способность")
+    exporter = MetricsExporter(registry, port=args.metrics_port).start() if args.metrics_port is not None else None
+
+    def report(summary: Dict[str, Any]) -> None:
+        latency = summary["latency_ms"]
+        print(f"{summary['duration_s']:6.1f} сек: {summary['total']} запросов, {summary['rps']:.1f} запр/с, "
+              f"p99 {latency['p99']:.1f} мс, ошибок {summary['errors']}")
+        for name, op in summary["operations"].items():
+            requests_gauge.set(op["count"], operation=name)
+            errors_gauge.set(op["errors"], operation=name)
+        for quantile, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")):
+            latency_gauge.set(latency[key] / 1000, quantile=quantile)
+        rps_gauge.set(summary["rps"])
+
+    try:
+        summary = runner.run(duration=args.duration, virtual_users=args.users, on_snapshot=report)
+    finally:
+        if exporter is not None:
+            exporter.stop()
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import json
+import logging
+import math
+import sqlite3
+import statistics
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import allure
+
+
+def current_git_commit() -> Optional[str]:
+    """Хэш текущего коммита или None, если git недоступен"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def mann_whitney_u(current: Sequence[float], baseline: Sequence[float]) -> Dict[str, float]:
+    """Односторонний критерий Манна-Уитни: значения current больше baseline
+
+    Используется нормальное приближение с поправкой на совпадающие ранги
+    и на непрерывность. Возвращает U для current, p-value и дельту Клиффа
+    (от -1 до 1, больше нуля - current чаще больше baseline).
+    """
+    n1, n2 = len(current), len(baseline)
+    if n1 == 0 or n2 == 0:
+        raise ValueError("Для критерия нужны непустые выборки")
+    combined = sorted([(value, 0) for value in current] + [(value, 1) for value in baseline])
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    index = 0
+    while index < len(combined):
+        end = index
+        while end + 1 < len(combined) and combined[end + 1][0] == combined[index][0]:
+            end += 1
+        average_rank = (index + end) / 2 + 1
+        for position in range(index, end + 1):
+            ranks[position] = average_rank
+        tied = end - index + 1
+        tie_term += tied ** 3 - tied
+        index = end + 1
+
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u_current = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))) if n > 1 else 0.0
+    if variance <= 0:
+        p_value = 1.0
+    else:
+        z = (u_current - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+        p_value = 0.5 * math.erfc(z / math.sqrt(2))
+    return {"u": u_current, "p_value": p_value, "effect": 2 * u_current / (n1 * n2) - 1}
+
+
+class PerfBaselineStore:
+    """Хранилище распределений времени ответа по эндпоинтам, окружениям и коммитам
+
+    Каждый прогон сохраняется отдельной записью с выборкой значений
+    (в миллисекундах). Базовая линия - объединение выборок последних
+    window прогонов без регрессии.
+    """
+
+    def __init__(self, path: Union[str, Path], max_samples: int = 2000):
+        self.path = str(path)
+        self.max_samples = max_samples
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS perf_runs (id INTEGER PRIMARY KEY AUTOINCREMENT, endpoint TEXT NOT NULL, "
+            "environment TEXT NOT NULL, git_commit TEXT, created_at REAL NOT NULL, samples TEXT NOT NULL, "
+            "median REAL, p95 REAL, regressed INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS perf_runs_lookup ON perf_runs (endpoint, environment, created_at)"
+        )
+        self._db.commit()
+
+    def record(self, endpoint: str, environment: str, samples: Sequence[float], git_commit: Optional[str] = None,
+               regressed: bool = False) -> None:
+        """Сохранение выборки прогона"""
+        values = list(samples)
+        if len(values) > self.max_samples:
+            step = len(values) / self.max_samples
+            values = [values[int(i * step)] for i in range(self.max_samples)]
+        ordered = sorted(values)
+        p95 = ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)] if ordered else None
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO perf_runs (endpoint, environment, git_commit, created_at, samples, median, p95, "
+                "regressed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (endpoint, environment, git_commit, time.time(), json.dumps(values),
+                 statistics.median(values) if values else None, p95, int(regressed))
+            )
+            self._db.commit()
+
+    def baseline(self, endpoint: str, environment: str, window: int = 10,
+                 exclude_commit: Optional[str] = None) -> List[List[float]]:
+        """Выборки последних window прогонов без регрессии"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT samples FROM perf_runs WHERE endpoint = ? AND environment = ? AND regressed = 0 "
+                "AND (? IS NULL OR git_commit IS NULL OR git_commit != ?) ORDER BY created_at DESC, id DESC "
+                "LIMIT ?",
+                (endpoint, environment, exclude_commit, exclude_commit, window)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def history(self, endpoint: str, environment: str) -> List[Dict[str, Any]]:
+        """Медианы и p95 всех прогонов эндпоинта"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT git_commit, created_at, median, p95, regressed FROM perf_runs "
+                "WHERE endpoint = ? AND environment = ? ORDER BY created_at, id",
+                (endpoint, environment)
+            ).fetchall()
+        return [dict(zip(("git_commit", "created_at", "median", "p95", "regressed"), row)) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def check_regression(current: Sequence[float], baseline_runs: Sequence[Sequence[float]], alpha: float = 0.01,
+                     min_effect: float = 0.33, min_runs: int = 3, min_samples: int = 5) -> Dict[str, Any]:
+    """Сравнение выборки с базовой линией
+
+    Регрессия фиксируется, только если распределение значимо сдвинуто
+    вверх (p < alpha) и сдвиг существенный (дельта Клиффа >= min_effect).
+    При недостаточной истории проверка пропускается.
+    """
+    baseline = [value for run in baseline_runs for value in run]
+    result: Dict[str, Any] = {
+        "regressed": False,
+        "baseline_runs": len(baseline_runs),
+        "current_median": statistics.median(current) if current else None,
+        "baseline_median": statistics.median(baseline) if baseline else None,
+        "p_value": None,
+        "effect": None
+    }
+    if len(baseline_runs) < min_runs or len(current) < min_samples or len(baseline) < min_samples:
+        result["reason"] = "недостаточно истории для сравнения"
+        return result
+    test = mann_whitney_u(current, baseline)
+    result.update(p_value=test["p_value"], effect=test["effect"])
+    result["regressed"] = test["p_value"] < alpha and test["effect"] >= min_effect
+    result["reason"] = "значимое ухудшение" if result["regressed"] else "без значимых изменений"
+    return result
+
+
+class PerfGate:
+    """Проверка выборки времени ответа по истории прогонов для pytest
+
+    mode="enforce" - сравнение и сохранение, "record" - только сохранение,
+    "off" - ничего не делать. Прогоны того же git_commit в базовую линию
+    не входят, иначе перезапуски одного коммита сравнивались бы сами с собой.
+    """
+
+    def __init__(self, store: PerfBaselineStore, environment: str, mode: str = "enforce",
+                 git_commit: Optional[str] = None, **thresholds):
+        self.store = store
+        self.environment = environment
+        self.mode = mode
+        self.git_commit = git_commit
+        self.thresholds = thresholds
+        self.logger = logging.getLogger(__name__)
+
+    def check(self, endpoint: str, samples_ms: Sequence[float], window: int = 10) -> Dict[str, Any]:
+        """Сравнение с базовой линией и сохранение прогона"""
+        if self.mode == "off":
+            return {"regressed": False, "reason": "проверка отключена"}
+        if self.mode == "enforce":
+            result = check_regression(
+                samples_ms, self.store.baseline(endpoint, self.environment, window, exclude_commit=self.git_commit),
+                **self.thresholds
+            )
+        else:
+            result = {"regressed": False, "reason": "только запись"}
+        self.store.record(endpoint, self.environment, samples_ms, self.git_commit, regressed=result["regressed"])
+        self.logger.info(f"Базовая линия {endpoint} ({self.environment}): {result['reason']}")
+        self.attach_to_allure(endpoint, result)
+        return result
+
+    def attach_to_allure(self, endpoint: str, result: Dict[str, Any]) -> None:
+        """Прикрепление результата сравнения и истории медиан к отчету Allure"""
+        lines = [f"Эндпоинт: {endpoint}, окружение: {self.environment}, коммит: {self.git_commit or '-'}",
+                 f"Результат: {result['reason']}"]
+        if result.get("p_value") is not None:
+            lines.append(f"Медиана: {result['current_median']:.1f} мс (база {result['baseline_median']:.1f} мс), "
+                         f"p-value {result['p_value']:.4f}, дельта Клиффа {result['effect']:.2f}")
+        lines += ["", f"{'коммит':<12}{'медиана, мс':>13}{'p95, мс':>10}{'регрессия':>11}"]
+        for run in self.store.history(endpoint, self.environment)[-20:]:
+            lines.append(f"{run['git_commit'] or '-':<12}{run['median'] or 0:>13.1f}{run['p95'] or 0:>10.1f}"
+                         f"{'да' if run['regressed'] else '':>11}")
+        allure.attach("\n".join(lines), f"Базовая линия {endpoint}", allure.attachment_type.TEXT)
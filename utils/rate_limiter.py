@@ -0,0 +1,171 @@
+import fnmatch
+import logging
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlparse
+
+from utils.request_timing import normalize_endpoint
+
+# Заголовки с оставшейся квотой: X-RateLimit-* и стандартные RateLimit-*
+REMAINING_HEADERS = ("X-RateLimit-Remaining", "RateLimit-Remaining")
+RESET_HEADERS = ("X-RateLimit-Reset", "RateLimit-Reset")
+
+
+def _header_float(headers: Mapping[str, str], names) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+class AdaptiveTokenBucket:
+    """Token bucket с подстройкой скорости по ответам сервера (AIMD)
+
+    Каждый успешный ответ (2xx и 3xx) увеличивает скорость примерно на
+    increase запросов в секунду за каждые rate ответов, остальные ответы
+    ее не меняют. Ответ 429 умножает скорость на decrease_factor
+    и приостанавливает выдачу токенов на Retry-After секунд.
+    Если сервер сообщает остаток квоты и время ее сброса, скорость не
+    поднимается выше remaining / reset.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: Optional[float] = None, min_rate: float = 0.5,
+                 max_rate: Optional[float] = None, increase: float = 1.0, decrease_factor: float = 0.5,
+                 name: str = ""):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate * 10
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._throttle_wait = 0.0
+        self._throttled = 0
+        self._requests = 0
+        self._rate_limited = 0
+
+    def reserve(self) -> float:
+        """Резервирование токена, возвращает время ожидания в секундах
+
+        Токен списывается сразу, поэтому вызывающий код обязан выждать
+        возвращенную задержку перед отправкой запроса.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = max(0.0, self._paused_until - now, -self._tokens / self.rate)
+            self._requests += 1
+            if delay > 0:
+                self._throttled += 1
+                self._throttle_wait += delay
+            return delay
+
+    def acquire(self) -> float:
+        """Блокирующее получение токена, возвращает время ожидания"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def record_response(self, status_code: int, headers: Mapping[str, str],
+                        retry_after: Optional[float] = None) -> None:
+        """Подстройка скорости по ответу сервера"""
+        remaining = _header_float(headers, REMAINING_HEADERS)
+        reset = _header_float(headers, RESET_HEADERS)
+        if reset is not None and reset > 1e9:
+            # Некоторые API передают момент сброса как unix timestamp
+            reset -= time.time()
+        with self._lock:
+            if status_code == 429:
+                self._rate_limited += 1
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self._tokens = min(self._tokens, 0.0)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                self.logger.warning(f"Лимит запросов {self.name}: скорость снижена до {self.rate:.2f} запр/с")
+            elif 200 <= status_code < 400:
+                self.rate = min(self.max_rate, self.rate + self.increase / max(self.rate, 1.0))
+            if remaining is not None and reset is not None and reset > 0:
+                self.rate = max(self.min_rate, min(self.rate, remaining / reset))
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Текущая скорость и суммарное время ожидания из-за ограничения"""
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "requests": self._requests,
+                "throttled": self._throttled,
+                "throttle_wait_s": self._throttle_wait,
+                "rate_limited": self._rate_limited
+            }
+
+
+class AdaptiveRateLimiter:
+    """Ограничитель скорости с отдельными бюджетами для эндпоинтов
+
+    Бюджеты задаются шаблонами путей (fnmatch), например "/v1/lead/*".
+    Запросы, не попавшие ни в один шаблон, используют бюджет по умолчанию.
+    """
+
+    def __init__(self, default: Optional[Dict[str, Any]] = None,
+                 endpoints: Optional[Dict[str, Dict[str, Any]]] = None):
+        self._default = dict(default or {})
+        self._patterns = dict(endpoints or {})
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, AdaptiveTokenBucket] = {}
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> Optional["AdaptiveRateLimiter"]:
+        """Создание ограничителя из секции rate_limits конфигурации, None если ее нет"""
+        limits = config.get("rate_limits")
+        if not limits or not limits.get("enabled", True):
+            return None
+        return cls(limits.get("default"), limits.get("endpoints"))
+
+    def _budget_key(self, url: str) -> str:
+        endpoint = normalize_endpoint(urlparse(url).path)
+        for pattern in self._patterns:
+            if fnmatch.fnmatch(endpoint, pattern):
+                return pattern
+        return "default"
+
+    def get_bucket(self, url: str) -> AdaptiveTokenBucket:
+        """Бюджет, к которому относится URL"""
+        key = self._budget_key(url)
+        with self._lock:
+            if key not in self._buckets:
+                settings = self._patterns.get(key, self._default)
+                self._buckets[key] = AdaptiveTokenBucket(name=key, **settings)
+            return self._buckets[key]
+
+    def reserve(self, url: str) -> float:
+        """Резервирование токена для URL, возвращает время ожидания"""
+        return self.get_bucket(url).reserve()
+
+    def acquire(self, url: str) -> float:
+        """Блокирующее получение токена для URL"""
+        return self.get_bucket(url).acquire()
+
+    def record_response(self, url: str, status_code: int, headers: Mapping[str, str],
+                        retry_after: Optional[float] = None) -> None:
+        """Передача ответа сервера в бюджет URL"""
+        self.get_bucket(url).record_response(status_code, headers, retry_after)
+
+    def get_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Метрики всех бюджетов"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {key: bucket.get_metrics() for key, bucket in buckets.items()}
@@ -0,0 +1,216 @@
+import math
+import re
+import socket
+import threading
+import time
+from collections import defaultdict
+from socket import timeout as SocketTimeout
+from typing import Any, Dict, List, Optional
+
+import allure
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util import connection
+
+from utils.http_pool import PooledHTTPAdapter
+
+PHASES = ("dns", "connect", "tls", "ttfb", "download", "total")
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+_local = threading.local()
+
+
+def _current_phases() -> Optional[Dict[str, float]]:
+    """Фазы запроса, выполняемого в текущем потоке"""
+    return getattr(_local, "phases", None)
+
+
+def _setup_time(phases: Dict[str, float]) -> float:
+    return phases["dns"] + phases["connect"] + phases["tls"]
+
+
+def normalize_endpoint(path: str) -> str:
+    """Приведение пути к шаблону эндпоинта: числовые идентификаторы заменяются на {id}"""
+    path = path.split("?", 1)[0]
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path) or "/"
+
+
+class _PhaseTimingMixin:
+    """Замер DNS, TCP и TLS фаз и времени до первого байта для соединения urllib3"""
+
+    def _new_conn(self) -> socket.socket:
+        phases = _current_phases()
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, connection.allowed_gai_family(),
+                                           socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        resolved = time.perf_counter()
+
+        # Подключаемся к уже разрешенным адресам, чтобы DNS не попал в фазу connect
+        error: Optional[Exception] = None
+        for _, _, _, _, sockaddr in addresses:
+            try:
+                sock = connection.create_connection(
+                    sockaddr[:2],
+                    self.timeout,
+                    source_address=self.source_address,
+                    socket_options=self.socket_options,
+                )
+                break
+            except SocketTimeout as e:
+                error = ConnectTimeoutError(
+                    self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+                )
+                error.__cause__ = e
+            except OSError as e:
+                error = NewConnectionError(self, f"Failed to establish a new connection: {e}")
+                error.__cause__ = e
+        else:
+            raise error or NewConnectionError(self, f"No addresses resolved for {self.host}")
+
+        if phases is not None:
+            phases["dns"] += (resolved - started) * 1000
+            phases["connect"] += (time.perf_counter() - resolved) * 1000
+        return sock
+
+    def request(self, *args, **kwargs):
+        phases = _current_phases()
+        if phases is not None:
+            phases["_request_started"] = time.perf_counter()
+            phases["_setup_before"] = _setup_time(phases)
+        return super().request(*args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        phases = _current_phases()
+        if phases is not None and "_request_started" in phases:
+            elapsed = (time.perf_counter() - phases["_request_started"]) * 1000
+            # Для HTTP соединение открывается внутри request(), вычитаем время установки
+            phases["ttfb"] += max(0.0, elapsed - (_setup_time(phases) - phases["_setup_before"]))
+        return response
+
+
+class TimingHTTPConnection(_PhaseTimingMixin, HTTPConnection):
+    """HTTP соединение с замером фаз запроса"""
+
+
+class TimingHTTPSConnection(_PhaseTimingMixin, HTTPSConnection):
+    """HTTPS соединение с замером фаз запроса, включая TLS рукопожатие"""
+
+    def connect(self) -> None:
+        phases = _current_phases()
+        setup_before = _setup_time(phases) if phases is not None else 0.0
+        started = time.perf_counter()
+        super().connect()
+        if phases is not None:
+            elapsed = (time.perf_counter() - started) * 1000
+            phases["tls"] += max(0.0, elapsed - (_setup_time(phases) - setup_before))
+
+
+class TimingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimingHTTPConnection
+
+
+class TimingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimingHTTPSConnection
+
+
+class TimingHTTPAdapter(PooledHTTPAdapter):
+    """Адаптер пула соединений, записывающий фазы запроса в response.phase_timings"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimingHTTPConnectionPool,
+            "https": TimingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        _local.phases = {"dns": 0.0, "connect": 0.0, "tls": 0.0, "ttfb": 0.0}
+        try:
+            response = super().send(request, **kwargs)
+        finally:
+            phases = _local.phases
+            _local.phases = None
+        response.phase_timings = {key: value for key, value in phases.items() if not key.startswith("_")}
+        return response
+
+
+class PhaseTimingRecorder:
+    """Сбор фаз запросов по эндпоинтам и построение гистограмм для Allure
+
+    Экземпляр передается в APIClient как on_request_timing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        key = f"{event['method']} {event['endpoint']}"
+        with self._lock:
+            for phase in PHASES:
+                self._samples[key][phase].append(event[phase])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(phases["total"]) for phases in self._samples.values())
+
+    @staticmethod
+    def _percentile(values: List[float], percent: float) -> float:
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, max(0, math.ceil(percent / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def get_summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Медиана, p95 и максимум каждой фазы по эндпоинтам (мс)"""
+        with self._lock:
+            return {
+                endpoint: {
+                    phase: {
+                        "p50": self._percentile(values, 50),
+                        "p95": self._percentile(values, 95),
+                        "max": max(values)
+                    }
+                    for phase, values in phases.items() if values
+                }
+                for endpoint, phases in self._samples.items()
+            }
+
+    def format_histograms(self) -> str:
+        """Текстовые гистограммы фаз по эндпоинтам"""
+        lines = []
+        with self._lock:
+            for endpoint, phases in sorted(self._samples.items()):
+                lines.append(f"{endpoint} (запросов: {len(phases['total'])})")
+                header = "  фаза      " + "".join(f"{'<=' + str(b):>8}" for b in HISTOGRAM_BUCKETS_MS) + f"{'>':>8}"
+                lines.append(header)
+                for phase in PHASES:
+                    counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+                    for value in phases[phase]:
+                        index = next((i for i, b in enumerate(HISTOGRAM_BUCKETS_MS) if value <= b),
+                                     len(HISTOGRAM_BUCKETS_MS))
+                        counts[index] += 1
+                    lines.append(f"  {phase:<10}" + "".join(f"{c:>8}" for c in counts))
+                lines.append("")
+        return "\n".join(lines)
+
+    def attach_to_allure(self, name: str = "Фазы запросов API") -> None:
+        """Прикрепление гистограмм фаз к отчету Allure"""
+        if len(self) == 0:
+            return
+        summary_lines = []
+        for endpoint, phases in sorted(self.get_summary().items()):
+            summary_lines.append(endpoint)
+            for phase, stats in phases.items():
+                summary_lines.append(
+                    f"  {phase:<10} p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms max={stats['max']:.2f}ms"
+                )
+        allure.attach(
+            "\n".join(summary_lines) + "\n\nГистограммы (мс):\n" + self.format_histograms(),
+            name,
+            allure.attachment_type.TEXT
+        )
@@ -0,0 +1,156 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Iterable, Mapping, Optional
+
+import requests
+
+
+class DeadlineExceededError(requests.exceptions.Timeout):
+    """Исчерпан общий лимит времени на логическую операцию"""
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Запрос отклонен без обращения к сети, так как окружение считается недоступным"""
+
+
+class RetryPolicy:
+    """Политика повторных попыток с экспоненциальной задержкой и общим дедлайном
+
+    Повторяются только идемпотентные методы. POST повторяется, только если
+    в заголовках запроса передан ключ идемпотентности.
+    """
+
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 jitter: bool = True, deadline: Optional[float] = 30.0,
+                 attempt_timeout: Optional[float] = 10.0,
+                 retry_statuses: Iterable[int] = (429, 502, 503, 504),
+                 idempotent_methods: Iterable[str] = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE"),
+                 idempotency_header: str = "Idempotency-Key"):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_methods = frozenset(m.upper() for m in idempotent_methods)
+        self.idempotency_header = idempotency_header.lower()
+
+    def is_retryable_request(self, method: str, headers: Mapping[str, str]) -> bool:
+        """Можно ли безопасно повторить запрос"""
+        if method.upper() in self.idempotent_methods:
+            return True
+        return any(key.lower() == self.idempotency_header for key in headers)
+
+    def get_backoff(self, attempt: int) -> float:
+        """Задержка перед повторной попыткой (full jitter)"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    @staticmethod
+    def get_retry_after(response: requests.Response) -> Optional[float]:
+        """Задержка из заголовка Retry-After, если сервер ее указал"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+
+class CircuitBreaker:
+    """Предохранитель, прекращающий запросы к окружению после серии отказов
+
+    После failure_threshold отказов подряд предохранитель размыкается и
+    в течение recovery_timeout секунд все запросы завершаются ошибкой
+    CircuitOpenError без обращения к сети. Затем пропускается один пробный
+    запрос: успех замыкает цепь, отказ снова размыкает ее.
+    failure_threshold <= 0 отключает предохранитель.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    _registry: Dict[str, "CircuitBreaker"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, name: str = ""):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @classmethod
+    def for_host(cls, host: str, **kwargs) -> "CircuitBreaker":
+        """Общий предохранитель для всех клиентов одного хоста"""
+        with cls._registry_lock:
+            if host not in cls._registry:
+                cls._registry[host] = cls(name=host, **kwargs)
+            return cls._registry[host]
+
+    @classmethod
+    def reset_all(cls) -> None:
+        """Сброс общих предохранителей"""
+        with cls._registry_lock:
+            cls._registry.clear()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_request(self) -> None:
+        """Проверка, можно ли выполнять запрос"""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    raise CircuitOpenError(f"Окружение {self.name} недоступно, запрос отклонен предохранителем")
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                raise CircuitOpenError(f"Окружение {self.name} проверяется пробным запросом")
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        """Успешный ответ замыкает цепь"""
+        with self._lock:
+            if self._state != self.CLOSED:
+                self.logger.info(f"Предохранитель {self.name} замкнут, окружение снова доступно")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Освобождение пробного запроса, завершившегося не сетевой ошибкой"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Учет отказа и размыкание цепи при превышении порога"""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.logger.error(
+                        f"Предохранитель {self.name} разомкнут после {self._failures} отказов подряд"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
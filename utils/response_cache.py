@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class ResponseCache:
+    """Кэш ответов GET запросов с ограничением по времени жизни и LRU вытеснением"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0, strict: bool = False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # В строгом режиме кэш не используется и все запросы идут на сервер
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Any] = None) -> Tuple[str, Hashable]:
+        """Ключ кэша из URL и параметров запроса"""
+        if params is None:
+            return url, ()
+        items = params.items() if isinstance(params, dict) else params
+        return url, tuple(sorted((str(k), str(v)) for k, v in items))
+
+    def get(self, key: Tuple[str, Hashable]) -> Optional[Any]:
+        """Получение значения из кэша, None при промахе или устаревшей записи"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._misses += 1
+                self._evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Tuple[str, Hashable], value: Any) -> None:
+        """Сохранение значения с вытеснением самой давно использованной записи"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, url: str) -> int:
+        """Удаление всех записей для URL независимо от параметров запроса"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == url]
+            for key in keys:
+                del self._entries[key]
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        """Очистка кэша"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Статистика попаданий, промахов и вытеснений"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "size": len(self._entries)
+            }
@@ -0,0 +1,62 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """Выполняющийся запрос, результат которого ждут другие потоки"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых запросов в один
+
+    Первый поток с данным ключом выполняет запрос, остальные потоки,
+    пришедшие до его завершения, ждут и получают тот же результат или
+    то же исключение. saved - сколько запросов не было отправлено.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._executed = 0
+        self._saved = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Выполнение func или ожидание уже выполняющегося вызова с тем же ключом"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._saved += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Число выполненных и сэкономленных запросов"""
+        with self._lock:
+            return {"executed": self._executed, "saved": self._saved, "in_flight": len(self._calls)}
@@ -0,0 +1,103 @@
+import asyncio
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from aiohttp import web
+
+
+class BackgroundAppServer:
+    """Приложение aiohttp в фоновом потоке с собственным циклом событий
+
+    Основа локальных замен внешних сервисов: наследник строит приложение
+    в make_app, а start/stop запускают и останавливают его, поэтому
+    сервер доступен и синхронным, и асинхронным клиентам. Состояние
+    наследника меняется только в потоке сервера; из других потоков
+    к нему обращаются через call_in_loop.
+    """
+
+    description = "Локальный сервер"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, backlog: int = 4096):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.logger = logging.getLogger(self.__class__.__module__)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._startup_error: Optional[BaseException] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def make_app(self) -> web.Application:
+        """Приложение aiohttp с маршрутами сервиса"""
+        raise NotImplementedError
+
+    def call_in_loop(self, func: Callable[..., Any], *args, timeout: float = 10.0) -> Any:
+        """Выполнение функции или корутины в потоке сервера с возвратом ее результата"""
+        async def call():
+            result = func(*args)
+            return await result if inspect.isawaitable(result) else result
+
+        if self._loop is None or self._thread is None:
+            return asyncio.run(call())
+
+        return asyncio.run_coroutine_threadsafe(call(), self._loop).result(timeout)
+
+    def start(self, timeout: float = 10.0) -> "BackgroundAppServer":
+        """Запуск сервера в фоновом потоке"""
+        self._ready.clear()
+        self._startup_error = None
+        self._thread = threading.Thread(target=self._serve, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"{self.description} не запустился за {timeout} сек")
+        if self._startup_error is not None:
+            self._thread = None
+            raise self._startup_error
+        self.logger.info(f"{self.description} запущен на {self.url}")
+        return self
+
+    def _serve(self) -> None:
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(self.make_app(), access_log=None)
+        try:
+            loop.run_until_complete(runner.setup())
+            site = web.TCPSite(runner, self.host, self.port, backlog=self.backlog)
+            loop.run_until_complete(site.start())
+            self.port = runner.addresses[0][1]
+        except BaseException as e:
+            self._startup_error = e
+            self._ready.set()
+            loop.close()
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(runner.cleanup())
+            loop.close()
+
+    def stop(self) -> None:
+        """Остановка сервера и закрытие соединений"""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._thread = None
+        self._loop = None
+        self.logger.info(f"{self.description} остановлен, статистика: {self.get_stats()}")
+
+    def get_stats(self) -> Any:
+        return {}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
@@ -0,0 +1,352 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from utils.stub_server import BackgroundAppServer
+from utils.voximplant_simulator import VoxAPIError
+
+# Статусы оператора по UF_UIS_ID, как их передает TelephonyAPIClient
+EMPLOYEE_STATUSES = {1: "available", 2: "busy", 3: "break", 4: "offline", 5: "post_call"}
+STATUS_IDS = {name: status_id for status_id, name in EMPLOYEE_STATUSES.items()}
+# Статус "в разговоре" выставляет только система по вебхуку leg_is_connected
+SYSTEM_STATUSES = ("busy",)
+# ACD статус Voximplant, который синхронизируется при смене статуса в Лайнере
+ACD_STATUSES = {"available": "READY", "break": "DND", "offline": "OFFLINE", "post_call": "AFTER_SERVICE"}
+CALLBACK_METHODS = {
+    "call_record": "rabbitSaveCallRecord",
+    "leg_is_connected": "legIsConnected",
+    "leg_is_disconnected": "legIsDisconnected",
+    "finish_call": "finishCallHook",
+}
+
+
+def _response(message: str, success: bool = False, http_status: int = 200, **data) -> web.Response:
+    """Ответ в формате IO::jsonDeadResponse"""
+    return web.json_response({"success": success, "message": message, **data}, status=http_status)
+
+
+class VatsServer(BackgroundAppServer):
+    """Локальная замена контроллера Vats (/api/?controller=Vats&method=...)
+
+    Обслуживает changeEmployeeStatusAction, getEmployeeStatus,
+    getOnlineReadyEmployees, startPredictiveCall и getDialerQueue.
+    Статусы операторов меняются по правилам Vats.php: в разговоре (busy)
+    оператор оказывается только по вебхуку leg_is_connected и до конца
+    звонка сменить статус нельзя, после finish_call он переходит
+    в постобработку и через post_call_time возвращается в available.
+    Каждая смена статуса синхронизируется с ACD статусом Voximplant.
+
+    При заданном voximplant_url (например, VoximplantSimulator) звонок
+    запускается через StartScenarios, а callback_urls указывают обратно
+    на этот сервер, поэтому лид проходит очередь диалера с настоящими
+    HTTP запросами и вебхуками. Без voximplant_url лиды только ставятся
+    в очередь.
+    """
+
+    description = "Сервер Vats"
+
+    def __init__(self, operators: Iterable[Dict[str, Any]] = (), voximplant_url: Optional[str] = None,
+                 account_id: str = "liner", api_key: str = "liner", application_name: str = "liner",
+                 predictive_rule_id: int = 1, post_call_time: float = 5.0, max_queue: int = 10000,
+                 host: str = "127.0.0.1", port: int = 0, backlog: int = 4096):
+        super().__init__(host, port, backlog)
+        self.voximplant_url = voximplant_url.rstrip("/") if voximplant_url else None
+        self.account_id = account_id
+        self.api_key = api_key
+        self.application_name = application_name
+        self.predictive_rule_id = predictive_rule_id
+        self.post_call_time = post_call_time
+        self.max_queue = max_queue
+        self.operators: Dict[str, Dict[str, Any]] = {}
+        self.queue: Dict[str, Dict[str, Any]] = {}
+        self.history: List[Dict[str, Any]] = []
+        self._local_sessions = itertools.count(1)
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._stats = {"requests": {}, "status_changes": 0, "rejected_changes": 0, "calls_started": 0,
+                       "calls_connected": 0, "calls_finished": 0, "voximplant_errors": 0, "max_queue": 0}
+        self._methods = {
+            "changeEmployeeStatusAction": self._change_status_action,
+            "getEmployeeStatus": self._get_status,
+            "getOnlineReadyEmployees": self._online_ready,
+            "startPredictiveCall": self._start_predictive_call,
+            "getDialerQueue": self._get_queue,
+            "legIsConnected": self._leg_connected,
+            "legIsDisconnected": self._leg_disconnected,
+            "finishCallHook": self._finish_call,
+            "rabbitSaveCallRecord": self._save_record,
+        }
+        for operator in operators:
+            self._register(operator["id"], operator.get("vox_user_name", operator["id"]))
+
+    def make_app(self) -> web.Application:
+        """Приложение aiohttp с точкой входа API Лайнера"""
+        app = web.Application()
+        app.router.add_route("*", "/api/", self._dispatch)
+        app.router.add_route("*", "/api", self._dispatch)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self._http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        if self.voximplant_url:
+            for operator in self.operators.values():
+                await self._vox_add_user(operator)
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        await self._http.close()
+
+    async def _dispatch(self, request: web.Request) -> web.Response:
+        if request.query.get("controller") != "Vats":
+            return _response("Unknown controller", http_status=404)
+        name = request.query.get("method", "")
+        handler = self._methods.get(name)
+        if handler is None:
+            return _response(f"Unknown method {name}", http_status=404)
+        requests = self._stats["requests"]
+        requests[name] = requests.get(name, 0) + 1
+        return await handler(request)
+
+    @staticmethod
+    async def _params(request: web.Request) -> Dict[str, Any]:
+        params: Dict[str, Any] = dict(request.query)
+        if request.method == "POST" and request.can_read_body:
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+        return params
+
+    # Операторы
+
+    def _register(self, operator_id: str, vox_user_name: str) -> Dict[str, Any]:
+        operator = {"id": operator_id, "vox_user_name": vox_user_name, "status": "offline",
+                    "call_session_id": None, "changed_at": time.time()}
+        self.operators[operator_id] = operator
+        return operator
+
+    def _public(self, operator: Dict[str, Any]) -> Dict[str, Any]:
+        return {"operator_id": operator["id"], "status": operator["status"],
+                "status_id": STATUS_IDS[operator["status"]], "call_session_id": operator["call_session_id"],
+                "vox_user_name": operator["vox_user_name"]}
+
+    async def _set_status(self, operator: Dict[str, Any], status: str) -> None:
+        operator.update(status=status, changed_at=time.time())
+        if status != "busy":
+            operator["call_session_id"] = None
+        self._stats["status_changes"] += 1
+        if status in ACD_STATUSES:
+            await self._vox_sync_acd(operator)
+        if status == "post_call":
+            asyncio.get_running_loop().call_later(self.post_call_time, self._end_post_call, operator,
+                                                  operator["changed_at"])
+
+    def _end_post_call(self, operator: Dict[str, Any], entered_at: float) -> None:
+        # Постобработка завершается, только если оператор не сменил статус сам
+        if operator["status"] == "post_call" and operator["changed_at"] == entered_at:
+            asyncio.get_running_loop().create_task(self._set_status(operator, "available"))
+
+    async def _change_status_action(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        try:
+            status_id = int(params.get("status_id") or 0)
+        except ValueError:
+            status_id = 0
+        if not status_id or not params.get("operator_id"):
+            return _response("Required parameters not passed", http_status=400)
+        status = EMPLOYEE_STATUSES.get(status_id)
+        if status is None or status in SYSTEM_STATUSES:
+            self._stats["rejected_changes"] += 1
+            return _response(f"Status {status_id} can not be set manually", http_status=400)
+        operator = self.operators.get(params["operator_id"])
+        if operator is None:
+            return _response("Operator not found", http_status=404)
+        if operator["status"] == "busy":
+            self._stats["rejected_changes"] += 1
+            return _response("Operator is on a call", http_status=409, **self._public(operator))
+        if operator["status"] != status:
+            await self._set_status(operator, status)
+        return _response("Status changed successfully", True, **self._public(operator))
+
+    async def _get_status(self, request: web.Request) -> web.Response:
+        operator = self.operators.get(request.query.get("operator_id", ""))
+        if operator is None:
+            return _response("Operator not found", http_status=404)
+        return web.json_response(self._public(operator))
+
+    async def _online_ready(self, request: web.Request) -> web.Response:
+        ready = sorted((operator for operator in self.operators.values() if operator["status"] == "available"),
+                       key=lambda operator: operator["changed_at"])
+        return web.json_response([{"id": operator["id"], "status": operator["status"],
+                                   "vox_user_name": operator["vox_user_name"]} for operator in ready])
+
+    # Очередь диалера
+
+    async def _start_predictive_call(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        try:
+            lead = json.loads(params.get("lead_data") or "null")
+            phone = json.loads(params.get("phone_data") or "null")
+        except (TypeError, ValueError):
+            return _response("Invalid lead_data or phone_data", http_status=400)
+        if not isinstance(lead, dict) or not lead.get("id") or not lead.get("phone") or not isinstance(phone, dict):
+            return _response("Required parameters not passed", http_status=400)
+        lead_id = str(lead["id"])
+        if lead_id in self.queue:
+            return _response("Lead is already in the dialer queue", http_status=409, **self.queue[lead_id])
+        if len(self.queue) >= self.max_queue:
+            return _response("Dialer queue is full", http_status=503)
+
+        item = {"lead_id": lead["id"], "phone": lead["phone"], "status": "queued", "call_session_id": None,
+                "operator_id": None, "queued_at": time.time()}
+        if self.voximplant_url:
+            try:
+                started = await self._vox("StartScenarios", application_name=self.application_name,
+                                          rule_id=self.predictive_rule_id,
+                                          script_custom_data=json.dumps(self._custom_data(lead, phone)))
+            except (aiohttp.ClientError, asyncio.TimeoutError, VoxAPIError) as e:
+                return _response(f"Voximplant error: {e}", http_status=502)
+            item.update(status="dialing", call_session_id=started["call_session_history_id"])
+        else:
+            item["call_session_id"] = next(self._local_sessions)
+        self.queue[lead_id] = item
+        self._stats["calls_started"] += 1
+        self._stats["max_queue"] = max(self._stats["max_queue"], len(self.queue))
+        return _response("Call started", True, call_session_id=item["call_session_id"], lead_id=lead["id"])
+
+    def _custom_data(self, lead: Dict[str, Any], phone: Dict[str, Any]) -> Dict[str, Any]:
+        base = f"{self.url}/api/?controller=Vats&method="
+        return {
+            "callback_urls": {name: base + method for name, method in CALLBACK_METHODS.items()},
+            "lead_phone": lead["phone"],
+            "sip_endpoint": {"type": phone.get("connection_type"), "params": phone.get("params", {})},
+            "lead_id": lead["id"],
+            "display_name": f"Lead #{lead['id']}",
+            "count": 1
+        }
+
+    async def _get_queue(self, request: web.Request) -> web.Response:
+        items = sorted(self.queue.values(), key=lambda item: item["queued_at"])
+        return web.json_response({"success": True, "queue": items, "total": len(items)})
+
+    def _queue_item(self, session_id: Any) -> Optional[Dict[str, Any]]:
+        return next((item for item in self.queue.values() if str(item["call_session_id"]) == str(session_id)), None)
+
+    def _operator_by_vox_name(self, vox_user_name: str) -> Optional[Dict[str, Any]]:
+        return next((op for op in self.operators.values() if op["vox_user_name"] == vox_user_name), None)
+
+    # Вебхуки Voximplant
+
+    async def _leg_connected(self, request: web.Request) -> web.Response:
+        event = (await request.json())["event"]
+        item = self._queue_item(event["session_id"])
+        if item is not None and not event.get("is_operator"):
+            item["status"] = "answered"
+        elif item is not None:
+            operator = self._operator_by_vox_name(event.get("connected_operator", ""))
+            if operator is not None:
+                item.update(status="talking", operator_id=operator["id"])
+                await self._set_status(operator, "busy")
+                operator["call_session_id"] = event["session_id"]
+                self._stats["calls_connected"] += 1
+        return _response("", True)
+
+    async def _leg_disconnected(self, request: web.Request) -> web.Response:
+        await request.json()
+        return _response("", True)
+
+    async def _finish_call(self, request: web.Request) -> web.Response:
+        event = (await request.json())["event"]
+        item = self._queue_item(event["session_id"])
+        if item is not None:
+            del self.queue[str(item["lead_id"])]
+            item.update(status="finished", finish_reason=event.get("finish_reason"),
+                        talk_time_duration=event.get("talk_time_duration"), finished_at=time.time())
+            self.history.append(item)
+            self._stats["calls_finished"] += 1
+        operator = self._operator_by_vox_name(event.get("connected_operator") or "")
+        if operator is not None and operator["status"] == "busy":
+            await self._set_status(operator, "post_call")
+        return _response("", True)
+
+    async def _save_record(self, request: web.Request) -> web.Response:
+        await request.json()
+        return _response("", True)
+
+    # Voximplant Platform API
+
+    async def _vox(self, method: str, **params) -> Dict[str, Any]:
+        params.update(account_id=self.account_id, api_key=self.api_key)
+        async with self._http.post(f"{self.voximplant_url}/platform_api/{method}/", data=params) as response:
+            data = await response.json()
+        if "error" in data:
+            raise VoxAPIError(data["error"]["code"], data["error"]["msg"])
+        return data
+
+    async def _vox_add_user(self, operator: Dict[str, Any]) -> None:
+        try:
+            await self._vox("AddUser", application_name=self.application_name,
+                            user_name=operator["vox_user_name"], user_password=operator["id"])
+        except (aiohttp.ClientError, asyncio.TimeoutError, VoxAPIError) as e:
+            self._stats["voximplant_errors"] += 1
+            self.logger.warning(f"Не удалось создать пользователя {operator['vox_user_name']} в Voximplant: {e}")
+
+    async def _vox_sync_acd(self, operator: Dict[str, Any]) -> None:
+        if not self.voximplant_url:
+            return
+        try:
+            await self._vox("SetOperatorACDStatus", user_name=operator["vox_user_name"],
+                            acd_status=ACD_STATUSES[operator["status"]])
+        except (aiohttp.ClientError, asyncio.TimeoutError, VoxAPIError) as e:
+            # Как и в Лайнере, статус меняется и при недоступном Voximplant
+            self._stats["voximplant_errors"] += 1
+            self.logger.warning(f"Не удалось синхронизировать ACD статус {operator['vox_user_name']}: {e}")
+
+    # Доступ из тестов
+
+    def add_operator(self, operator_id: str, vox_user_name: Optional[str] = None) -> None:
+        """Регистрация оператора в статусе offline"""
+        async def add():
+            operator = self._register(operator_id, vox_user_name or operator_id)
+            if self.voximplant_url:
+                await self._vox_add_user(operator)
+
+        self.call_in_loop(add)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Число запросов по методам, смен статуса, звонков и размер очереди"""
+        return {**self._stats, "requests": dict(self._stats["requests"]), "queue": len(self.queue)}
+
+
+def main() -> None:
+    """Запуск локального контроллера Vats вместе с симулятором Voximplant"""
+    from utils.voximplant_simulator import VoximplantSimulator
+
+    parser = argparse.ArgumentParser(description="Локальная замена контроллера Vats")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--operators", type=int, default=5, help="Число операторов operator_1..N")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Множитель времени симулятора Voximplant")
+    parser.add_argument("--post-call-time", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    operators = [{"id": f"operator_{index}"} for index in range(1, args.operators + 1)]
+    with VoximplantSimulator(account_id="liner", api_key="liner", time_scale=args.time_scale) as voximplant, \
+            VatsServer(operators, voximplant.url, post_call_time=args.post_call_time, port=args.port) as vats:
+        print(f"Контроллер Vats доступен на {vats.url}/api/?controller=Vats, Ctrl+C для остановки")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
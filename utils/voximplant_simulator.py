@@ -0,0 +1,509 @@
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from utils.latency_models import LatencyModel, LogNormalLatency, UniformLatency
+from utils.stub_server import BackgroundAppServer
+
+ACD_STATUSES = ("OFFLINE", "ONLINE", "READY", "BANNED", "IN_SERVICE", "AFTER_SERVICE", "TIMEOUT", "DND")
+
+
+class VoxAPIError(Exception):
+    """Ошибка метода Platform API, возвращается в теле ответа"""
+
+    def __init__(self, code: int, msg: str):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    return [item for item in str(value).replace(",", ";").split(";") if item]
+
+
+def _as_bool(value: Any) -> bool:
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def _date(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class VoximplantSimulator(BackgroundAppServer):
+    """Локальный симулятор Voximplant Platform API с жизненным циклом звонков
+
+    Поддерживает методы, которые использует VoxProvider.php: AddUser,
+    DelUser, GetUsers (с acd_status), SetOperatorACDStatus, StartScenarios
+    и GetCallHistory по адресу /platform_api/{метод}/. Каждый звонок из
+    StartScenarios проходит дозвон (ring_time), ответ клиента
+    с вероятностью answer_probability, ожидание свободного оператора
+    в статусе READY не дольше max_operator_wait, разговор (talk_time)
+    и постобработку оператора (wrap_up_time). На каждом шаге отправляются
+    вебхуки leg_is_connected, leg_is_disconnected, finish_call и call_record
+    на адреса callback_urls из script_custom_data в формате, который
+    разбирают export*Data в VoxProvider.php.
+
+    Длительности задаются в секундах звонка и выдерживаются с множителем
+    time_scale: при time_scale=0.01 минутный разговор длится 0.6 сек,
+    а в истории и вебхуках остается 60 сек. Случайные величины берутся
+    из random.Random(seed), поэтому при одинаковом порядке вызовов
+    исходы звонков повторяются.
+    """
+
+    description = "Симулятор Voximplant"
+
+    def __init__(self, account_id: Optional[str] = None, api_key: Optional[str] = None,
+                 answer_probability: float = 0.6, voicemail_probability: float = 0.0,
+                 ring_time: Optional[LatencyModel] = None, talk_time: Optional[LatencyModel] = None,
+                 wrap_up_time: Optional[LatencyModel] = None, max_operator_wait: float = 5.0,
+                 api_latency: Optional[LatencyModel] = None, time_scale: float = 1.0,
+                 call_cost_per_minute: float = 1.5, record_cost_per_minute: float = 0.1,
+                 webhook_timeout: float = 5.0, seed: Optional[int] = None,
+                 host: str = "127.0.0.1", port: int = 0, backlog: int = 4096):
+        super().__init__(host, port, backlog)
+        if time_scale <= 0:
+            raise ValueError("Множитель времени должен быть больше 0")
+        self.account_id = account_id
+        self.api_key = api_key
+        self.answer_probability = answer_probability
+        self.voicemail_probability = voicemail_probability
+        self.ring_time = ring_time or LogNormalLatency(8.0, sigma=0.5)
+        self.talk_time = talk_time or LogNormalLatency(60.0, sigma=0.8)
+        self.wrap_up_time = wrap_up_time or UniformLatency(5.0, 15.0)
+        self.max_operator_wait = max_operator_wait
+        self.api_latency = api_latency
+        self.time_scale = time_scale
+        self.call_cost_per_minute = call_cost_per_minute
+        self.record_cost_per_minute = record_cost_per_minute
+        self.webhook_timeout = webhook_timeout
+        self.rng = random.Random(seed)
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.sessions: Dict[int, Dict[str, Any]] = {}
+        self.webhooks: List[Dict[str, Any]] = []
+        self._user_ids = itertools.count(1)
+        self._session_ids = itertools.count(1000)
+        self._leg_ids = itertools.count(1)
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._waiting: "collections.deque[asyncio.Future]" = collections.deque()
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._closing = False
+        self._stats = {"api_requests": 0, "calls": 0, "answered": 0, "connected": 0, "abandoned": 0,
+                       "no_answer": 0, "voicemail": 0, "terminated": 0, "active": 0, "max_active": 0,
+                       "webhooks_sent": 0, "webhooks_failed": 0}
+        self._methods: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "AddUser": self._add_user,
+            "DelUser": self._del_user,
+            "GetUsers": self._get_users,
+            "SetOperatorACDStatus": self._set_acd_status,
+            "StartScenarios": self._start_scenarios,
+            "GetCallHistory": self._get_call_history,
+        }
+
+    def make_app(self) -> web.Application:
+        """Приложение aiohttp с Platform API и ссылками управления звонками"""
+        app = web.Application()
+        app.router.add_route("*", "/platform_api/{method}", self._api)
+        app.router.add_route("*", "/platform_api/{method}/", self._api)
+        app.router.add_post("/media/{session_id}", self._media)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self._http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.webhook_timeout))
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        self._closing = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._http.close()
+
+    async def _sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds * self.time_scale)
+
+    # Platform API
+
+    async def _api(self, request: web.Request) -> web.Response:
+        self._stats["api_requests"] += 1
+        params: Dict[str, Any] = dict(request.query)
+        if request.method == "POST" and request.can_read_body:
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+        if self.api_latency is not None:
+            await asyncio.sleep(self.api_latency.sample(self.rng))
+
+        method = self._methods.get(request.match_info["method"])
+        try:
+            if self.api_key is not None and (params.get("api_key") != self.api_key or
+                                             str(params.get("account_id")) != str(self.account_id)):
+                raise VoxAPIError(100, "Authorization failed")
+            if method is None:
+                raise VoxAPIError(102, f"Unknown method {request.match_info['method']}")
+            return web.json_response(method(params))
+        except VoxAPIError as e:
+            return web.json_response({"error": {"msg": e.msg, "code": e.code}})
+
+    def _find_users(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ids = {int(user_id) for user_id in _as_list(params.get("user_id"))}
+        names = set(_as_list(params.get("user_name")))
+        if not ids and not names:
+            raise VoxAPIError(103, "user_id or user_name is required")
+        found = [user for user in self.users.values() if user["user_id"] in ids or user["user_name"] in names]
+        if not found:
+            raise VoxAPIError(104, "User not found")
+        return found
+
+    def _add_user(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        for field in ("user_name", "user_password"):
+            if not params.get(field):
+                raise VoxAPIError(103, f"{field} is required")
+        if any(user["user_name"] == params["user_name"] for user in self.users.values()):
+            raise VoxAPIError(118, f"User {params['user_name']} already exists")
+        user_id = next(self._user_ids)
+        self.users[user_id] = {
+            "user_id": user_id,
+            "user_name": params["user_name"],
+            "user_display_name": params.get("user_display_name", params["user_name"]),
+            "user_active": _as_bool(params.get("user_active", True)),
+            "application_name": params.get("application_name"),
+            "acd_status": "OFFLINE",
+            "idle_since": time.monotonic()
+        }
+        return {"result": 1, "user_id": user_id}
+
+    def _del_user(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        for user in self._find_users(params):
+            del self.users[user["user_id"]]
+        return {"result": 1}
+
+    def _get_users(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        statuses = set(_as_list(params.get("acd_status")))
+        users = [
+            {key: value for key, value in user.items() if key != "idle_since"}
+            for user in self.users.values()
+            if (not params.get("application_name") or user["application_name"] == params["application_name"])
+            and (not statuses or user["acd_status"] in statuses)
+        ]
+        offset = int(params.get("offset", 0))
+        page = users[offset:offset + int(params.get("count", 20))]
+        return {"result": page, "total_count": len(users), "count": len(page)}
+
+    def _set_acd_status(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        status = params.get("acd_status")
+        if status not in ACD_STATUSES:
+            raise VoxAPIError(103, f"Unknown acd_status {status}")
+        for user in self._find_users(params):
+            self._change_status(user, status)
+        return {"result": 1}
+
+    def _start_scenarios(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if not params.get("rule_id"):
+            raise VoxAPIError(103, "rule_id is required")
+        custom_data = params.get("script_custom_data") or {}
+        if isinstance(custom_data, str):
+            try:
+                custom_data = json.loads(custom_data)
+            except ValueError:
+                custom_data = {"raw": custom_data}
+        session_id = next(self._session_ids)
+        self.sessions[session_id] = {
+            "call_session_history_id": session_id,
+            "application_name": params.get("application_name"),
+            "rule_id": int(params["rule_id"]),
+            "custom_data": custom_data,
+            "start_time": time.time(),
+            "state": "ringing",
+            "operator": None,
+            "finish_reason": None,
+            "durations": {"wait": 0.0, "talk": 0.0, "total": 0.0},
+            "calls": [],
+            "records": [],
+            "other_resource_usage": []
+        }
+        stats = self._stats
+        stats["calls"] += 1
+        stats["active"] += 1
+        stats["max_active"] = max(stats["max_active"], stats["active"])
+        self._tasks[session_id] = asyncio.get_running_loop().create_task(self._run_call(session_id))
+        link = f"{self.url}/media/{session_id}"
+        return {"result": 1, "call_session_history_id": session_id,
+                "media_session_access_url": link, "media_session_access_secure_url": link}
+
+    def _get_call_history(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        ids = {int(session_id) for session_id in _as_list(params.get("call_session_history_id"))}
+        sections = [section for section, flag in (("calls", "with_calls"), ("records", "with_records"),
+                                                  ("other_resource_usage", "with_other_resources"))
+                    if _as_bool(params.get(flag, False))]
+        result = []
+        for session in sorted(self.sessions.values(), key=lambda s: -s["call_session_history_id"]):
+            if ids and session["call_session_history_id"] not in ids:
+                continue
+            if params.get("application_name") and session["application_name"] != params["application_name"]:
+                continue
+            item = {
+                "call_session_history_id": session["call_session_history_id"],
+                "application_name": session["application_name"],
+                "rule_id": session["rule_id"],
+                "start_date": _date(session["start_time"]),
+                "duration": round(session["durations"]["total"]),
+                "finish_reason": session["finish_reason"],
+                "custom_data": json.dumps(session["custom_data"], ensure_ascii=False)
+            }
+            item.update({section: list(session[section]) for section in sections})
+            result.append(item)
+        offset = int(params.get("offset", 0))
+        page = result[offset:offset + int(params.get("count", 20))]
+        return {"result": page, "total_count": len(result), "count": len(page)}
+
+    async def _media(self, request: web.Request) -> web.Response:
+        task = self._tasks.get(int(request.match_info["session_id"]))
+        if task is None:
+            return web.json_response({"error": "Session not found"}, status=404)
+        command = await request.json()
+        if command.get("method") == "predictive_terminate":
+            task.cancel()
+        return web.json_response({"result": True})
+
+    # Операторы
+
+    def _change_status(self, user: Dict[str, Any], status: str) -> None:
+        user["acd_status"] = status
+        if status != "READY":
+            return
+        user["idle_since"] = time.monotonic()
+        while self._waiting:
+            waiter = self._waiting.popleft()
+            if not waiter.done():
+                user["acd_status"] = "IN_SERVICE"
+                waiter.set_result(user)
+                return
+
+    def _take_operator(self, custom_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        name = custom_data.get("vox_user_name")
+        ready = [user for user in self.users.values() if user["acd_status"] == "READY" and user["user_active"]
+                 and (name is None or user["user_name"] == name)]
+        if not ready:
+            return None
+        # Как в очереди ACD: звонок получает оператор, дольше всех ожидающий
+        user = min(ready, key=lambda u: u["idle_since"])
+        user["acd_status"] = "IN_SERVICE"
+        return user
+
+    async def _wait_operator(self, custom_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        user = self._take_operator(custom_data)
+        if user is not None or "vox_user_name" in custom_data:
+            return user
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, self.max_operator_wait * self.time_scale)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _release_operator(self, user: Dict[str, Any]) -> None:
+        if user["user_id"] not in self.users or user["acd_status"] != "IN_SERVICE":
+            return
+        user["acd_status"] = "AFTER_SERVICE"
+        await self._sleep(self.wrap_up_time.sample(self.rng))
+        if user["acd_status"] == "AFTER_SERVICE":
+            self._change_status(user, "READY")
+
+    # Жизненный цикл звонка
+
+    async def _run_call(self, session_id: int) -> None:
+        session = self.sessions[session_id]
+        custom = session["custom_data"]
+        event = {"session_id": session_id, "direction": "outgoing", "call_source": "predictive"
+                 if "vox_user_name" not in custom else "default", "is_transferred": False, "is_ai": False,
+                 "client_was_connected": False, "operator_was_connected": False, "ai_was_connected": False,
+                 "connected_operator": "", "voice_mail_is_detected": 0, "voice_mail_detection_percent": 0,
+                 "finish_reason": "", "finish_initiator": ""}
+        started = time.monotonic()
+        talk_started: Optional[float] = None
+        legs: List[Dict[str, Any]] = []
+        reason, initiator = "", "system"
+        try:
+            ring = self.ring_time.sample(self.rng)
+            await self._sleep(ring)
+            session["durations"]["wait"] = ring
+            if self.rng.random() >= self.answer_probability:
+                reason = "no_answer"
+                self._stats["no_answer"] += 1
+                return
+            self._stats["answered"] += 1
+            event["client_was_connected"] = True
+            legs.append(self._connect_leg(session, event, is_operator=False))
+            if self.rng.random() < self.voicemail_probability:
+                event.update(voice_mail_is_detected=1, voice_mail_detection_percent=self.rng.randint(80, 100))
+                reason = "voicemail"
+                self._stats["voicemail"] += 1
+                return
+
+            session["state"] = "waiting_operator"
+            wait_started = time.monotonic()
+            session["operator"] = await self._wait_operator(custom)
+            session["durations"]["wait"] += (time.monotonic() - wait_started) / self.time_scale
+            if session["operator"] is None:
+                reason, initiator = "no_free_operator", "client"
+                self._stats["abandoned"] += 1
+                return
+            self._stats["connected"] += 1
+            event.update(operator_was_connected=True, connected_operator=session["operator"]["user_name"])
+            legs.append(self._connect_leg(session, event, is_operator=True))
+
+            session["state"] = "talking"
+            talk_started = time.monotonic()
+            talk = self.talk_time.sample(self.rng)
+            await self._sleep(talk)
+            session["durations"]["talk"] = talk
+            reason, initiator = "hangup", self.rng.choice(("client", "operator"))
+        except asyncio.CancelledError:
+            reason = "predictive_terminate"
+            self._stats["terminated"] += 1
+            if talk_started is not None:
+                session["durations"]["talk"] = (time.monotonic() - talk_started) / self.time_scale
+        finally:
+            self._finish_call(session, event, legs, reason, initiator, time.monotonic() - started)
+
+    def _connect_leg(self, session: Dict[str, Any], event: Dict[str, Any], is_operator: bool) -> Dict[str, Any]:
+        leg = {"leg_id": next(self._leg_ids), "is_operator": int(is_operator), "connected_at": time.monotonic()}
+        self._send_webhook(session, "leg_is_connected", {**event, "leg_id": leg["leg_id"],
+                                                         "is_operator": leg["is_operator"]})
+        return leg
+
+    def _finish_call(self, session: Dict[str, Any], event: Dict[str, Any], legs: List[Dict[str, Any]],
+                     reason: str, initiator: str, elapsed: float) -> None:
+        session_id = session["call_session_history_id"]
+        durations = session["durations"]
+        durations["total"] = durations["wait"] + durations["talk"] if reason == "hangup" else elapsed / self.time_scale
+        session.update(state="finished", finish_reason=reason)
+        event.update(finish_reason=reason, finish_initiator=initiator,
+                     wait_time_duration=round(durations["wait"]), talk_time_duration=round(durations["talk"]),
+                     total_time_duration=round(durations["total"]))
+
+        minutes = max(1, int(-(-durations["total"] // 60)))
+        remote = str(session["custom_data"].get("lead_phone", ""))
+        session["calls"].append({"call_id": session_id * 10, "start_time": _date(session["start_time"]),
+                                 "duration": round(durations["total"]), "remote_number": remote,
+                                 "direction": "outgoing", "successful": event["client_was_connected"],
+                                 "cost": round(minutes * self.call_cost_per_minute, 4)})
+        for leg in legs:
+            self._send_webhook(session, "leg_is_disconnected", {
+                **event, "leg_id": leg["leg_id"], "is_operator": leg["is_operator"], "is_failed": False,
+                "leadId": session["custom_data"].get("lead_id", 0)
+            })
+        if not legs:
+            self._send_webhook(session, "leg_is_disconnected", {**event, "leg_id": 0, "is_operator": 0,
+                                                                "is_failed": True})
+        self._send_webhook(session, "finish_call", event)
+        if durations["talk"]:
+            record = {"record_id": session_id, "duration": round(durations["talk"]),
+                      "record_url": f"{self.url}/records/{session_id}.mp3",
+                      "cost": round(max(1, int(-(-durations["talk"] // 60))) * self.record_cost_per_minute, 4)}
+            session["records"].append(record)
+            self._send_webhook(session, "call_record", {"session_id": session_id, "duration": record["duration"],
+                                                        "url": record["record_url"], "is_transferred": False})
+
+        self._stats["active"] -= 1
+        self._tasks.pop(session_id, None)
+        operator = session["operator"]
+        if operator is not None and not self._closing:
+            asyncio.get_running_loop().create_task(self._release_operator(operator))
+
+    def _send_webhook(self, session: Dict[str, Any], name: str, event: Dict[str, Any]) -> None:
+        custom = session["custom_data"]
+        url = (custom.get("callback_urls") or {}).get(name)
+        if not url or self._http is None or self._closing:
+            return
+        payload = {
+            "notification_time": int(time.time() * 1000),
+            "event": dict(event),
+            "source": {key: custom[key] for key in ("lead_id", "user_id", "vox_user_name") if key in custom}
+        }
+        asyncio.get_running_loop().create_task(self._deliver(name, session["call_session_history_id"], url, payload))
+
+    async def _deliver(self, name: str, session_id: int, url: str, payload: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        record = {"event": name, "session_id": session_id, "url": url, "payload": payload, "status": None}
+        try:
+            async with self._http.post(url, json=payload) as response:
+                record["status"] = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            record["error"] = str(e)
+        record["latency_ms"] = (time.perf_counter() - started) * 1000
+        self._stats["webhooks_sent" if record["status"] and record["status"] < 400 else "webhooks_failed"] += 1
+        self.webhooks.append(record)
+
+    # Доступ из тестов
+
+    def get_stats(self) -> Dict[str, int]:
+        """Исходы звонков, пик одновременных звонков и доставка вебхуков"""
+        return dict(self._stats)
+
+    def get_call(self, session_id: int) -> Dict[str, Any]:
+        """Копия состояния звонка"""
+        return self.call_in_loop(lambda: json.loads(json.dumps(self.sessions[session_id], default=str)))
+
+    def set_acd_status(self, user_name: str, status: str) -> None:
+        """Смена ACD статуса оператора, как из SDK оператора"""
+        self.call_in_loop(self._set_acd_status, {"user_name": user_name, "acd_status": status})
+
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        """Ожидание завершения всех звонков"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self._stats["active"]:
+                return True
+            time.sleep(0.01)
+        return False
+
+
+def main() -> None:
+    """Запуск симулятора Voximplant для прогона диалера без реального аккаунта"""
+    parser = argparse.ArgumentParser(description="Симулятор Voximplant Platform API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--account-id", default=None)
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--answer-probability", type=float, default=0.6)
+    parser.add_argument("--ring-median", type=float, default=8.0, help="Медиана дозвона, сек")
+    parser.add_argument("--talk-median", type=float, default=60.0, help="Медиана разговора, сек")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Множитель реального времени")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    simulator = VoximplantSimulator(
+        account_id=args.account_id, api_key=args.api_key, answer_probability=args.answer_probability,
+        ring_time=LogNormalLatency(args.ring_median, sigma=0.5), talk_time=LogNormalLatency(args.talk_median),
+        time_scale=args.time_scale, seed=args.seed, host=args.host, port=args.port
+    )
+    with simulator:
+        print(f"Platform API доступен на {simulator.url}/platform_api/, Ctrl+C для остановки")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import allure
+
+from utils.latency_histogram import LatencyHistogram
+from utils.latency_models import RealClock
+
+PLACEHOLDER = re.compile(r"\$\{([a-z_]+)(?::([^}]*))?\}")
+
+
+class ScenarioError(ValueError):
+    """Некорректное описание сценария нагрузки"""
+
+
+def load_scenario(path: Union[str, Path]) -> Dict[str, Any]:
+    """Загрузка и проверка сценария нагрузки из JSON файла"""
+    with open(path, "r", encoding="utf-8") as f:
+        scenario = json.load(f)
+    validate_scenario(scenario)
+    return scenario
+
+
+def validate_scenario(scenario: Dict[str, Any]) -> None:
+    """Проверка обязательных полей сценария"""
+    operations = scenario.get("operations")
+    if not operations:
+        raise ScenarioError("В сценарии нет операций")
+    for operation in operations:
+        if "name" not in operation or "method" not in operation:
+            raise ScenarioError(f"У операции должны быть name и method: {operation}")
+        if operation.get("weight", 1) <= 0:
+            raise ScenarioError(f"Вес операции {operation['name']} должен быть больше нуля")
+    if scenario.get("duration", 0) <= 0 and scenario.get("iterations", 0) <= 0:
+        raise ScenarioError("В сценарии нужно указать duration или iterations")
+
+
+class DataGenerator:
+    """Подстановка тестовых данных в аргументы операций
+
+    Поддерживаемые шаблоны:
+    ${seq} - порядковый номер, ${randint:1:10} - случайное целое,
+    ${choice:a|b|c} - случайный вариант, ${phone} - телефон +7999XXXXXXX,
+    ${uuid}, ${timestamp}, ${lead_id} - id лида, созданного в этом прогоне.
+    Строка, целиком состоящая из одного шаблона, заменяется значением
+    нужного типа, иначе подстановка выполняется как текст.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._lead_ids: List[Any] = []
+
+    def remember_lead(self, result: Any) -> None:
+        """Сохранение id созданного лида для последующих операций"""
+        if isinstance(result, dict):
+            lead_id = result.get("id") or result.get("lead_id")
+            if lead_id is not None:
+                with self._lock:
+                    self._lead_ids.append(lead_id)
+
+    def has_leads(self) -> bool:
+        with self._lock:
+            return bool(self._lead_ids)
+
+    def _value(self, name: str, arg: Optional[str]) -> Any:
+        with self._lock:
+            if name == "seq":
+                self._seq += 1
+                return self._seq
+            if name == "randint":
+                low, high = (int(x) for x in (arg or "0:100").split(":"))
+                return self._random.randint(low, high)
+            if name == "choice":
+                return self._random.choice((arg or "").split("|"))
+            if name == "phone":
+                return f"+7999{self._random.randint(0, 9999999):07d}"
+            if name == "uuid":
+                return str(uuid.UUID(int=self._random.getrandbits(128)))
+            if name == "timestamp":
+                return int(time.time())
+            if name == "lead_id":
+                return self._random.choice(self._lead_ids)
+        raise ScenarioError(f"Неизвестный шаблон данных: {name}")
+
+    def render(self, template: Any) -> Any:
+        """Подстановка значений во все строки шаблона"""
+        if isinstance(template, dict):
+            return {key: self.render(value) for key, value in template.items()}
+        if isinstance(template, list):
+            return [self.render(value) for value in template]
+        if not isinstance(template, str):
+            return template
+        whole = PLACEHOLDER.fullmatch(template)
+        if whole:
+            return self._value(whole.group(1), whole.group(2))
+        return PLACEHOLDER.sub(lambda m: str(self._value(m.group(1), m.group(2))), template)
+
+
+class WorkloadEngine:
+    """Выполнение смешанной нагрузки по сценарию
+
+    Каждый виртуальный пользователь в своем потоке выбирает операцию
+    по весам, выполняет ее (burst раз подряд для пачек) и выжидает
+    think time. Операции разных типов перемешиваются во времени так же,
+    как у реальных пользователей. Клиент - APIClient или мок с теми же
+    методами. Операция, вернувшая {"status": "error"}, считается ошибкой.
+    С моком на VirtualClock нужно передать тот же clock, тогда сценарий
+    выполняется в виртуальном времени.
+    """
+
+    def __init__(self, client: Any, scenario: Dict[str, Any], seed: Optional[int] = None, clock=None):
+        validate_scenario(scenario)
+        self.client = client
+        self.scenario = scenario
+        self.seed = seed if seed is not None else scenario.get("seed")
+        self.clock = clock or RealClock()
+        self.logger = logging.getLogger(__name__)
+        self.data = DataGenerator(self.seed)
+        self._lock = threading.Lock()
+        self._operations = scenario["operations"]
+        self._weights = [operation.get("weight", 1) for operation in self._operations]
+        self._stats: Dict[str, Dict[str, Any]] = {
+            operation["name"]: {"count": 0, "errors": 0, "skipped": 0, "histogram": LatencyHistogram()}
+            for operation in self._operations
+        }
+        self._total = LatencyHistogram()
+
+    def _think(self, rng: random.Random, settings: Optional[Dict[str, Any]]) -> float:
+        if not settings:
+            return 0.0
+        if settings.get("distribution") == "exponential":
+            return rng.expovariate(1.0 / settings["mean"])
+        return rng.uniform(settings.get("min", 0.0), settings.get("max", settings.get("min", 0.0)))
+
+    def _execute(self, operation: Dict[str, Any]) -> None:
+        stats = self._stats[operation["name"]]
+        templates = [operation.get("args", []), operation.get("kwargs", {})]
+        if "${lead_id}" in json.dumps(templates) and not self.data.has_leads():
+            with self._lock:
+                stats["skipped"] += 1
+            return
+
+        started = self.clock.now()
+        try:
+            # Ошибка подстановки данных считается ошибкой операции, а не останавливает пользователя
+            args, kwargs = (self.data.render(template) for template in templates)
+            result = getattr(self.client, operation["method"])(*args, **kwargs)
+            failed = isinstance(result, dict) and result.get("status") == "error"
+        except Exception as e:
+            self.logger.warning(f"Операция {operation['name']} завершилась ошибкой: {str(e)}")
+            result, failed = None, True
+        elapsed = self.clock.now() - started
+
+        stats["histogram"].record_seconds(elapsed)
+        self._total.record_seconds(elapsed)
+        with self._lock:
+            stats["count"] += 1
+            stats["errors"] += int(failed)
+        if operation.get("remember_lead") and not failed:
+            self.data.remember_lead(result)
+
+    def _virtual_user(self, index: int, deadline: Optional[float], iterations: Optional[int]) -> None:
+        rng = random.Random(None if self.seed is None else self.seed * 1000 + index)
+        done = 0
+        while (deadline is None or self.clock.now() < deadline) and (iterations is None or done < iterations):
+            operation = rng.choices(self._operations, weights=self._weights)[0]
+            for _ in range(max(1, operation.get("burst", 1))):
+                self._execute(operation)
+            done += 1
+            pause = self._think(rng, operation.get("think_time", self.scenario.get("think_time")))
+            if deadline is not None:
+                pause = min(pause, max(0.0, deadline - self.clock.now()))
+            self.clock.sleep(pause)
+
+    def run(self, duration: Optional[float] = None, virtual_users: Optional[int] = None) -> Dict[str, Any]:
+        """Запуск сценария, параметры переопределяют значения из сценария"""
+        duration = duration if duration is not None else self.scenario.get("duration")
+        iterations = self.scenario.get("iterations") if not duration else None
+        users = virtual_users or self.scenario.get("virtual_users", 1)
+        started = self.clock.sync()
+        deadline = started + duration if duration else None
+
+        self.logger.info(f"Запуск сценария {self.scenario.get('name', '')}: {users} пользователей")
+        threads = [
+            threading.Thread(target=self._virtual_user, args=(index, deadline, iterations),
+                             name=f"workload-vu-{index}", daemon=True)
+            for index in range(users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = self.clock.sync() - started
+        return self.get_summary(elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущее состояние счетчиков и гистограмм для передачи между процессами"""
+        with self._lock:
+            operations = {
+                name: {key: stats[key] for key in ("count", "errors", "skipped")}
+                for name, stats in self._stats.items()
+            }
+        for name, stats in self._stats.items():
+            operations[name]["histogram"] = stats["histogram"].to_dict()
+        return {"operations": operations, "total": self._total.to_dict()}
+
+    def get_summary(self, elapsed: float) -> Dict[str, Any]:
+        """Сводка по операциям: число вызовов, ошибки и перцентили"""
+        operations = {}
+        for name, stats in self._stats.items():
+            operations[name] = {
+                "count": stats["count"],
+                "errors": stats["errors"],
+                "skipped": stats["skipped"],
+                "latency_ms": stats["histogram"].get_percentiles()
+            }
+        total = sum(op["count"] for op in operations.values())
+        errors = sum(op["errors"] for op in operations.values())
+        return {
+            "name": self.scenario.get("name", ""),
+            "duration_s": elapsed,
+            "total": total,
+            "errors": errors,
+            "rps": total / elapsed if elapsed > 0 else 0.0,
+            "latency_ms": self._total.get_percentiles(),
+            "operations": operations
+        }
+
+    def attach_to_allure(self, summary: Dict[str, Any]) -> None:
+        """Прикрепление сводки сценария к отчету Allure"""
+        lines = [
+            f"Сценарий: {summary['name']}",
+            f"Длительность: {summary['duration_s']:.1f} сек, запросов: {summary['total']}, "
+            f"ошибок: {summary['errors']}, {summary['rps']:.1f} запр/с",
+            "",
+            f"{'операция':<16}{'вызовов':>9}{'ошибок':>8}{'пропущено':>11}{'p50, мс':>10}{'p99, мс':>10}{'max, мс':>10}"
+        ]
+        for name, op in summary["operations"].items():
+            latency = op["latency_ms"]
+            lines.append(
+                f"{name:<16}{op['count']:>9}{op['errors']:>8}{op['skipped']:>11}"
+                f"{latency['p50']:>10.1f}{latency['p99']:>10.1f}{latency['max']:>10.1f}"
+            )
+        allure.attach("\n".join(lines), f"Сценарий нагрузки {summary['name']}", allure.attachment_type.TEXT)